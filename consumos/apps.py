@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ConsumosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consumos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
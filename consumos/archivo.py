@@ -0,0 +1,32 @@
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import TruncDate
+
+from huespedes.archivo import TAMANO_LOTE, mover_por_lotes
+from huespedes.models import Estadia
+from .fechas import inicio_del_dia
+from .models import Consumo, ConsumoArchivado
+
+CAMPOS_CONSUMO_ARCHIVADO = (
+    'id', 'habitacion_id', 'huesped_id', 'producto_id', 'cantidad', 'fecha_consumo', 'observaciones', 'precio_total',
+    'ticket_id',
+)
+
+
+def archivar_consumos(antes_de, tamano_lote=TAMANO_LOTE):
+    """
+    Archiva los consumos anteriores a ``antes_de`` que ya no entran en el folio de una
+    estadía vigente: una de la tabla de trabajo, en la misma habitación, que empezó antes
+    del consumo y no había terminado. Conviene archivar antes las estadías
+    (``archivar_estadias``) para que las cerradas no retengan sus consumos.
+    """
+    en_estadia_vigente = Estadia.objects.filter(
+        Q(activa=True) | Q(fecha_salida__isnull=True) | Q(fecha_salida__gte=OuterRef('dia')),
+        habitacion=OuterRef('habitacion_id'),
+        fecha_entrada__lte=OuterRef('dia'),
+    )
+    antiguos = (
+        Consumo.objects.filter(fecha_consumo__lt=inicio_del_dia(antes_de))
+        .annotate(dia=TruncDate('fecha_consumo'))
+        .exclude(Exists(en_estadia_vigente))
+    )
+    return mover_por_lotes(antiguos, ConsumoArchivado, CAMPOS_CONSUMO_ARCHIVADO, tamano_lote)
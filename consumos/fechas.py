@@ -0,0 +1,13 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+
+
+def inicio_del_dia(fecha):
+    """
+    Medianoche local de ``fecha`` como datetime con zona horaria. Los filtros por día sobre
+    ``fecha_consumo`` se escriben como ``>= inicio_del_dia(desde)`` y
+    ``< inicio_del_dia(hasta + 1 día)``: el rango usa el índice, a diferencia de
+    ``fecha_consumo__date``.
+    """
+    return timezone.make_aware(datetime.combine(fecha, time.min))
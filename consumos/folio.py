@@ -0,0 +1,257 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count, Max, Q, Sum, Value
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from habitaciones.inventario import como_fecha
+from huespedes.models import Estadia, EstadiaArchivada
+from .fechas import inicio_del_dia
+from .models import Consumo, ConsumoArchivado
+
+logger = logging.getLogger(__name__)
+
+# La factura se cachea por versión del folio: un cambio en la cuenta genera otra clave
+TIEMPO_FACTURA = 60 * 60 * 24 * 7
+
+# Un solo hilo: las facturas se generan fuera de la petición, en orden
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='facturas')
+
+
+# --------------------------------
+# 📌 Consumos de una estadía
+# --------------------------------
+def consumos_estadia(estadia, dias_sin_huesped, modelo=Consumo):
+    """
+    Consumos cargados a la habitación durante la estadía: los del huésped y, solo en
+    ``dias_sin_huesped`` (tramos ``(desde, hasta)`` con ``hasta`` excluido o ``None``),
+    los que no tienen huésped asignado. Una estadía activa no tiene tope (puede
+    alargarse). El rango se expresa en fechas y horas para usar el índice de
+    ``fecha_consumo``. ``modelo`` elige la tabla: ``Consumo`` o ``ConsumoArchivado``.
+    """
+    sin_huesped = Q(pk__in=[])
+    for desde, hasta in dias_sin_huesped:
+        tramo = Q(fecha_consumo__gte=inicio_del_dia(desde))
+        if hasta is not None:
+            tramo &= Q(fecha_consumo__lt=inicio_del_dia(hasta))
+        sin_huesped |= tramo
+    filtro = Q(habitacion_id=estadia.habitacion_id) & (
+        Q(huesped_id=estadia.huesped_id) | (Q(huesped__isnull=True) & sin_huesped)
+    )
+    filtro &= Q(fecha_consumo__gte=inicio_del_dia(como_fecha(estadia.fecha_entrada)))
+    if not estadia.activa and estadia.fecha_salida:
+        filtro &= Q(fecha_consumo__lt=inicio_del_dia(como_fecha(estadia.fecha_salida) + timedelta(days=1)))
+    return modelo.objects.filter(filtro)
+
+
+def tablas_consumo(estadia):
+    """
+    Tablas donde pueden estar los consumos de la estadía. Los de una estadía vigente nunca
+    se archivan (ver ``archivar_consumos``); los de una archivada pueden estar en ambas.
+    """
+    if isinstance(estadia, EstadiaArchivada):
+        return (Consumo, ConsumoArchivado)
+    return (Consumo,)
+
+
+# --------------------------------
+# 📌 Ocupación compartida
+# --------------------------------
+# Si varias estadías comparten la habitación, la tarifa de cada noche y los consumos sin
+# huésped de cada día van a una sola: la titular, la que llegó primero (a igual llegada,
+# la de menor ``id``). Las demás pagan solo sus propios consumos.
+
+def _noches(entrada, salida, activa, hoy):
+    """
+    Tramo ``(desde, hasta)`` de noches de una estadía: hasta la salida o, si sigue activa,
+    hasta hoy; siempre al menos una noche.
+    """
+    fin = salida if not activa and salida else hoy
+    return entrada, entrada + timedelta(days=max((fin - entrada).days, 1))
+
+
+def _dias_consumo(entrada, salida, activa):
+    """
+    Tramo ``(desde, hasta)`` de días en que se cargan consumos a la estadía: el de salida
+    incluido; sin tope (``None``) si sigue activa.
+    """
+    return entrada, (salida + timedelta(days=1) if not activa and salida else None)
+
+
+def _restar(tramos, desde, hasta):
+    """
+    Quita de ``tramos`` el tramo ``(desde, hasta)``. ``hasta`` en ``None`` no tiene tope.
+    """
+    resto = []
+    for inicio, fin in tramos:
+        if (hasta is not None and hasta <= inicio) or (fin is not None and fin <= desde):
+            resto.append((inicio, fin))
+            continue
+        if inicio < desde:
+            resto.append((inicio, desde))
+        if hasta is not None and (fin is None or hasta < fin):
+            resto.append((hasta, fin))
+    return resto
+
+
+def _estadias_previas(estadia):
+    """
+    Estadías de la misma habitación que llegaron el mismo día o antes y seguían allí a
+    la llegada de ``estadia``, vigentes y archivadas, en una consulta:
+    ``(id, fecha_entrada, fecha_salida, activa)``.
+    """
+    entrada = como_fecha(estadia.fecha_entrada)
+    filtro = Q(habitacion_id=estadia.habitacion_id, fecha_entrada__lte=entrada) & ~Q(pk=estadia.pk)
+    seguian = Q(fecha_salida__isnull=True) | Q(fecha_salida__gte=entrada)
+    campos = ('id', 'fecha_entrada', 'fecha_salida', 'activa')
+    vigentes = Estadia.objects.filter(filtro & (seguian | Q(activa=True))).order_by().values_list(*campos)
+    archivadas = (
+        EstadiaArchivada.objects.filter(filtro & seguian).order_by()
+        .annotate(activa=Value(False)).values_list(*campos)
+    )
+    return vigentes.union(archivadas, all=True)
+
+
+def _a_cargo(estadia, hoy):
+    """
+    Lo que la estadía paga como titular: ``(noches, dias_sin_huesped)``, las noches
+    cobradas y los tramos de días cuyos consumos sin huésped le corresponden.
+    """
+    entrada = como_fecha(estadia.fecha_entrada)
+    salida = como_fecha(estadia.fecha_salida) if estadia.fecha_salida else None
+    noches = [_noches(entrada, salida, estadia.activa, hoy)]
+    dias = [_dias_consumo(entrada, salida, estadia.activa)]
+    for pk, otra_entrada, otra_salida, activa in _estadias_previas(estadia):
+        otra_entrada = como_fecha(otra_entrada)
+        if (otra_entrada, pk) > (entrada, estadia.pk):
+            continue
+        otra_salida = como_fecha(otra_salida) if otra_salida else None
+        noches = _restar(noches, *_noches(otra_entrada, otra_salida, activa, hoy))
+        dias = _restar(dias, *_dias_consumo(otra_entrada, otra_salida, activa))
+    return sum((hasta - desde).days for desde, hasta in noches), dias
+
+
+# --------------------------------
+# 📌 Folio
+# --------------------------------
+class Folio:
+    """
+    Cuenta de una estadía: noches × tarifa de la habitación más los consumos. Los totales
+    salen de una sola agregación; el detalle de consumos se lee aparte, solo al mostrarlo.
+    Una estadía archivada lee sus consumos de las dos tablas. ``noches_cobradas`` son las
+    noches en que la estadía es la titular de la habitación (ver ``_a_cargo``).
+    """
+
+    def __init__(self, estadia, noches, noches_cobradas, dias_sin_huesped, consumos, lineas, ultimo_consumo):
+        self.estadia = estadia
+        self.noches = noches
+        self.noches_cobradas = noches_cobradas
+        self.dias_sin_huesped = dias_sin_huesped
+        self.tarifa = estadia.habitacion.precio
+        self.alojamiento = self.tarifa * noches_cobradas
+        self.consumos = consumos
+        self.lineas = lineas
+        self.total = self.alojamiento + consumos
+        self._ultimo_consumo = ultimo_consumo
+
+    @property
+    def compartida(self):
+        return self.noches_cobradas < self.noches
+
+    @property
+    def version(self):
+        """
+        Cambia con cualquier cargo nuevo, editado o eliminado, con las noches y al cerrar
+        la estadía.
+        """
+        firma = (
+            f'{self.noches}:{self.noches_cobradas}:{self.tarifa}:{self.lineas}:{self._ultimo_consumo}:'
+            f'{self.consumos}:{self.estadia.activa}:{self.estadia.fecha_salida}'
+        )
+        return hashlib.sha1(firma.encode()).hexdigest()[:16]
+
+    @property
+    def clave_factura(self):
+        return f'consumos:factura:{self.estadia.pk}:{self.version}'
+
+    def detalle(self):
+        consultas = [
+            consumos_estadia(self.estadia, self.dias_sin_huesped, modelo)
+            .select_related('producto').order_by('fecha_consumo', 'id')
+            for modelo in tablas_consumo(self.estadia)
+        ]
+        if len(consultas) == 1:
+            return consultas[0]
+        return sorted((c for consulta in consultas for c in consulta), key=lambda c: (c.fecha_consumo, c.id))
+
+
+def calcular_folio(estadia_id, hoy=None):
+    """
+    Folio de la estadía con tres consultas: la estadía con su habitación y huésped, las
+    que compartieron la habitación antes que ella y un único ``aggregate`` sobre sus
+    consumos. Una estadía activa cuenta las noches hasta hoy; una cerrada, hasta su
+    salida. Siempre se cuenta al menos una noche. Si la estadía está archivada se busca
+    allí y se agregan también los consumos archivados.
+    """
+    estadia = Estadia.objects.select_related('habitacion', 'huesped').filter(pk=estadia_id).first()
+    if estadia is None:
+        try:
+            estadia = EstadiaArchivada.objects.select_related('habitacion', 'huesped').get(pk=estadia_id)
+        except EstadiaArchivada.DoesNotExist:
+            raise Estadia.DoesNotExist(f"No existe la estadía {estadia_id}.") from None
+    hoy = hoy or timezone.localdate()
+    salida = como_fecha(estadia.fecha_salida) if estadia.fecha_salida else None
+    desde, hasta = _noches(como_fecha(estadia.fecha_entrada), salida, estadia.activa, hoy)
+    noches_cobradas, dias_sin_huesped = _a_cargo(estadia, hoy)
+    resumenes = [
+        consumos_estadia(estadia, dias_sin_huesped, modelo)
+        .aggregate(total=Sum('precio_total'), lineas=Count('id'), ultimo=Max('id'))
+        for modelo in tablas_consumo(estadia)
+    ]
+    total = sum((resumen['total'] or Decimal('0') for resumen in resumenes), Decimal('0'))
+    lineas = sum(resumen['lineas'] for resumen in resumenes)
+    ultimo = max((resumen['ultimo'] for resumen in resumenes if resumen['ultimo']), default=None)
+    return Folio(estadia, (hasta - desde).days, noches_cobradas, dias_sin_huesped, total, lineas, ultimo)
+
+
+# --------------------------------
+# 📌 Factura en segundo plano
+# --------------------------------
+def generar_factura(estadia_id):
+    """
+    Renderiza la factura HTML de la estadía y la guarda en la caché bajo su versión.
+    """
+    folio = calcular_folio(estadia_id)
+    html = render_to_string('consumos/factura.html', {'folio': folio, 'consumos': folio.detalle()})
+    cache.set(folio.clave_factura, html, TIEMPO_FACTURA)
+    return html
+
+
+def factura_cacheada(folio):
+    return cache.get(folio.clave_factura)
+
+
+def _generar_en_segundo_plano(estadia_id):
+    close_old_connections()
+    try:
+        generar_factura(estadia_id)
+    except Exception:
+        logger.exception("No se pudo generar la factura de la estadía %s", estadia_id)
+    finally:
+        close_old_connections()
+
+
+def encolar_factura(folio):
+    """
+    Programa la factura fuera del ciclo de la petición. Una versión que ya está en cola
+    no se vuelve a encolar; devuelve ``None`` en ese caso.
+    """
+    if not cache.add(f'{folio.clave_factura}:en_cola', True, 60):
+        return None
+    return _executor.submit(_generar_en_segundo_plano, folio.estadia.pk)
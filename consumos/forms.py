@@ -1,8 +1,29 @@
 from django import forms
-from .models import Consumo
+from .models import Consumo, Ticket
 from habitaciones.models import Habitacion
-from django.utils.timezone import now
-from django.db import transaction  # Usamos transacciones para asegurar la coherencia de los datos
+from productos.models import Producto
+from huespedes.models import Estadia, Huesped
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import localdate
+from datetime import timedelta
+from .fechas import inicio_del_dia
+
+def habitaciones_para_consumo():
+    """
+    Habitaciones a las que se puede cargar un consumo: disponibles y sin un huésped
+    cuya fecha de salida ya pasó.
+    """
+    salida_vencida = Estadia.objects.activas().filter(
+        habitacion=OuterRef('pk'), fecha_salida__lt=localdate()
+    )
+    return Habitacion.objects.filter(estado_habitacion='disponible').exclude(Exists(salida_vencida))
+
+
+def validar_huesped_de_habitacion(habitacion, huesped):
+    # Validación de si el huésped pertenece a la habitación seleccionada
+    if habitacion and huesped and huesped.habitacion != habitacion:
+        raise forms.ValidationError("Este huésped no pertenece a la habitación seleccionada.")
+
 
 class ConsumoForm(forms.ModelForm):
     class Meta:
@@ -24,11 +45,7 @@ class ConsumoForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         # Filtrar habitaciones disponibles con huéspedes activos
-        self.fields['habitacion'].queryset = Habitacion.objects.filter(
-            estado_habitacion='disponible'
-        ).exclude(
-            huespedes__fecha_salida__lt=now()  # Excluye las habitaciones cuyo huésped tenga fecha de salida pasada
-        ).distinct()
+        self.fields['habitacion'].queryset = habitaciones_para_consumo()
 
         # Mostrar como "Habitación #101", etc.
         self.fields['habitacion'].label_from_instance = lambda obj: f'Habitación #{obj.numero}'
@@ -52,39 +69,148 @@ class ConsumoForm(forms.ModelForm):
         producto = cleaned_data.get('producto')
         cantidad = cleaned_data.get('cantidad')
 
-        # Validación de si el huésped pertenece a la habitación seleccionada
-        if habitacion and huesped:
-            if huesped.habitacion != habitacion:
-                raise forms.ValidationError("Este huésped no pertenece a la habitación seleccionada.")
+        validar_huesped_de_habitacion(habitacion, huesped)
         
         # Verificación si el producto no está asociado o es None
         if producto is None:
             raise forms.ValidationError("El producto no ha sido seleccionado.")
         
-        # Validación de stock
-        if cantidad is not None and producto.disponible is not None:
-            if cantidad > producto.disponible:
+        # Validación de stock: aviso temprano; el descuento real es el UPDATE condicional
+        # de mover_stock, que también cubre las ventas simultáneas
+        if cantidad is not None:
+            # Al editar, las unidades ya descontadas por este consumo vuelven a contar
+            reservadas = self.instance.cantidad if self.instance.pk and self.instance.producto_id == producto.pk else 0
+            if cantidad > producto.stock + reservadas:
                 raise forms.ValidationError({'cantidad': "No hay suficiente stock del producto."})
-        else:
-            # En caso de que el stock no esté disponible
-            raise forms.ValidationError({'producto': "Producto o stock no disponible."})
 
         return cleaned_data
 
-    def save(self, commit=True):
-        # Usamos una transacción para garantizar que todo se guarde de forma coherente
-        with transaction.atomic():
-            consumo = super().save(commit=False)
 
-            # Actualización del precio total antes de guardar el consumo
-            consumo.precio_total = consumo.total()  # Asegúrate de tener un método `total` en el modelo Consumo que calcule el precio total
+# --------------------------------
+# 📌 Ticket de varias líneas
+# --------------------------------
+class TicketForm(forms.ModelForm):
+    class Meta:
+        model = Ticket
+        fields = ['habitacion', 'huesped', 'observaciones']
+        widgets = {
+            'observaciones': forms.Textarea(attrs={
+                'rows': 2,
+                'placeholder': 'Opcional: detalles del ticket...',
+            }),
+        }
+        labels = {
+            'habitacion': 'Habitación',
+            'huesped': 'Huésped',
+            'observaciones': 'Observaciones',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['habitacion'].queryset = habitaciones_para_consumo()
+        self.fields['habitacion'].label_from_instance = lambda obj: f'Habitación #{obj.numero}'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        validar_huesped_de_habitacion(cleaned_data.get('habitacion'), cleaned_data.get('huesped'))
+        return cleaned_data
+
+
+class LineaTicketForm(forms.Form):
+    # El producto llega como pk: existencia, precio y stock se comprueban para todas las
+    # líneas juntas en registrar_ticket, con una sola consulta
+    producto = forms.TypedChoiceField(label='Producto', coerce=int, empty_value=None)
+    cantidad = forms.IntegerField(label='Cantidad', min_value=1)
 
-            if commit:
-                consumo.save()
+    def __init__(self, *args, productos=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['producto'].choices = [('', 'Seleccione un producto'), *productos]
+
+
+class BaseLineaTicketFormSet(forms.BaseFormSet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Las opciones se consultan una vez para todo el formset, no por línea
+        self.productos = list(Producto.objects.order_by('nombre').values_list('pk', 'nombre'))
+
+    def get_form_kwargs(self, index):
+        return {**super().get_form_kwargs(index), 'productos': self.productos}
+
+    def lineas(self):
+        """
+        Consumos sin guardar, uno por línea completa, en el orden del formset, junto con
+        el formulario de cada uno.
+        """
+        return [
+            (Consumo(producto_id=form.cleaned_data['producto'], cantidad=form.cleaned_data['cantidad']), form)
+            for form in self.forms
+            if form.has_changed() and form.cleaned_data.get('producto')
+        ]
+
+    def clean(self):
+        if any(self.errors):
+            return
+        if not self.lineas():
+            raise forms.ValidationError("El ticket debe tener al menos una línea.")
+
+
+LineaTicketFormSet = forms.formset_factory(
+    LineaTicketForm, formset=BaseLineaTicketFormSet, extra=8, max_num=100, validate_max=True
+)
+
+
+# --------------------------------
+# 📌 Filtros del listado
+# --------------------------------
+class FiltroConsumosForm(forms.Form):
+    """
+    Filtros del listado de consumos. Todos opcionales; el huésped llega por enlace (desde
+    su ficha) y no se ofrece como lista, que serían todos los perfiles. Habitación y
+    producto se eligen por pk entre opciones leídas una vez: validarlos no consulta más.
+    """
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    habitacion = forms.TypedChoiceField(label='Habitación', coerce=int, empty_value=None, required=False)
+    producto = forms.TypedChoiceField(label='Producto', coerce=int, empty_value=None, required=False)
+    huesped = forms.ModelChoiceField(
+        queryset=Huesped.objects.only('nombre', 'apellido'), required=False, widget=forms.HiddenInput
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['habitacion'].choices = [('', 'Todas'), *(
+            (pk, f'Habitación #{numero}') for pk, numero in Habitacion.objects.values_list('pk', 'numero')
+        )]
+        self.fields['producto'].choices = [('', 'Todos'), *Producto.objects.order_by('nombre').values_list('pk', 'nombre')]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get('desde')
+        hasta = cleaned_data.get('hasta')
+        if desde and hasta and hasta < desde:
+            raise forms.ValidationError("La fecha final debe ser igual o posterior a la inicial.")
+        return cleaned_data
 
-                # Actualización del stock del producto
-                if consumo.producto:
-                    consumo.producto.disponible -= consumo.cantidad
-                    consumo.producto.save()
+    def filtrar(self, consumos):
+        """
+        Aplica los filtros válidos a ``consumos``; con filtros inválidos no hay resultados.
+        Las fechas se comparan como rango sobre ``fecha_consumo`` para usar los índices.
+        """
+        if not self.is_bound:
+            return consumos
+        if not self.is_valid():
+            return consumos.none()
+        datos = self.cleaned_data
+        if datos['desde']:
+            consumos = consumos.filter(fecha_consumo__gte=inicio_del_dia(datos['desde']))
+        if datos['hasta']:
+            consumos = consumos.filter(fecha_consumo__lt=inicio_del_dia(datos['hasta'] + timedelta(days=1)))
+        for campo in ('habitacion', 'producto', 'huesped'):
+            if datos[campo]:
+                consumos = consumos.filter(**{campo: datos[campo]})
+        return consumos
 
-            return consumo
+    @property
+    def activo(self):
+        # Hay filtros aplicados (o inválidos): una lista vacía no significa "sin consumos"
+        return self.is_bound and (not self.is_valid() or any(self.cleaned_data.values()))
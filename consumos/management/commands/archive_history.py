@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from consumos.archivo import archivar_consumos
+from huespedes.archivo import TAMANO_LOTE, archivar_estadias, limite_archivo
+
+
+class Command(BaseCommand):
+    help = "Mueve a las tablas de archivo las estadías y los consumos cerrados hace más de N meses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=12, help="Antigüedad mínima, en meses.")
+        parser.add_argument('--batch-size', type=int, default=TAMANO_LOTE, help="Filas por transacción.")
+
+    def handle(self, *args, **options):
+        if options['meses'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--meses y --batch-size deben ser mayores que cero.")
+
+        antes_de = limite_archivo(options['meses'])
+        # Primero las estadías: así las cerradas ya no retienen sus consumos
+        estadias = archivar_estadias(antes_de, options['batch_size'])
+        consumos = archivar_consumos(antes_de, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivadas {estadias} estadías y {consumos} consumos anteriores al {antes_de:%d/%m/%Y}."
+        ))
@@ -0,0 +1,25 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from consumos.ventas import actualizar_ventas
+
+
+class Command(BaseCommand):
+    help = "Resume los consumos nuevos en las tablas de ventas por hora y por día (programarlo, p. ej. cada hora con cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde', type=date.fromisoformat,
+            help="Rehace los resúmenes desde esta fecha (AAAA-MM-DD), p. ej. tras corregir consumos.",
+        )
+
+    def handle(self, *args, **options):
+        desde = options['desde']
+        if desde and desde > timezone.localdate():
+            raise CommandError("--desde no puede ser una fecha futura.")
+        if desde:
+            desde = timezone.make_aware(datetime.combine(desde, datetime.min.time()))
+        filas = actualizar_ventas(desde)
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes de ventas al día: {filas} filas horarias escritas."))
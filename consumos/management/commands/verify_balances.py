@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from consumos.saldos import saldo_real
+from habitaciones.models import Habitacion
+from huespedes.models import Huesped
+
+
+class Command(BaseCommand):
+    help = "Recalcula por lotes los saldos de consumos de habitaciones y huéspedes y reporta desviaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Filas por lote.")
+        parser.add_argument('--corregir', action='store_true', help="Además de reportar, corrige las desviaciones.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size debe ser mayor que cero.")
+
+        desviadas = 0
+        for modelo, campo, nombre in ((Habitacion, 'habitacion', "Habitación"), (Huesped, 'huesped', "Huésped")):
+            revisadas, con_desviacion = self.verificar(modelo, campo, nombre, options['chunk_size'], options['corregir'])
+            desviadas += con_desviacion
+            self.stdout.write(f"{nombre}: {revisadas} revisados, {con_desviacion} con desviación.")
+
+        if desviadas and not options['corregir']:
+            self.stdout.write(self.style.WARNING(f"{desviadas} saldos desviados; use --corregir para recalcularlos."))
+        elif desviadas:
+            self.stdout.write(self.style.SUCCESS(f"{desviadas} saldos corregidos."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin desviaciones."))
+
+    def verificar(self, modelo, campo, nombre, chunk_size, corregir):
+        revisadas = con_desviacion = 0
+        ultimo_id = 0
+        while True:
+            # Saldo guardado y recalculado juntos, en una consulta por lote
+            lote = list(
+                modelo.objects.filter(pk__gt=ultimo_id).order_by('pk')
+                .annotate(real=saldo_real(campo)).values_list('pk', 'saldo_consumos', 'real')[:chunk_size]
+            )
+            if not lote:
+                return revisadas, con_desviacion
+            ultimo_id = lote[-1][0]
+
+            desviadas = []
+            for pk, saldo, real in lote:
+                if saldo != real:
+                    self.stdout.write(f"{nombre} {pk}: {saldo:.2f} -> {real:.2f}")
+                    desviadas.append(pk)
+            if desviadas and corregir:
+                # La suma se repite dentro del UPDATE para no pisar consumos concurrentes
+                modelo.objects.filter(pk__in=desviadas).update(saldo_consumos=saldo_real(campo))
+
+            revisadas += len(lote)
+            con_desviacion += len(desviadas)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0006_alter_consumo_huesped'),
+        ('habitaciones', '0015_nochehabitacion'),
+        ('huespedes', '0009_huesped_indices_estadia'),
+        ('productos', '0005_consumo_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consumo',
+            index=models.Index(fields=['fecha_consumo', 'id'], name='consumos_co_fecha_c_51c0ba_idx'),
+        ),
+    ]
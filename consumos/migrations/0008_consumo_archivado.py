@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0007_consumo_indice_fecha'),
+        ('habitaciones', '0016_tareaaseo_piso'),
+        ('huespedes', '0013_estadia_archivada'),
+        ('productos', '0005_consumo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('fecha_consumo', models.DateTimeField()),
+                ('observaciones', models.TextField(blank=True, null=True)),
+                ('precio_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos_archivados', to='habitaciones.habitacion')),
+                ('huesped', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='consumos_archivados', to='huespedes.huesped')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos_archivados', to='productos.producto')),
+            ],
+            options={
+                'ordering': ['-fecha_consumo'],
+                'indexes': [models.Index(fields=['habitacion', 'fecha_consumo'], name='consumos_co_habitac_466ad2_idx'), models.Index(fields=['fecha_consumo'], name='consumos_co_fecha_c_221e8e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0008_consumo_archivado'),
+        ('habitaciones', '0016_tareaaseo_piso'),
+        ('huespedes', '0013_estadia_archivada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumoarchivado',
+            name='ticket_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Ticket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('observaciones', models.TextField(blank=True, null=True, verbose_name='Observaciones')),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='habitaciones.habitacion', verbose_name='Habitación')),
+                ('huesped', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='huespedes.huesped', verbose_name='Huésped (opcional)')),
+            ],
+            options={
+                'verbose_name': 'Ticket',
+                'verbose_name_plural': 'Tickets',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddField(
+            model_name='consumo',
+            name='ticket',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lineas', to='consumos.ticket', verbose_name='Ticket'),
+        ),
+    ]
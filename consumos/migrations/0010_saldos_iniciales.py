@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_saldos(apps, schema_editor):
+    importe = models.DecimalField(max_digits=12, decimal_places=2)
+    consumos = [apps.get_model('consumos', 'Consumo'), apps.get_model('consumos', 'ConsumoArchivado')]
+    for app, modelo, campo in (('habitaciones', 'Habitacion', 'habitacion'), ('huespedes', 'Huesped', 'huesped')):
+        sumas = [
+            Coalesce(Subquery(
+                tabla.objects.filter(**{campo: OuterRef('pk')}).order_by().values(campo)
+                .annotate(total=Sum('precio_total')).values('total'),
+                output_field=importe,
+            ), Value(0, output_field=importe))
+            for tabla in consumos
+        ]
+        apps.get_model(app, modelo).objects.update(saldo_consumos=sumas[0] + sumas[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0009_ticket'),
+        ('habitaciones', '0017_saldo_consumos'),
+        ('huespedes', '0014_saldo_consumos'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
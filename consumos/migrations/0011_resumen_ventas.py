@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0010_saldos_iniciales'),
+        ('productos', '0007_libro_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_habitacion', models.CharField(choices=[('familiar', 'Familiar'), ('pareja', 'Pareja'), ('suite', 'Suite'), ('individual', 'Individual')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('ingresos', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('consumos', models.PositiveIntegerField()),
+                ('dia', models.DateField()),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='productos.categoria')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'ordering': ['dia'],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'producto', 'tipo_habitacion'), name='venta_dia_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_habitacion', models.CharField(choices=[('familiar', 'Familiar'), ('pareja', 'Pareja'), ('suite', 'Suite'), ('individual', 'Individual')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('ingresos', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('consumos', models.PositiveIntegerField()),
+                ('hora', models.DateTimeField()),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='productos.categoria')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'ordering': ['hora'],
+                'constraints': [models.UniqueConstraint(fields=('hora', 'producto', 'tipo_habitacion'), name='venta_hora_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0011_resumen_ventas'),
+        ('habitaciones', '0017_saldo_consumos'),
+        ('huespedes', '0014_saldo_consumos'),
+        ('productos', '0007_libro_stock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consumo',
+            index=models.Index(fields=['habitacion', 'fecha_consumo'], name='consumos_co_habitac_92ed3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consumo',
+            index=models.Index(fields=['producto', 'fecha_consumo'], name='consumos_co_product_f568c8_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:34
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def marca_inicial(apps, schema_editor):
+    # Los resúmenes ya escritos llegan hasta la hora siguiente a la última con ventas
+    VentaHora = apps.get_model('consumos', 'VentaHora')
+    MarcaVentas = apps.get_model('consumos', 'MarcaVentas')
+    ultima = VentaHora.objects.aggregate(ultima=Max('hora'))['ultima']
+    if ultima is not None:
+        MarcaVentas.objects.create(pk=1, hasta=ultima + timedelta(hours=1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumos', '0012_indices_listado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hasta', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(marca_inicial, migrations.RunPython.noop),
+    ]
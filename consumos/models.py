@@ -3,18 +3,32 @@ from django.forms import ValidationError
 from habitaciones.models import Habitacion
 from huespedes.models import Huesped
 from django.core.validators import MinValueValidator
-from productos.models import Producto
+from productos.models import Categoria, Producto
 
-from rest_framework import viewsets
-from .serializers import HuespedSerializer
 
+# MODELO DE TICKET (varios consumos cargados de una vez)
 
-# MODELO DE CONSUMO
+class Ticket(models.Model):
+    """
+    Cuenta de varias líneas (una cena, una ronda en el bar) cargada a una habitación en
+    una sola operación. Cada línea es un ``Consumo``.
+    """
+    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name='tickets', verbose_name="Habitación")
+    huesped = models.ForeignKey(Huesped, on_delete=models.CASCADE, null=True, blank=True, related_name='tickets', verbose_name="Huésped (opcional)")
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Total")
+    observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones")
 
-class HuespedViewSet(viewsets.ModelViewSet):
-    queryset = Huesped.objects.all()
-    serializer_class = HuespedSerializer
+    class Meta:
+        verbose_name = "Ticket"
+        verbose_name_plural = "Tickets"
+        ordering = ['-fecha']
 
+    def __str__(self):
+        return f"Ticket {self.pk} · Habitación {self.habitacion.numero} · ${self.total}"
+
+
+# MODELO DE CONSUMO
 
 class Consumo(models.Model):
     """
@@ -29,11 +43,20 @@ class Consumo(models.Model):
     
     # Campo calculado para el total del consumo, opcional
     precio_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Total del Consumo")
+    ticket = models.ForeignKey(Ticket, on_delete=models.SET_NULL, null=True, blank=True, related_name='lineas', verbose_name="Ticket")
 
     class Meta:
         verbose_name = "Consumo"
         verbose_name_plural = "Consumos"
         ordering = ['-fecha_consumo']
+        indexes = [
+            # Paginación keyset del listado: (-fecha_consumo, -id) recorre este índice al revés
+            models.Index(fields=['fecha_consumo', 'id']),
+            # Listado filtrado por habitación o producto (y el folio de una habitación): el
+            # rango de fechas y el orden salen del índice sin ordenar aparte
+            models.Index(fields=['habitacion', 'fecha_consumo']),
+            models.Index(fields=['producto', 'fecha_consumo']),
+        ]
 
     def total(self):
         """
@@ -43,17 +66,11 @@ class Consumo(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Sobreescribir el método save para calcular el precio total antes de guardar el objeto
-        y actualizar el stock del producto, si la instancia es nueva.
-
-        Nota: Esta lógica actualiza el stock solo en la creación de un consumo.
-        Si se permiten ediciones o eliminaciones, se debe complementar esta lógica.
+        Calcula el precio total al crear el consumo. El stock no se toca aquí: lo mueven
+        registrar_consumo, modificar_consumo y eliminar_consumo (consumos/services.py).
         """
         if not self.pk:  # Si es una nueva instancia
             self.precio_total = self.total()
-            # Supone que el campo 'disponible' en Producto es numérico y representa el stock
-            self.producto.disponible -= self.cantidad
-            self.producto.save()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -67,7 +84,89 @@ class Consumo(models.Model):
     def clean(self):
         """
         Validación personalizada para asegurar que la cantidad consumida no supere el stock disponible.
+        Solo para consumos nuevos: al editar, las unidades ya descontadas siguen contando
+        (lo resuelve ConsumoForm) y el límite real lo pone el UPDATE condicional de mover_stock.
         """
         super().clean()
-        if self.producto and self.cantidad > self.producto.disponible:
+        if not self.pk and self.producto_id and self.cantidad > self.producto.stock:
             raise ValidationError({'cantidad': "No hay suficiente stock del producto."})
+
+
+# CONSUMOS ARCHIVADOS (ver consumos/archivo.py)
+
+class ConsumoArchivado(models.Model):
+    """
+    Consumo antiguo movido fuera de la tabla de trabajo, con su ``id`` original. Ya no
+    descuenta ni devuelve stock: solo se lee en reportes.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name='consumos_archivados')
+    huesped = models.ForeignKey(Huesped, on_delete=models.CASCADE, null=True, blank=True, related_name='consumos_archivados')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='consumos_archivados')
+    cantidad = models.PositiveIntegerField()
+    fecha_consumo = models.DateTimeField()
+    observaciones = models.TextField(blank=True, null=True)
+    precio_total = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sin FK: el ticket sigue en la tabla de trabajo
+    ticket_id = models.BigIntegerField(null=True, blank=True)
+    archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha_consumo']
+        indexes = [
+            models.Index(fields=['habitacion', 'fecha_consumo']),
+            models.Index(fields=['fecha_consumo']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.nombre} x{self.cantidad} en Habitación {self.habitacion.numero} (archivado)"
+
+
+# RESÚMENES DE VENTAS (ver consumos/ventas.py)
+
+class ResumenVentas(models.Model):
+    """
+    Ventas de un producto a habitaciones de un tipo en un período. Solo las escribe
+    ``actualizar_ventas``; los tableros leen de aquí en vez de recorrer los consumos.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    # Categoría del producto al resumir: se agrupa por ella sin unir con productos
+    categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    tipo_habitacion = models.CharField(max_length=20, choices=Habitacion.TIPOS_HABITACION)
+    cantidad = models.PositiveIntegerField()
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2)
+    consumos = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class VentaHora(ResumenVentas):
+    hora = models.DateTimeField()
+
+    class Meta:
+        ordering = ['hora']
+        constraints = [
+            models.UniqueConstraint(fields=['hora', 'producto', 'tipo_habitacion'], name='venta_hora_unica'),
+        ]
+
+
+class VentaDia(ResumenVentas):
+    dia = models.DateField()
+
+    class Meta:
+        ordering = ['dia']
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'producto', 'tipo_habitacion'], name='venta_dia_unica'),
+        ]
+
+
+class MarcaVentas(models.Model):
+    """
+    Hasta dónde llegan los resúmenes de ventas, en una sola fila (``pk=1``). Se avanza en
+    la misma transacción que cada ventana resumida, aunque en ella no haya habido ventas.
+    """
+    hasta = models.DateTimeField()
+
+    def __str__(self):
+        return f"Ventas resumidas hasta {self.hasta}"
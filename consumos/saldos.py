@@ -0,0 +1,69 @@
+from collections import Counter
+
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from habitaciones.models import Habitacion
+from huespedes.models import Huesped
+from .models import Consumo, ConsumoArchivado
+
+IMPORTE = DecimalField(max_digits=12, decimal_places=2)
+
+
+# --------------------------------
+# 📌 Movimientos de saldo
+# --------------------------------
+def _sumar(modelo, importes):
+    importes = {pk: importe for pk, importe in importes.items() if pk and importe}
+    if not importes:
+        return
+    delta = Case(
+        *(When(pk=pk, then=Value(importe, output_field=IMPORTE)) for pk, importe in importes.items()),
+        default=Value(0, output_field=IMPORTE),
+    )
+    modelo.objects.filter(pk__in=importes).update(saldo_consumos=F('saldo_consumos') + delta)
+
+
+def mover_saldos(movimientos):
+    """
+    Aplica ``(habitacion_id, huesped_id, importe)`` a los saldos de consumos: un UPDATE
+    agrupado con ``F()`` para las habitaciones y otro para los huéspedes, sin leer el
+    saldo antes. Se llama dentro de la transacción que crea, edita o borra los consumos.
+    """
+    por_habitacion, por_huesped = Counter(), Counter()
+    for habitacion_id, huesped_id, importe in movimientos:
+        por_habitacion[habitacion_id] += importe
+        por_huesped[huesped_id] += importe
+    _sumar(Habitacion, por_habitacion)
+    _sumar(Huesped, por_huesped)
+
+
+def descontar_consumos(**filtro):
+    """
+    Resta de los saldos los consumos, vigentes y archivados, que cumplen ``filtro``:
+    los que se van a borrar en cascada con su habitación, huésped o producto.
+    """
+    for modelo in (Consumo, ConsumoArchivado):
+        mover_saldos(
+            (habitacion_id, huesped_id, -total)
+            for habitacion_id, huesped_id, total in modelo.objects.filter(**filtro).order_by()
+            .values_list('habitacion_id', 'huesped_id').annotate(total=Sum('precio_total'))
+        )
+
+
+# --------------------------------
+# 📌 Recalcular desde los consumos
+# --------------------------------
+def saldo_real(campo):
+    """
+    Expresión con la suma de precio_total de los consumos, vigentes y archivados, cuyo
+    ``campo`` (``'habitacion'`` o ``'huesped'``) es la fila exterior.
+    """
+    def suma(modelo):
+        return Coalesce(Subquery(
+            modelo.objects.filter(**{campo: OuterRef('pk')}).order_by().values(campo)
+            .annotate(total=Sum('precio_total')).values('total'),
+            output_field=IMPORTE,
+        ), Value(0, output_field=IMPORTE))
+
+    return suma(Consumo) + suma(ConsumoArchivado)
@@ -1,6 +1,10 @@
 from django.apps import apps
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
+from .forms import validar_huesped_de_habitacion
+from .models import Ticket
+
 class HuespedSerializer(serializers.ModelSerializer):
     class Meta:
         # Establecer un modelo vacío primero
@@ -11,3 +15,27 @@ class HuespedSerializer(serializers.ModelSerializer):
         super().__init__(*args, **kwargs)
         # Cargar el modelo correctamente cuando se inicializa el serializador
         self.Meta.model = apps.get_model('consumos', 'Consumo')
+
+
+class LineaTicketSerializer(serializers.Serializer):
+    # Solo el pk: existencia, precio y stock se validan para todo el ticket en una consulta
+    id = serializers.IntegerField(read_only=True)
+    producto = serializers.IntegerField(source='producto_id', min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+    precio_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+
+class TicketSerializer(serializers.ModelSerializer):
+    lineas = LineaTicketSerializer(many=True, allow_empty=False, max_length=100)
+
+    class Meta:
+        model = Ticket
+        fields = ['id', 'habitacion', 'huesped', 'fecha', 'total', 'observaciones', 'lineas']
+        read_only_fields = ['fecha', 'total']
+
+    def validate(self, attrs):
+        try:
+            validar_huesped_de_habitacion(attrs.get('habitacion'), attrs.get('huesped'))
+        except DjangoValidationError as error:
+            raise serializers.ValidationError({'huesped': error.messages})
+        return attrs
@@ -0,0 +1,163 @@
+from collections import Counter
+
+from django.db import transaction
+
+from productos.models import MovimientoStock, Producto
+from productos.stock import StockInsuficiente, mover_stock, mover_stock_lote
+from .models import Consumo
+from .saldos import mover_saldos
+
+# Campos que una edición puede cambiar; la fecha del consumo no se toca
+CAMPOS_EDITABLES = ('habitacion_id', 'huesped_id', 'producto_id', 'cantidad', 'observaciones', 'precio_total')
+# Lo que se relee antes de editar o borrar: de ello dependen el stock y los saldos
+CAMPOS_LEIDOS = ('habitacion_id', 'huesped_id', 'producto_id', 'cantidad', 'precio_total')
+
+
+class ConsumoModificado(Exception):
+    """
+    El consumo cambió o se eliminó mientras se editaba; no se aplicó nada.
+    """
+
+    def __init__(self):
+        super().__init__("El consumo cambió mientras se editaba. Vuelva a intentarlo.")
+
+
+def _como_se_leyo(consumo_id):
+    return Consumo.objects.filter(pk=consumo_id).values(*CAMPOS_LEIDOS).first()
+
+
+def _importe(fila, signo=1):
+    return fila['habitacion_id'], fila['huesped_id'], signo * fila['precio_total']
+
+
+def registrar_consumo(consumo):
+    """
+    Guarda un consumo nuevo, descuenta su cantidad del stock y suma su importe a los
+    saldos de la habitación y el huésped, en la misma transacción. Sin stock suficiente
+    lanza ``StockInsuficiente`` y no se guarda nada.
+    """
+    try:
+        with transaction.atomic():
+            consumo.precio_total = consumo.total()
+            consumo.save()
+            mover_stock(consumo.producto_id, -consumo.cantidad, MovimientoStock.VENTA, consumo.pk)
+            mover_saldos([(consumo.habitacion_id, consumo.huesped_id, consumo.precio_total)])
+    except StockInsuficiente:
+        # El INSERT se revirtió: el objeto vuelve a ser nuevo para el formulario
+        consumo.pk = None
+        raise
+    return consumo
+
+
+def modificar_consumo(consumo):
+    """
+    Guarda los cambios de ``consumo`` y corrige el stock: la diferencia de cantidad o,
+    si cambió el producto, devuelve al anterior y descuenta del nuevo. Los saldos pierden
+    el importe anterior y ganan el nuevo. El UPDATE del consumo va primero y solo aplica
+    si sigue como se leyó: dos ediciones simultáneas no corrigen el stock ni los saldos
+    dos veces (la segunda recibe ``ConsumoModificado``).
+    """
+    with transaction.atomic():
+        anterior = _como_se_leyo(consumo.pk)
+        consumo.precio_total = consumo.total()
+        cambios = {campo: getattr(consumo, campo) for campo in CAMPOS_EDITABLES}
+        if anterior is None or not Consumo.objects.filter(pk=consumo.pk, **anterior).update(**cambios):
+            raise ConsumoModificado()
+        if anterior['producto_id'] == consumo.producto_id:
+            diferencia = anterior['cantidad'] - consumo.cantidad
+            tipo = MovimientoStock.REVERSION if diferencia > 0 else MovimientoStock.VENTA
+            mover_stock(consumo.producto_id, diferencia, tipo, consumo.pk)
+        else:
+            mover_stock(anterior['producto_id'], anterior['cantidad'], MovimientoStock.REVERSION, consumo.pk)
+            mover_stock(consumo.producto_id, -consumo.cantidad, MovimientoStock.VENTA, consumo.pk)
+        mover_saldos([_importe(anterior, -1), _importe(cambios)])
+    return consumo
+
+
+def eliminar_consumo(consumo):
+    """
+    Elimina el consumo, devuelve sus unidades al stock y resta su importe de los saldos.
+    Se devuelve lo que realmente se borró, aunque otra edición haya cambiado la cantidad
+    desde que se cargó ``consumo``.
+    """
+    with transaction.atomic():
+        anterior = _como_se_leyo(consumo.pk)
+        if anterior is None or not Consumo.objects.filter(pk=consumo.pk, **anterior).delete()[0]:
+            raise ConsumoModificado()
+        mover_stock(anterior['producto_id'], anterior['cantidad'], MovimientoStock.REVERSION, consumo.pk)
+        mover_saldos([_importe(anterior, -1)])
+
+
+# --------------------------------
+# 📌 Tickets de varias líneas
+# --------------------------------
+class TicketInvalido(Exception):
+    """
+    Alguna línea del ticket no puede cargarse. ``errores`` va alineada con las líneas:
+    un diccionario ``{campo: [mensajes]}`` por línea, vacío si está bien.
+    """
+
+    def __init__(self, errores):
+        super().__init__("El ticket tiene líneas inválidas.")
+        self.errores = errores
+
+
+def _validar_lineas(lineas, errores):
+    """
+    Un solo SELECT para todos los productos del ticket: que existan y que su stock alcance
+    para la suma de sus líneas. Devuelve ``{pk: producto}``.
+    """
+    pedidos = Counter()
+    for linea in lineas:
+        pedidos[linea.producto_id] += linea.cantidad
+    productos = Producto.objects.only('nombre', 'precio', 'stock').in_bulk(pedidos)
+    for error, linea in zip(errores, lineas):
+        producto = productos.get(linea.producto_id)
+        if producto is None:
+            error['producto'] = ["El producto no existe."]
+        elif pedidos[producto.pk] > producto.stock:
+            error['cantidad'] = [
+                f"Quedan {producto.stock} unidad(es) de {producto.nombre} y el ticket pide {pedidos[producto.pk]}."
+            ]
+    return productos
+
+
+def registrar_ticket(ticket, lineas):
+    """
+    Carga ``ticket`` (sin guardar, con su habitación y huésped) con sus ``lineas``:
+    consumos sin guardar con ``producto_id`` y ``cantidad``. Los productos se validan y
+    se cotizan con una consulta; el ticket, las líneas (``bulk_create``), el stock (un
+    UPDATE agrupado), el libro y los saldos se escriben en una transacción, todo o nada.
+    El número de consultas no depende de cuántas líneas tenga. Lanza ``TicketInvalido``.
+    """
+    errores = [{} for _ in lineas]
+    productos = _validar_lineas(lineas, errores)
+    if any(errores):
+        raise TicketInvalido(errores)
+
+    for linea in lineas:
+        linea.habitacion_id = ticket.habitacion_id
+        linea.huesped_id = ticket.huesped_id
+        linea.precio_total = productos[linea.producto_id].precio * linea.cantidad
+    ticket.total = sum(linea.precio_total for linea in lineas)
+    try:
+        with transaction.atomic():
+            ticket.save()
+            for linea in lineas:
+                linea.ticket = ticket
+            Consumo.objects.bulk_create(lineas)
+            mover_stock_lote(
+                [(linea.producto_id, -linea.cantidad, linea.pk) for linea in lineas], MovimientoStock.VENTA
+            )
+            mover_saldos([(ticket.habitacion_id, ticket.huesped_id, ticket.total)])
+    except StockInsuficiente:
+        # Otra venta se cruzó tras la validación: ya revertido el ticket, se lee el stock
+        # real para explicar qué línea no alcanza
+        ticket.pk = None
+        for linea in lineas:
+            linea.pk = None
+        _validar_lineas(lineas, errores)
+        if not any(errores):
+            raise
+        raise TicketInvalido(errores)
+    return ticket
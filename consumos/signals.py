@@ -0,0 +1,24 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from habitaciones.models import Habitacion
+from huespedes.models import Huesped
+from productos.models import Producto
+from .saldos import descontar_consumos
+
+
+# Borrar una habitación, un huésped o un producto arrastra sus consumos en cascada: sus
+# importes salen también del saldo de la otra parte (el huésped o la habitación)
+@receiver(pre_delete, sender=Habitacion)
+def descontar_consumos_habitacion(sender, instance, **kwargs):
+    descontar_consumos(habitacion=instance)
+
+
+@receiver(pre_delete, sender=Huesped)
+def descontar_consumos_huesped(sender, instance, **kwargs):
+    descontar_consumos(huesped=instance)
+
+
+@receiver(pre_delete, sender=Producto)
+def descontar_consumos_producto(sender, instance, **kwargs):
+    descontar_consumos(producto=instance)
@@ -1,3 +1,520 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from habitaciones.models import Habitacion
+from habitaciones.pruebas import alojar, nuevo_huesped
+from habitaciones.services import registrar_huesped, retirar_huesped
+from huespedes.models import Estadia, Huesped
+from productos.models import Categoria, MovimientoStock, Producto
+from productos.stock import StockInsuficiente
+from .archivo import archivar_consumos
+from .folio import calcular_folio, generar_factura
+from . import services as services_consumos
+from .models import Consumo, Ticket, VentaDia, VentaHora
+from .ventas import actualizar_ventas, marca_ventas
+from .services import TicketInvalido, eliminar_consumo, modificar_consumo, registrar_consumo, registrar_ticket
+
+
+class FolioTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.habitacion = Habitacion.objects.create(numero='121', tipo='pareja', precio=100, capacidad=2)
+        otra = Habitacion.objects.create(numero='122', tipo='pareja', precio=100, capacidad=2)
+        self.hoy = timezone.localdate()
+        self.estadia = registrar_huesped(self.habitacion, nuevo_huesped('f1'), fecha_entrada=self.hoy - timedelta(days=3))
+        companero = registrar_huesped(self.habitacion, nuevo_huesped('f2')).huesped
+        self.producto = Producto.objects.create(nombre='Cerveza', precio=Decimal('12.50'))
+        self.cargar(self.habitacion, self.estadia.huesped, 2)
+        self.cargar(self.habitacion, None, 1)
+        self.cargar(self.habitacion, companero, 5)
+        self.cargar(otra, None, 7)
+
+    def cargar(self, habitacion, huesped, cantidad=1):
+        Consumo.objects.create(habitacion=habitacion, huesped=huesped, producto=self.producto, cantidad=cantidad)
+
+    def test_totales_con_una_agregacion(self):
+        with self.assertNumQueries(3):
+            folio = calcular_folio(self.estadia.pk)
+        self.assertEqual((folio.noches, folio.alojamiento), (3, 300))
+        self.assertEqual((folio.lineas, folio.consumos), (2, Decimal('37.50')))
+        self.assertEqual(folio.total, Decimal('337.50'))
+        self.assertEqual([c.cantidad for c in folio.detalle()], [2, 1])
+
+    def test_habitacion_compartida_se_cobra_una_vez(self):
+        habitacion = Habitacion.objects.create(numero='123', tipo='pareja', precio=100, capacidad=2)
+        entrada = self.hoy - timedelta(days=2)
+        estadias = [registrar_huesped(habitacion, nuevo_huesped(s), fecha_entrada=entrada) for s in ('f3', 'f4')]
+        cena = Producto.objects.create(nombre='Cena', precio=50)
+        Consumo.objects.create(habitacion=habitacion, producto=cena, cantidad=1)
+        titular, companero = (calcular_folio(estadia.pk) for estadia in estadias)
+        self.assertEqual((titular.noches_cobradas, titular.alojamiento, titular.total), (2, 200, 250))
+        self.assertEqual((companero.noches, companero.alojamiento, companero.total), (2, 0, 0))
+        self.assertEqual([c.cantidad for c in companero.detalle()], [])
+        self.assertTrue(companero.compartida)
+        with mock.patch('consumos.views.encolar_factura'):
+            respuesta = self.client.get(reverse('consumos:folio_estadia', args=[estadias[1].pk]))
+        self.assertContains(respuesta, 'compartida')
+
+    def test_companero_que_se_queda_paga_las_noches_siguientes(self):
+        habitacion = Habitacion.objects.create(numero='124', tipo='pareja', precio=100, capacidad=2)
+        entrada = date(2026, 5, 1)
+        alojar(habitacion, entrada, date(2026, 5, 3), numero_documento='c-1', correo_electronico='c1@example.com')
+        queda = alojar(habitacion, entrada, date(2026, 5, 4), numero_documento='c-2', correo_electronico='c2@example.com')
+        Estadia.objects.filter(habitacion=habitacion).update(activa=False)
+        folio = calcular_folio(queda.pk)
+        self.assertEqual((folio.noches, folio.noches_cobradas, folio.alojamiento), (3, 1, 100))
+
+    def test_version_cambia_con_cargos_y_salida(self):
+        version = calcular_folio(self.estadia.pk).version
+        self.assertEqual(calcular_folio(self.estadia.pk).version, version)
+        self.cargar(self.habitacion, self.estadia.huesped)
+        nueva = calcular_folio(self.estadia.pk).version
+        self.assertNotEqual(nueva, version)
+        retirar_huesped(self.estadia.huesped)
+        self.assertNotEqual(calcular_folio(self.estadia.pk).version, nueva)
+
+    def test_factura_se_genera_fuera_de_la_peticion(self):
+        url = reverse('consumos:factura_estadia', args=[self.estadia.pk])
+        with mock.patch('consumos.views.encolar_factura') as encolar:
+            self.assertContains(self.client.get(reverse('consumos:folio_estadia', args=[self.estadia.pk])), 'Cerveza')
+            pendiente = self.client.get(url)
+        self.assertEqual(pendiente.status_code, 202)
+        self.assertEqual(encolar.call_count, 2)
+
+        generar_factura(self.estadia.pk)
+        with self.assertNumQueries(3):
+            factura = self.client.get(url)
+        self.assertEqual(factura['Content-Disposition'], f'attachment; filename="factura-{self.estadia.pk}.html"')
+        self.assertContains(factura, '$337.50')
+        self.assertEqual(self.client.get(reverse('consumos:folio_estadia', args=[999999])).status_code, 404)
+
+
+class StockConsumosTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='161', tipo='pareja', precio=100, capacidad=2)
+        self.producto = Producto.objects.create(nombre='Gaseosa', precio=Decimal('4.00'), stock=10)
+        self.otro = Producto.objects.create(nombre='Maní', precio=Decimal('2.00'), stock=10)
+
+    def stock(self, producto=None):
+        return Producto.objects.values_list('stock', flat=True).get(pk=(producto or self.producto).pk)
+
+    def datos(self, **cambios):
+        datos = {'habitacion': self.habitacion.pk, 'producto': self.producto.pk, 'cantidad': 3}
+        datos.update(cambios)
+        return datos
+
+    def test_crear_descuenta_una_sola_vez(self):
+        respuesta = self.client.post(reverse('consumos:consumo_create'), self.datos())
+        self.assertRedirects(respuesta, reverse('consumos:consumo_list'), fetch_redirect_response=False)
+        self.assertEqual(self.stock(), 7)
+        self.assertEqual(Consumo.objects.get().precio_total, Decimal('12.00'))
+
+    def test_sin_stock_no_guarda_nada(self):
+        respuesta = self.client.post(reverse('consumos:consumo_create'), self.datos(cantidad=11))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('cantidad', respuesta.context['form'].errors)
+        # El objeto en memoria cree que hay stock: decide el UPDATE condicional
+        Producto.objects.filter(pk=self.producto.pk).update(stock=2)
+        with self.assertRaises(StockInsuficiente):
+            registrar_consumo(Consumo(habitacion=self.habitacion, producto=self.producto, cantidad=3))
+        self.assertEqual((self.stock(), Consumo.objects.count()), (2, 0))
+
+    def test_editar_aplica_la_diferencia(self):
+        consumo = registrar_consumo(Consumo(habitacion=self.habitacion, producto=self.producto, cantidad=3))
+        url = reverse('consumos:consumo_update', args=[consumo.pk])
+        respuesta = self.client.post(url, self.datos(cantidad=5))
+        self.assertRedirects(respuesta, reverse('consumos:consumo_detail', args=[consumo.pk]), fetch_redirect_response=False)
+        self.assertEqual(self.stock(), 5)
+        # Con 5 descontados por este consumo, caben hasta 10
+        self.assertEqual(self.client.post(url, self.datos(cantidad=10)).status_code, 302)
+        self.assertEqual(self.stock(), 0)
+
+        self.client.post(url, self.datos(producto=self.otro.pk, cantidad=4))
+        self.assertEqual((self.stock(), self.stock(self.otro)), (10, 6))
+        self.assertEqual(Consumo.objects.get().precio_total, Decimal('8.00'))
+
+    def test_eliminar_devuelve_lo_descontado(self):
+        consumo = registrar_consumo(Consumo(habitacion=self.habitacion, producto=self.producto, cantidad=3))
+        respuesta = self.client.post(reverse('consumos:consumo_delete', args=[consumo.pk]))
+        self.assertRedirects(respuesta, reverse('consumos:consumo_list'), fetch_redirect_response=False)
+        self.assertEqual((self.stock(), Consumo.objects.count()), (10, 0))
+
+
+class StockConcurrenteTests(TransactionTestCase):
+    HILOS = 8
+    STOCK = 30
+
+    def test_ventas_ediciones_y_bajas_simultaneas(self):
+        habitacion = Habitacion.objects.create(numero='162', tipo='pareja', precio=100, capacidad=2)
+        producto = Producto.objects.create(nombre='Café', precio=Decimal('3.00'), stock=self.STOCK)
+        barrera = threading.Barrier(self.HILOS)
+        terminados = []
+
+        def reintentar(operacion, *args):
+            for intento in range(400):
+                try:
+                    return operacion(*args)
+                except OperationalError:
+                    # SQLite bloquea escrituras simultáneas; se reintenta
+                    time.sleep(0.001 * (intento % 10 + 1))
+            raise AssertionError("Demasiados reintentos")
+
+        def cliente(i):
+            try:
+                barrera.wait()
+                for ronda in range(6):
+                    try:
+                        consumo = reintentar(registrar_consumo, Consumo(habitacion=habitacion, producto=producto, cantidad=2))
+                    except StockInsuficiente:
+                        continue
+                    consumo.cantidad = 1 + (i + ronda) % 3
+                    try:
+                        reintentar(modificar_consumo, consumo)
+                    except StockInsuficiente:
+                        pass
+                    if ronda % 2:
+                        reintentar(eliminar_consumo, consumo)
+            finally:
+                terminados.append(i)
+                connections.close_all()
+
+        hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        producto.refresh_from_db()
+        vendidas = sum(Consumo.objects.values_list('cantidad', flat=True))
+        self.assertEqual(len(terminados), self.HILOS)
+        # Nunca negativo y sin deriva: lo que queda más lo vendido es el stock inicial
+        self.assertGreaterEqual(producto.stock, 0)
+        self.assertEqual(producto.stock + vendidas, self.STOCK)
+        self.assertEqual(sum(producto.movimientos.values_list('cantidad', flat=True)), producto.stock)
+        self.assertTrue(Consumo.objects.exists())
+
+
+class TicketTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='181', tipo='pareja', precio=100, capacidad=2)
+        self.productos = [
+            Producto.objects.create(nombre=f'Plato {n}', precio=Decimal(n), stock=20) for n in range(1, 9)
+        ]
+
+    def lineas(self, n, cantidad=2):
+        return [Consumo(producto_id=producto.pk, cantidad=cantidad) for producto in self.productos[:n]]
+
+    def test_consultas_no_dependen_de_las_lineas(self):
+        consultas = []
+        for n in (2, 8):
+            with CaptureQueriesContext(connection) as contexto:
+                registrar_ticket(Ticket(habitacion=self.habitacion), self.lineas(n))
+            consultas.append(len(contexto))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_ticket_descuenta_y_cotiza_cada_linea(self):
+        lineas = self.lineas(3) + [Consumo(producto_id=self.productos[0].pk, cantidad=1)]
+        ticket = registrar_ticket(Ticket(habitacion=self.habitacion), lineas)
+        self.assertEqual(ticket.total, Decimal('13'))
+        self.assertEqual(
+            sorted(ticket.lineas.values_list('producto__nombre', 'precio_total')),
+            [('Plato 1', Decimal('1')), ('Plato 1', Decimal('2')), ('Plato 2', Decimal('4')), ('Plato 3', Decimal('6'))],
+        )
+        stock = dict(Producto.objects.values_list('nombre', 'stock'))
+        self.assertEqual((stock['Plato 1'], stock['Plato 2'], stock['Plato 4']), (17, 18, 20))
+        ventas = MovimientoStock.objects.filter(tipo=MovimientoStock.VENTA)
+        self.assertEqual(set(ventas.values_list('consumo_id', flat=True)), {linea.pk for linea in lineas})
+        for producto in Producto.objects.all():
+            self.assertEqual(producto.movimientos.aggregate(total=Sum('cantidad'))['total'], producto.stock)
+
+    def test_sin_stock_explica_la_linea_y_no_escribe(self):
+        lineas = self.lineas(2) + [Consumo(producto_id=self.productos[0].pk, cantidad=19), Consumo(producto_id=0, cantidad=1)]
+        with self.assertRaises(TicketInvalido) as error:
+            registrar_ticket(Ticket(habitacion=self.habitacion), lineas)
+        errores = error.exception.errores
+        self.assertEqual(errores[0], errores[2])
+        self.assertIn('ticket pide 21', errores[0]['cantidad'][0])
+        self.assertEqual((errores[1], list(errores[3])), ({}, ['producto']))
+
+        # Otra venta se cruza después de validar: el UPDATE agrupado decide y se revierte todo
+        validar = services_consumos._validar_lineas
+        llamadas = []
+
+        def validar_y_cruzar(lineas, errores):
+            productos = validar(lineas, errores)
+            if not llamadas:
+                Producto.objects.filter(pk=self.productos[1].pk).update(stock=1)
+            llamadas.append(errores)
+            return productos
+
+        with mock.patch('consumos.services._validar_lineas', validar_y_cruzar):
+            with self.assertRaises(TicketInvalido) as error:
+                registrar_ticket(Ticket(habitacion=self.habitacion), self.lineas(2))
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual((error.exception.errores[0], list(error.exception.errores[1])), ({}, ['cantidad']))
+        self.assertEqual((Ticket.objects.count(), Consumo.objects.count()), (0, 0))
+        self.assertFalse(MovimientoStock.objects.filter(tipo=MovimientoStock.VENTA).exists())
+        self.assertEqual(Producto.objects.get(pk=self.productos[0].pk).stock, 20)
+
+    def test_formulario_y_api(self):
+        alojado = alojar(self.habitacion, nombre='Tina', apellido='Ruiz', numero_documento='t-1')
+        datos = {
+            'habitacion': self.habitacion.pk, 'huesped': alojado.huesped.pk,
+            'lineas-TOTAL_FORMS': 8, 'lineas-INITIAL_FORMS': 0,
+            'lineas-0-producto': self.productos[0].pk, 'lineas-0-cantidad': 3,
+            'lineas-1-producto': self.productos[1].pk, 'lineas-1-cantidad': 25,
+        }
+        self.assertContains(self.client.get(reverse('consumos:ticket_create')), 'lineas-7-producto')
+        respuesta = self.client.post(reverse('consumos:ticket_create'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('cantidad', respuesta.context['lineas_formset'].forms[1].errors)
+
+        datos['lineas-1-cantidad'] = 5
+        respuesta = self.client.post(reverse('consumos:ticket_create'), datos)
+        self.assertRedirects(respuesta, reverse('consumos:consumo_list'), fetch_redirect_response=False)
+        ticket = Ticket.objects.get()
+        self.assertEqual((ticket.total, ticket.lineas.filter(huesped=alojado.huesped).count()), (Decimal('13'), 2))
+
+        url = reverse('consumos:ticket-list')
+        cuerpo = {'habitacion': self.habitacion.pk, 'lineas': [{'producto': self.productos[2].pk, 'cantidad': 30}]}
+        respuesta = self.client.post(url, cuerpo, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('cantidad', respuesta.json()['lineas'][0])
+        cuerpo['lineas'][0]['cantidad'] = 2
+        respuesta = self.client.post(url, cuerpo, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.json()['total'], respuesta.json()['lineas'][0]['precio_total']), ('6.00', '6.00'))
+
+
+class SaldosConsumoTests(TestCase):
+    def setUp(self):
+        self.a = Habitacion.objects.create(numero='191', tipo='pareja', precio=100, capacidad=2)
+        self.b = Habitacion.objects.create(numero='192', tipo='pareja', precio=100, capacidad=2)
+        self.huesped = alojar(self.a, nombre='Saldo', apellido='Uno', numero_documento='sal-1').huesped
+        self.cafe = Producto.objects.create(nombre='Café', precio=Decimal('3.50'), stock=50)
+        self.pan = Producto.objects.create(nombre='Pan dulce', precio=Decimal('2.00'), stock=50)
+
+    def saldos(self):
+        habitaciones = dict(Habitacion.objects.values_list('numero', 'saldo_consumos'))
+        return habitaciones['191'], habitaciones['192'], Huesped.objects.get(pk=self.huesped.pk).saldo_consumos
+
+    def consumo(self, **datos):
+        datos = {'habitacion': self.a, 'huesped': self.huesped, 'producto': self.cafe, 'cantidad': 2, **datos}
+        return registrar_consumo(Consumo(**datos))
+
+    def test_crear_editar_y_borrar_mueven_los_saldos(self):
+        consumo = self.consumo()
+        self.consumo(huesped=None, producto=self.pan, cantidad=1)
+        self.assertEqual(self.saldos(), (Decimal('9'), 0, Decimal('7')))
+
+        consumo.cantidad = 4
+        modificar_consumo(consumo)
+        self.assertEqual(self.saldos(), (Decimal('16'), 0, Decimal('14')))
+        # Cambiar de habitación y de huésped mueve el importe de una cuenta a la otra
+        consumo.habitacion, consumo.huesped, consumo.producto = self.b, None, self.pan
+        modificar_consumo(consumo)
+        self.assertEqual(self.saldos(), (Decimal('2'), Decimal('8'), 0))
+
+        eliminar_consumo(consumo)
+        registrar_ticket(Ticket(habitacion=self.a, huesped=self.huesped), [Consumo(producto_id=self.cafe.pk, cantidad=2)])
+        self.assertEqual(self.saldos(), (Decimal('9'), 0, Decimal('7')))
+
+        # Un objeto leído antes de los consumos no pisa el saldo al guardarse
+        self.a.descripcion = 'Vista al mar'
+        self.a.save()
+        self.huesped.telefono = '2'
+        self.huesped.save()
+        self.assertEqual(self.saldos(), (Decimal('9'), 0, Decimal('7')))
+        with self.assertNumQueries(1):
+            Habitacion.objects.values_list('saldo_consumos', flat=True).get(pk=self.a.pk)
+
+    def test_archivar_no_cambia_y_borrar_en_cascada_descuenta(self):
+        self.consumo()
+        self.consumo(habitacion=self.b, producto=self.pan)
+        archivado = self.consumo(habitacion=self.b, huesped=None, producto=self.pan)
+        Consumo.objects.filter(pk=archivado.pk).update(fecha_consumo=timezone.make_aware(datetime(2024, 1, 1)))
+        self.assertEqual(archivar_consumos(date(2025, 1, 1)), 1)
+        self.assertEqual(self.saldos(), (Decimal('7'), Decimal('8'), Decimal('11')))
+
+        self.pan.delete()
+        self.assertEqual(self.saldos(), (Decimal('7'), 0, Decimal('7')))
+        Habitacion.objects.filter(pk=self.b.pk).delete()
+        self.huesped.delete()
+        self.assertEqual(Habitacion.objects.get().saldo_consumos, 0)
+
+    def test_verify_balances_reporta_y_corrige_por_lotes(self):
+        self.consumo()
+        Consumo.objects.create(habitacion=self.b, producto=self.pan, cantidad=3)  # sin pasar por los servicios
+        Huesped.objects.filter(pk=self.huesped.pk).update(saldo_consumos=1)
+
+        salida = StringIO()
+        call_command('verify_balances', chunk_size=1, stdout=salida)
+        self.assertIn(f"Habitación {self.b.pk}: 0.00 -> 6.00", salida.getvalue())
+        self.assertIn('2 saldos desviados', salida.getvalue())
+        self.assertEqual(self.saldos(), (Decimal('7'), 0, Decimal('1')))
+
+        call_command('verify_balances', chunk_size=1, corregir=True, stdout=StringIO())
+        self.assertEqual(self.saldos(), (Decimal('7'), Decimal('6'), Decimal('7')))
+        salida = StringIO()
+        call_command('verify_balances', stdout=salida)
+        self.assertIn('Sin desviaciones', salida.getvalue())
+
+
+class ResumenVentasTests(TestCase):
+    def setUp(self):
+        bebidas = Categoria.objects.create(nombre='Bebidas')
+        self.suite = Habitacion.objects.create(numero='201', tipo='suite', precio=200, capacidad=2)
+        self.pareja = Habitacion.objects.create(numero='202', tipo='pareja', precio=100, capacidad=2)
+        self.cafe = Producto.objects.create(nombre='Café', precio=Decimal('3.00'), stock=100, categoria=bebidas)
+        self.mani = Producto.objects.create(nombre='Maní', precio=Decimal('2.00'), stock=100)
+
+    def cargar(self, habitacion, producto, cantidad, *momento):
+        consumo = registrar_consumo(Consumo(habitacion=habitacion, producto=producto, cantidad=cantidad))
+        Consumo.objects.filter(pk=consumo.pk).update(fecha_consumo=timezone.make_aware(datetime(2026, *momento)))
+        return consumo
+
+    def horas(self):
+        return list(VentaHora.objects.order_by('hora', 'producto_id').values_list(
+            'hora__day', 'hora__hour', 'producto__nombre', 'tipo_habitacion', 'cantidad', 'ingresos', 'consumos'
+        ))
+
+    def dias(self):
+        return list(VentaDia.objects.order_by('dia', 'producto_id').values_list(
+            'dia__day', 'producto__nombre', 'categoria__nombre', 'cantidad', 'ingresos', 'consumos'
+        ))
+
+    def test_resume_por_hora_y_dia_desde_la_marca(self):
+        self.cargar(self.suite, self.cafe, 1, 4, 30, 20, 0)
+        self.assertEqual(archivar_consumos(date(2026, 5, 1)), 1)
+        self.cargar(self.suite, self.cafe, 2, 5, 1, 10, 15)
+        self.cargar(self.suite, self.cafe, 1, 5, 1, 10, 40)
+        self.cargar(self.pareja, self.mani, 4, 5, 1, 23, 30)
+        self.cargar(self.suite, self.cafe, 1, 5, 2, 8, 5)
+        # La hora en curso (y los últimos minutos) quedan para la próxima pasada
+        self.cargar(self.suite, self.cafe, 1, 5, 2, 11, 58)
+
+        ahora = timezone.make_aware(datetime(2026, 5, 2, 12, 3))
+        self.assertEqual(actualizar_ventas(ahora=ahora), 4)
+        self.assertEqual(self.horas(), [
+            (30, 20, 'Café', 'suite', 1, Decimal('3'), 1),
+            (1, 10, 'Café', 'suite', 3, Decimal('9'), 2),
+            (1, 23, 'Maní', 'pareja', 4, Decimal('8'), 1),
+            (2, 8, 'Café', 'suite', 1, Decimal('3'), 1),
+        ])
+        self.assertEqual(self.dias(), [
+            (30, 'Café', 'Bebidas', 1, Decimal('3'), 1),
+            (1, 'Café', 'Bebidas', 3, Decimal('9'), 2),
+            (1, 'Maní', None, 4, Decimal('8'), 1),
+            (2, 'Café', 'Bebidas', 1, Decimal('3'), 1),
+        ])
+
+        # La siguiente pasada solo lee lo posterior a la marca: un consumo corregido hacia
+        # atrás espera a que se rehaga el período
+        self.cargar(self.suite, self.mani, 1, 5, 1, 9, 0)
+        self.assertEqual(actualizar_ventas(ahora=ahora + timedelta(hours=2)), 1)
+        self.assertEqual(self.dias()[-1], (2, 'Café', 'Bebidas', 2, Decimal('6'), 2))
+        self.assertEqual(VentaDia.objects.filter(dia__day=1).count(), 2)
+
+        call_command('rollup_sales', '--desde', '2026-05-01', stdout=StringIO())
+        self.assertIn((1, 'Maní', None, 1, Decimal('2'), 1), self.dias())
+        self.assertEqual(VentaDia.objects.filter(dia__day=1).count(), 3)
+        self.assertEqual(VentaHora.objects.filter(hora__day=30).count(), 1)
+        self.assertEqual(actualizar_ventas(), 0)
+
+    def test_horas_sin_ventas_no_se_vuelven_a_leer(self):
+        self.cargar(self.suite, self.cafe, 1, 5, 1, 10, 15)
+        ahora = timezone.make_aware(datetime(2026, 5, 1, 14, 3))
+        self.assertEqual(actualizar_ventas(ahora=ahora), 1)
+        self.assertEqual(marca_ventas(), timezone.make_aware(datetime(2026, 5, 1, 13)))
+
+        with mock.patch('consumos.ventas._ventas_por_hora', return_value=[]) as leer:
+            self.assertEqual(actualizar_ventas(ahora=ahora + timedelta(minutes=30)), 0)
+            self.assertEqual(actualizar_ventas(ahora=ahora + timedelta(minutes=40)), 0)
+        leer.assert_called_once_with(
+            timezone.make_aware(datetime(2026, 5, 1, 13)), timezone.make_aware(datetime(2026, 5, 1, 14))
+        )
+        self.assertEqual(marca_ventas(), timezone.make_aware(datetime(2026, 5, 1, 14)))
+
+    def test_tablero_lee_solo_los_resumenes(self):
+        hoy = timezone.localdate()
+        hace_un_anio = hoy.replace(year=hoy.year - 1, day=1)
+        for dia, ingresos in ((hoy, 30), (hoy.replace(day=1), 10), (hace_un_anio, 99)):
+            VentaDia.objects.create(
+                dia=dia, producto=self.cafe, categoria=self.cafe.categoria, tipo_habitacion='suite',
+                cantidad=ingresos // 3, ingresos=ingresos, consumos=1,
+            )
+        with self.assertNumQueries(4):
+            respuesta = self.client.get(reverse('consumos:ventas'))
+        meses = respuesta.context['meses']
+        self.assertEqual(len(meses), 12)
+        self.assertEqual((meses[-1]['mes'], meses[-1]['ingresos'], meses[-1]['altura']), (hoy.replace(day=1), 40, 100))
+        self.assertEqual(meses[0]['ingresos'], 0)
+        self.assertEqual([fila['ingresos'] for fila in respuesta.context['productos']], [40])
+        self.assertEqual(respuesta.context['tipos'][0]['tipo'], 'Suite')
+
+
+class ListadoConsumosTests(TestCase):
+    def setUp(self):
+        self.a = Habitacion.objects.create(numero='211', tipo='pareja', precio=100, capacidad=2)
+        self.b = Habitacion.objects.create(numero='212', tipo='suite', precio=200, capacidad=2)
+        self.huesped = alojar(self.a, nombre='Lista', apellido='Uno', numero_documento='lis-1').huesped
+        self.cafe = Producto.objects.create(nombre='Café', precio=Decimal('3.00'))
+        self.pan = Producto.objects.create(nombre='Pan dulce', precio=Decimal('2.00'))
+
+    def cargar(self, cantidad, habitacion=None, producto=None, huesped=None, dia=1):
+        consumos = Consumo.objects.bulk_create([
+            Consumo(habitacion=habitacion or self.a, producto=producto or self.cafe, huesped=huesped, cantidad=1, precio_total=3)
+            for _ in range(cantidad)
+        ])
+        Consumo.objects.filter(pk__in=[c.pk for c in consumos]).update(
+            fecha_consumo=timezone.make_aware(datetime(2026, 6, dia, 12))
+        )
+
+    def listar(self, **filtros):
+        respuesta = self.client.get(reverse('consumos:consumo_list'), filtros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def test_consultas_no_dependen_de_las_filas(self):
+        filtros = {'habitacion': self.a.pk, 'producto': self.cafe.pk, 'huesped': self.huesped.pk, 'desde': '2026-06-01'}
+        for cantidad in (2, 20):
+            self.cargar(cantidad, huesped=self.huesped)
+            self.cargar(cantidad, habitacion=self.b, producto=self.pan)
+            with self.assertNumQueries(3):
+                self.listar()
+            # El huésped del filtro se valida con una consulta más
+            with self.assertNumQueries(4):
+                respuesta = self.listar(**filtros)
+            self.assertEqual(len(respuesta.context['consumos']), min(Consumo.objects.filter(huesped=self.huesped).count(), 24))
+
+    def test_filtros(self):
+        self.cargar(1, dia=1)
+        self.cargar(2, habitacion=self.b, dia=2)
+        self.cargar(3, producto=self.pan, huesped=self.huesped, dia=3)
+
+        def cuantos(**filtros):
+            return len(self.listar(**filtros).context['consumos'])
+
+        self.assertEqual(cuantos(), 6)
+        self.assertEqual(cuantos(desde='2026-06-02'), 5)
+        self.assertEqual(cuantos(desde='2026-06-02', hasta='2026-06-02'), 2)
+        self.assertEqual(cuantos(habitacion=self.b.pk), 2)
+        self.assertEqual(cuantos(producto=self.pan.pk), 3)
+        self.assertEqual(cuantos(producto=self.pan.pk, parcial=1), 3)
+        self.assertEqual(cuantos(huesped=self.huesped.pk, hasta='2026-06-02'), 0)
+        respuesta = self.listar(desde='2026-06-03', hasta='2026-06-01')
+        self.assertEqual(len(respuesta.context['consumos']), 0)
+        self.assertContains(respuesta, 'La fecha final debe ser igual o posterior')
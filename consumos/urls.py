@@ -5,7 +5,12 @@ from .views import (
     ConsumoCreateView,
     ConsumoUpdateView,
     ConsumoDeleteView,
-    ConsumoViewSet
+    ConsumoViewSet,
+    TicketViewSet,
+    ticket_crear,
+    ventas_tablero,
+    factura_estadia,
+    folio_estadia,
 )
 from rest_framework.routers import DefaultRouter
 
@@ -14,6 +19,7 @@ app_name = 'consumos'
 # Configura el router para la API
 router = DefaultRouter()
 router.register(r'consumos', ConsumoViewSet)
+router.register(r'tickets', TicketViewSet)
 
 urlpatterns = [
     # Vistas de Django
@@ -22,6 +28,14 @@ urlpatterns = [
     path('nuevo/', ConsumoCreateView.as_view(), name='consumo_create'),
     path('<int:pk>/editar/', ConsumoUpdateView.as_view(), name='consumo_update'),
     path('<int:pk>/eliminar/', ConsumoDeleteView.as_view(), name='consumo_delete'),
+    path('ticket/nuevo/', ticket_crear, name='ticket_create'),
+
+    # Tablero de ventas (lee los resúmenes de rollup_sales)
+    path('ventas/', ventas_tablero, name='ventas'),
+
+    # Cuenta de salida
+    path('folio/<int:estadia_id>/', folio_estadia, name='folio_estadia'),
+    path('folio/<int:estadia_id>/factura/', factura_estadia, name='factura_estadia'),
     
     # Rutas para la API REST
     path('api/', include(router.urls)),  # Rutas de la API
@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncHour, TruncMonth
+from django.utils import timezone
+
+from .models import Consumo, ConsumoArchivado, MarcaVentas, VentaDia, VentaHora
+
+# Las horas más recientes que esto quedan para la próxima pasada: un consumo guardado en
+# una transacción todavía abierta aparece con una fecha_consumo anterior al commit
+MARGEN = timedelta(minutes=5)
+# Consumos que se resumen por transacción
+VENTANA = timedelta(days=1)
+METRICAS = ('cantidad', 'ingresos', 'consumos')
+
+
+def _inicio_de_hora(momento):
+    return timezone.localtime(momento).replace(minute=0, second=0, microsecond=0)
+
+
+def marca_ventas():
+    """
+    Hasta dónde llegan los resúmenes: la marca guardada en ``MarcaVentas`` o, la primera
+    vez, la hora del consumo más antiguo (vigente o archivado). ``None`` si no hay nada
+    que resumir.
+    """
+    hasta = MarcaVentas.objects.filter(pk=1).values_list('hasta', flat=True).first()
+    if hasta is not None:
+        return hasta
+    primeros = [
+        modelo.objects.aggregate(primero=Min('fecha_consumo'))['primero'] for modelo in (Consumo, ConsumoArchivado)
+    ]
+    primeros = [primero for primero in primeros if primero is not None]
+    return _inicio_de_hora(min(primeros)) if primeros else None
+
+
+def _avanzar_marca(hasta):
+    # Rehacer un período (``desde``) no retrocede la marca
+    if not MarcaVentas.objects.filter(pk=1, hasta__lt=hasta).update(hasta=hasta):
+        MarcaVentas.objects.get_or_create(pk=1, defaults={'hasta': hasta})
+
+
+# --------------------------------
+# 📌 Resumir
+# --------------------------------
+def _ventas_por_hora(inicio, fin):
+    """
+    ``VentaHora`` sin guardar de los consumos entre ``inicio`` y ``fin``: una consulta
+    agrupada por tabla; un mismo grupo en ambas se suma.
+    """
+    grupos = {}
+    for modelo in (Consumo, ConsumoArchivado):
+        filas = (
+            modelo.objects.filter(fecha_consumo__gte=inicio, fecha_consumo__lt=fin).order_by()
+            .annotate(hora=TruncHour('fecha_consumo'))
+            .values('hora', 'producto_id', 'producto__categoria_id', 'habitacion__tipo')
+            .annotate(cantidad=Sum('cantidad'), ingresos=Sum('precio_total'), consumos=Count('id'))
+        )
+        for fila in filas:
+            clave = (fila['hora'], fila['producto_id'], fila['habitacion__tipo'])
+            venta = grupos.setdefault(clave, VentaHora(
+                hora=fila['hora'], producto_id=fila['producto_id'], categoria_id=fila['producto__categoria_id'],
+                tipo_habitacion=fila['habitacion__tipo'], cantidad=0, ingresos=0, consumos=0,
+            ))
+            for metrica in METRICAS:
+                setattr(venta, metrica, getattr(venta, metrica) + fila[metrica])
+    return list(grupos.values())
+
+
+def _rehacer_dias(primero, ultimo):
+    """
+    Recalcula los ``VentaDia`` de ``primero`` a ``ultimo`` sumando sus horas, que ya
+    están completas: un día partido entre dos ventanas queda bien igual.
+    """
+    VentaDia.objects.filter(dia__range=(primero, ultimo)).delete()
+    filas = (
+        VentaHora.objects.filter(hora__date__range=(primero, ultimo)).order_by()
+        .annotate(dia=TruncDate('hora'))
+        .values('dia', 'producto_id', 'tipo_habitacion')
+        .annotate(categoria_id=Max('categoria_id'), cantidad=Sum('cantidad'), ingresos=Sum('ingresos'), consumos=Sum('consumos'))
+    )
+    VentaDia.objects.bulk_create([VentaDia(**fila) for fila in filas], batch_size=500)
+
+
+def actualizar_ventas(desde=None, ahora=None):
+    """
+    Resume en ``VentaHora`` y ``VentaDia`` los consumos nuevos, marcados por
+    ``fecha_consumo``: desde ``marca_ventas()`` (o ``desde``, para rehacer un período tras
+    corregir consumos) hasta la última hora cerrada, una ventana de un día por
+    transacción. Cada ventana avanza la marca, con o sin ventas: una hora vacía no se
+    vuelve a leer. Cada pasada reemplaza las horas que cubre, así repetirla no duplica
+    nada. Devuelve cuántas filas horarias escribió.
+    """
+    inicio = _inicio_de_hora(desde) if desde else marca_ventas()
+    fin = _inicio_de_hora((ahora or timezone.now()) - MARGEN)
+    escritas = 0
+    while inicio is not None and inicio < fin:
+        hasta = min(inicio + VENTANA, fin)
+        with transaction.atomic():
+            VentaHora.objects.filter(hora__gte=inicio, hora__lt=hasta).delete()
+            ventas = VentaHora.objects.bulk_create(_ventas_por_hora(inicio, hasta), batch_size=500)
+            _rehacer_dias(timezone.localdate(inicio), timezone.localdate(hasta - timedelta(microseconds=1)))
+            _avanzar_marca(hasta)
+        escritas += len(ventas)
+        inicio = hasta
+    return escritas
+
+
+# --------------------------------
+# 📌 Lectura para tableros
+# --------------------------------
+def serie_mensual(meses=12, hoy=None):
+    """
+    Totales de los últimos ``meses`` meses, el actual incluido, leídos de ``VentaDia``:
+    uno por mes aunque no haya ventas. Devuelve ``(primer_dia, serie)``.
+    """
+    hoy = hoy or timezone.localdate()
+    anio, mes = divmod(hoy.year * 12 + hoy.month - meses, 12)
+    desde = date(anio, mes + 1, 1)
+    por_mes = {
+        fila['mes']: fila for fila in
+        VentaDia.objects.filter(dia__gte=desde).order_by()
+        .annotate(mes=TruncMonth('dia')).values('mes')
+        .annotate(cantidad=Sum('cantidad'), ingresos=Sum('ingresos'), consumos=Sum('consumos'))
+    }
+    serie = []
+    for n in range(meses):
+        anio, mes = divmod(desde.year * 12 + desde.month - 1 + n, 12)
+        inicio = date(anio, mes + 1, 1)
+        serie.append(por_mes.get(inicio, {'mes': inicio, 'cantidad': 0, 'ingresos': 0, 'consumos': 0}))
+    return desde, serie
+
+
+def ventas_por(campo, desde, limite=None):
+    """
+    Totales desde ``desde`` agrupados por ``campo`` (``'producto__nombre'``,
+    ``'categoria__nombre'``, ``'tipo_habitacion'``), de mayor a menor ingreso.
+    """
+    filas = (
+        VentaDia.objects.filter(dia__gte=desde).order_by()
+        .values(campo).annotate(cantidad=Sum('cantidad'), ingresos=Sum('ingresos'), consumos=Sum('consumos'))
+        .order_by('-ingresos')
+    )
+    return list(filas[:limite] if limite else filas)
@@ -1,11 +1,21 @@
 from django.contrib import messages
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from rest_framework import viewsets
-from .forms import ConsumoForm
-from .models import Consumo, Habitacion
-from .serializers import HuespedSerializer
+from rest_framework import mixins, viewsets
+from rest_framework.exceptions import ValidationError
+from habitaciones.paginacion import PaginacionKeysetMixin
+from huespedes.models import Estadia
+from productos.stock import StockInsuficiente
+from .folio import calcular_folio, encolar_factura, factura_cacheada
+from .forms import ConsumoForm, FiltroConsumosForm, LineaTicketFormSet, TicketForm
+from .models import Consumo, Habitacion, Ticket
+from .serializers import HuespedSerializer, TicketSerializer
+from .ventas import serie_mensual, ventas_por
+from .services import (
+    ConsumoModificado, TicketInvalido, eliminar_consumo, modificar_consumo, registrar_consumo, registrar_ticket,
+)
 
 # -------------------------
 # VISTAS DE CONSUMOS
@@ -23,16 +33,21 @@ class ConsumoCreateView(CreateView):
             messages.warning(self.request, "No hay habitaciones registradas. Por favor crea una primero.")
             return redirect('habitaciones:habitacion_create')
 
-        # Guardar consumo (el formulario se encarga de stock y precio)
-        consumo = form.save()
-        messages.success(self.request, f"Consumo de '{consumo.producto.nombre}' registrado correctamente.")
-        return super().form_valid(form)
+        # Guardar consumo: precio y descuento de stock en una sola transacción
+        try:
+            self.object = registrar_consumo(form.save(commit=False))
+        except StockInsuficiente as e:
+            form.add_error('cantidad', str(e))
+            return self.form_invalid(form)
+        messages.success(self.request, f"Consumo de '{self.object.producto.nombre}' registrado correctamente.")
+        return redirect(self.get_success_url())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         habitaciones_existentes = Habitacion.objects.all()
         context['habitaciones'] = habitaciones_existentes
         context['no_habitaciones'] = not habitaciones_existentes.exists()
+        context['productos'] = context['form'].fields['producto'].queryset
 
         # Aplicar clases CSS a los campos
         form = context['form']
@@ -47,29 +62,24 @@ class ConsumoUpdateView(UpdateView):
     template_name = 'consumos/consumo_form.html'
 
     def form_valid(self, form):
-        consumo = form.save(commit=False)
-        producto = consumo.producto
-        cantidad = consumo.cantidad
-
-        original = Consumo.objects.get(pk=consumo.pk)
-
-        # Restaurar stock anterior y descontar nueva cantidad
-        producto.disponible = producto.disponible + original.cantidad - cantidad
-        if producto.disponible < 0:
-            messages.error(self.request, f"No hay suficiente stock para '{producto.nombre}'.")
+        # La diferencia de cantidad (o el cambio de producto) se aplica al stock con F()
+        try:
+            consumo = modificar_consumo(form.save(commit=False))
+        except StockInsuficiente as e:
+            form.add_error('cantidad', str(e))
             return self.form_invalid(form)
-
-        producto.save()
-        consumo.precio_total = consumo.total()
-        consumo.save()
-        messages.success(self.request, f"Consumo de '{producto.producto.nombre}' actualizado correctamente.")
-        return redirect('consumos:consumo_detail', consumo_id=consumo.pk)
+        except ConsumoModificado as e:
+            form.add_error(None, str(e))
+            return self.form_invalid(form)
+        messages.success(self.request, f"Consumo de '{consumo.producto.nombre}' actualizado correctamente.")
+        return redirect('consumos:consumo_detail', pk=consumo.pk)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         habitaciones_existentes = Habitacion.objects.all()
         context['habitaciones'] = habitaciones_existentes
         context['no_habitaciones'] = not habitaciones_existentes.exists()
+        context['productos'] = context['form'].fields['producto'].queryset
         return context
 
 
@@ -78,23 +88,38 @@ class ConsumoDeleteView(DeleteView):
     template_name = 'consumos/consumo_confirm_delete.html'
     success_url = reverse_lazy('consumos:consumo_list')
 
-    def delete(self, request, *args, **kwargs):
-        consumo = self.get_object()
-        producto = consumo.producto
-        producto.disponible += consumo.cantidad
-        producto.save()
-        messages.success(request, f"Consumo de '{producto.nombre}' eliminado y stock restaurado.")
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        # DeleteView borra en form_valid: aquí se devuelve el stock en la misma transacción
+        try:
+            eliminar_consumo(self.object)
+        except ConsumoModificado as e:
+            messages.error(self.request, str(e))
+            return redirect('consumos:consumo_detail', pk=self.object.pk)
+        messages.success(self.request, f"Consumo de '{self.object.producto.nombre}' eliminado y stock restaurado.")
+        return redirect(self.get_success_url())
 
 
-class ConsumoListView(ListView):
+class ConsumoListView(PaginacionKeysetMixin, ListView):
     model = Consumo
     template_name = 'consumos/consumo_list.html'
+    plantilla_parcial = 'consumos/consumo_list_items.html'
     context_object_name = 'consumos'
+    orden_keyset = ('-fecha_consumo', '-id')
+
+    def get_queryset(self):
+        # Producto, huésped y habitación en el mismo SELECT: las tarjetas no consultan por fila
+        self.filtros = FiltroConsumosForm(self.request.GET or None)
+        return self.filtros.filtrar(Consumo.objects.select_related('producto', 'huesped', 'habitacion'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filtros'] = self.filtros
+        return context
 
 
 class ConsumoDetailView(DetailView):
     model = Consumo
+    queryset = Consumo.objects.select_related('producto', 'huesped', 'habitacion')
     template_name = 'consumos/consumo_detail.html'
     context_object_name = 'consumo'
 
@@ -109,6 +134,130 @@ def consumo_detail(request, consumo_id):
     return render(request, 'consumos/consumo_detail.html', context)
 
 
+# -------------------------
+# TICKETS DE VARIAS LÍNEAS
+# -------------------------
+
+def ticket_crear(request):
+    form = TicketForm(request.POST or None)
+    lineas_formset = LineaTicketFormSet(request.POST or None, prefix='lineas')
+    if request.method == 'POST' and form.is_valid() and lineas_formset.is_valid():
+        pares = lineas_formset.lineas()
+        try:
+            ticket = registrar_ticket(form.save(commit=False), [linea for linea, _ in pares])
+        except TicketInvalido as e:
+            # Cada error vuelve a la línea del formulario que lo causó
+            for error, (_, linea_form) in zip(e.errores, pares):
+                for campo, mensajes in error.items():
+                    for mensaje in mensajes:
+                        linea_form.add_error(campo, mensaje)
+        except StockInsuficiente as e:
+            form.add_error(None, str(e))
+        else:
+            messages.success(
+                request, f"Ticket registrado: {len(pares)} consumo(s) por un total de ${ticket.total}."
+            )
+            return redirect('consumos:consumo_list')
+
+    return render(request, 'consumos/ticket_form.html', {
+        'form': form,
+        'lineas_formset': lineas_formset,
+    })
+
+
+# -------------------------
+# TABLERO DE VENTAS
+# -------------------------
+
+def ventas_tablero(request):
+    # Todo sale de los resúmenes diarios (rollup_sales): nunca se recorre la tabla de consumos
+    desde, meses = serie_mensual(12)
+    tope = max(mes['ingresos'] for mes in meses) or 1
+    for mes in meses:
+        mes['altura'] = round(100 * mes['ingresos'] / tope)
+    tipos = dict(Habitacion.TIPOS_HABITACION)
+    por_tipo = ventas_por('tipo_habitacion', desde)
+    for fila in por_tipo:
+        fila['tipo'] = tipos.get(fila['tipo_habitacion'], fila['tipo_habitacion'])
+    return render(request, 'consumos/ventas.html', {
+        'meses': meses,
+        'desde': desde,
+        'productos': ventas_por('producto__nombre', desde, limite=10),
+        'categorias': ventas_por('categoria__nombre', desde),
+        'tipos': por_tipo,
+    })
+
+
+# -------------------------
+# FOLIO Y FACTURA DE SALIDA
+# -------------------------
+
+def _folio_o_404(estadia_id):
+    try:
+        return calcular_folio(estadia_id)
+    except Estadia.DoesNotExist:
+        raise Http404("La estadía no existe.")
+
+
+def folio_estadia(request, estadia_id):
+    folio = _folio_o_404(estadia_id)
+    # La factura se adelanta mientras se revisa la cuenta; al descargarla ya estará lista
+    if factura_cacheada(folio) is None:
+        encolar_factura(folio)
+    return render(request, 'consumos/folio.html', {'folio': folio, 'consumos': folio.detalle()})
+
+
+def factura_estadia(request, estadia_id):
+    folio = _folio_o_404(estadia_id)
+    html = factura_cacheada(folio)
+    if html is None:
+        encolar_factura(folio)
+        return render(request, 'consumos/factura_pendiente.html', {'folio': folio}, status=202)
+
+    respuesta = HttpResponse(html, content_type='text/html; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="factura-{folio.estadia.pk}.html"'
+    return respuesta
+
+
 class ConsumoViewSet(viewsets.ModelViewSet):
     queryset = Consumo.objects.all()
     serializer_class = HuespedSerializer
+
+    # El stock se mueve siempre por los servicios, también desde la API
+    def perform_create(self, serializer):
+        try:
+            serializer.instance = registrar_consumo(Consumo(**serializer.validated_data))
+        except StockInsuficiente as error:
+            raise ValidationError({'cantidad': [str(error)]})
+
+    def perform_update(self, serializer):
+        consumo = serializer.instance
+        for campo, valor in serializer.validated_data.items():
+            setattr(consumo, campo, valor)
+        try:
+            modificar_consumo(consumo)
+        except StockInsuficiente as error:
+            raise ValidationError({'cantidad': [str(error)]})
+        except ConsumoModificado as error:
+            raise ValidationError({'consumo': [str(error)]})
+
+    def perform_destroy(self, instance):
+        try:
+            eliminar_consumo(instance)
+        except ConsumoModificado as error:
+            raise ValidationError({'consumo': [str(error)]})
+
+
+class TicketViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = Ticket.objects.prefetch_related('lineas')
+    serializer_class = TicketSerializer
+
+    def perform_create(self, serializer):
+        datos = dict(serializer.validated_data)
+        lineas = [Consumo(**linea) for linea in datos.pop('lineas')]
+        try:
+            serializer.instance = registrar_ticket(Ticket(**datos), lineas)
+        except TicketInvalido as error:
+            raise ValidationError({'lineas': error.errores})
+        except StockInsuficiente as error:
+            raise ValidationError({'lineas': [str(error)]})
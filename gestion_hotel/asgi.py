@@ -3,14 +3,25 @@ ASGI config for gestion_hotel project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (``uvicorn gestion_hotel.asgi:application``, as the
+dockerfile does) so that the live room board stream (``habitaciones:habitacion_eventos``)
+keeps each open screen as an idle coroutine instead of a blocked worker thread. Under
+WSGI (``manage.py runserver``) the board works without live updates. With ``DEBUG`` the
+static files are served here too, as ``runserver`` would.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestion_hotel.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
@@ -144,10 +144,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestion-hotel',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
     }
 }
 
+# Canal pub/sub de los eventos en vivo del tablero (SSE). El canal local solo sirve con
+# un único proceso ASGI; con varios workers se apunta a una implementación sobre un broker.
+HABITACIONES_CANAL_EVENTOS = 'habitaciones.eventos.CanalLocal'
+
 # Ruta base para los archivos de medios
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'  # Ruta donde se almacenarán las imágenes
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Habitacion
+from .models import Habitacion, TareaAseo
 
 admin.site.register(Habitacion)
-
+admin.site.register(TareaAseo)
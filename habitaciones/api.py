@@ -0,0 +1,88 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+# --------------------------------
+# 📌 Paginación por cursor
+# --------------------------------
+class PaginacionCursorApi(CursorPagination):
+    """
+    Cursor opaco sobre ``orden_cursor`` de la vista: sin OFFSET ni COUNT(*), así el
+    costo de cada página no crece con la tabla.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        orden = getattr(view, 'orden_cursor', self.ordering)
+        return (orden,) if isinstance(orden, str) else tuple(orden)
+
+
+# --------------------------------
+# 📌 Campos seleccionables (?fields=)
+# --------------------------------
+class CamposSeleccionablesMixin:
+    """
+    Serializador que solo expone los campos pedidos en ``context['campos']``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+
+class CamposSolicitadosMixin:
+    """
+    Para viewsets: lee ``?fields=id,numero``, rechaza campos desconocidos y deja la
+    selección disponible para el serializador y para armar el queryset.
+    ``campos_relacionados`` indica qué campos necesitan ``select_related`` o
+    ``prefetch_related`` para no hacer una consulta por fila. La relación puede ser una
+    función que construye el ``Prefetch``; varios campos pueden compartirla.
+    """
+    campos_relacionados = {}
+
+    def campos_solicitados(self):
+        if not hasattr(self, '_campos_solicitados'):
+            pedido = self.request.query_params.get('fields', '')
+            campos = [campo.strip() for campo in pedido.split(',') if campo.strip()]
+            desconocidos = set(campos) - set(self.get_serializer_class()().fields)
+            if desconocidos:
+                raise ValidationError({'fields': [f"Campos desconocidos: {', '.join(sorted(desconocidos))}."]})
+            self._campos_solicitados = campos or None
+        return self._campos_solicitados
+
+    def optimizar_queryset(self, queryset):
+        campos = self.campos_solicitados()
+        aplicadas = set()
+        for campo, (metodo, relacion) in self.campos_relacionados.items():
+            if (campos is None or campo in campos) and (metodo, relacion) not in aplicadas:
+                aplicadas.add((metodo, relacion))
+                queryset = getattr(queryset, metodo)(relacion() if callable(relacion) else relacion)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['campos'] = self.campos_solicitados()
+        return context
+
+
+def fecha_parametro(request, nombre):
+    """
+    Lee ``?nombre=AAAA-MM-DD``; un valor mal formado es un 400, no un filtro ignorado.
+    """
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({nombre: ["Use el formato AAAA-MM-DD."]})
+    return fecha
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.utils import timezone
+
+from huespedes.models import Estadia
+from .eventos import publicar_estados
+from .fragmentos import invalidar_tarjetas
+from .models import Habitacion, TareaAseo
+
+ACCIONES_ASEO = [
+    ('limpia', 'Limpias'),
+    ('mantenimiento', 'Requieren mantenimiento'),
+]
+
+# Una habitación limpia vuelve a "ocupada" si tiene huéspedes que la llenan, si no a "disponible"
+ESTADO_TRAS_ASEO = Case(
+    When(ocupacion__gte=F('capacidad'), then=Value('ocupada')),
+    default=Value('disponible'),
+)
+
+
+def _notificar(habitacion_ids):
+    # update() no emite señales: las tarjetas y las pantallas en vivo se avisan aquí
+    invalidar_tarjetas(habitacion_ids)
+    transaction.on_commit(lambda: publicar_estados(habitacion_ids))
+
+
+# --------------------------------
+# 📌 Entrada a la cola
+# --------------------------------
+def enviar_a_aseo(habitacion_ids):
+    """
+    Pasa las habitaciones a "aseo" y las encola. Las que están en mantenimiento no se
+    tocan y una habitación ya encolada no se repite.
+    """
+    with transaction.atomic():
+        ids = list(
+            Habitacion.objects.filter(pk__in=habitacion_ids)
+            .exclude(estado_habitacion='mantenimiento')
+            .values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        Habitacion.objects.filter(pk__in=ids).update(estado_habitacion='aseo')
+        TareaAseo.objects.bulk_create(
+            [TareaAseo(habitacion_id=pk) for pk in ids], ignore_conflicts=True
+        )
+        _notificar(ids)
+    return len(ids)
+
+
+# --------------------------------
+# 📌 Lectura de la cola
+# --------------------------------
+def cola_aseo(hoy=None):
+    """
+    Tareas pendientes con su habitación y la próxima llegada, en una sola consulta.
+    Primero las que reciben huéspedes antes, luego por piso para agrupar recorridos.
+    """
+    hoy = hoy or timezone.localdate()
+    proxima_llegada = Estadia.objects.activas().filter(
+        habitacion=OuterRef('habitacion_id'), fecha_entrada__gte=hoy
+    ).order_by('fecha_entrada').values('fecha_entrada')[:1]
+    return (
+        TareaAseo.objects.filter(completada__isnull=True)
+        .select_related('habitacion')
+        .annotate(proxima_llegada=Subquery(proxima_llegada))
+        .order_by(
+            F('proxima_llegada').asc(nulls_last=True),
+            F('habitacion__piso').asc(nulls_last=True),
+            'habitacion__numero',
+        )
+    )
+
+
+# --------------------------------
+# 📌 Confirmación por lotes
+# --------------------------------
+def confirmar_aseo(habitacion_ids, accion='limpia'):
+    """
+    Cierra las tareas pendientes de ``habitacion_ids`` y cambia el estado de todas las
+    habitaciones con un único UPDATE. Devuelve cuántas tareas se cerraron.
+    """
+    habitacion_ids = list(habitacion_ids)
+    nuevo_estado = Value('mantenimiento') if accion == 'mantenimiento' else ESTADO_TRAS_ASEO
+    with transaction.atomic():
+        cerradas = TareaAseo.objects.filter(
+            habitacion_id__in=habitacion_ids, completada__isnull=True
+        ).update(completada=timezone.now())
+        Habitacion.objects.filter(
+            pk__in=habitacion_ids, estado_habitacion='aseo'
+        ).update(estado_habitacion=nuevo_estado)
+        _notificar(habitacion_ids)
+    return cerradas
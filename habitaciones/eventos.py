@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import Habitacion
+
+# Segundos entre comentarios de latido: mantienen viva la conexión y detectan clientes caídos
+LATIDO = 15
+
+
+class Evento(namedtuple('Evento', ['id', 'tipo', 'datos'])):
+    def como_sse(self):
+        lineas = [f"id: {self.id}"] if self.id is not None else []
+        lineas += [f"event: {self.tipo}", f"data: {json.dumps(self.datos, separators=(',', ':'))}"]
+        return '\n'.join(lineas) + '\n\n'
+
+
+# --------------------------------
+# 📌 Canal en memoria del proceso
+# --------------------------------
+class CanalLocal:
+    """
+    Pub/sub dentro del proceso. ``publicar`` se llama desde código síncrono (señales,
+    vistas); cada suscriptor es una cola asyncio de la conexión SSE, alimentada con
+    ``call_soon_threadsafe``. Guarda los últimos eventos para reenviarlos a quien se
+    reconecta con ``Last-Event-ID``.
+
+    Solo ve los eventos de su propio proceso: con varios workers se reemplaza por un
+    canal sobre un broker (``HABITACIONES_CANAL_EVENTOS``) con la misma interfaz.
+    """
+
+    def __init__(self, historial=256, tamano_cola=100):
+        self._lock = threading.Lock()
+        self._suscriptores = set()
+        self._historial = deque(maxlen=historial)
+        self._ultimo_id = 0
+        self._tamano_cola = tamano_cola
+
+    def publicar(self, tipo, datos):
+        with self._lock:
+            self._ultimo_id += 1
+            evento = Evento(self._ultimo_id, tipo, datos)
+            self._historial.append(evento)
+            suscriptores = list(self._suscriptores)
+        for loop, cola in suscriptores:
+            try:
+                loop.call_soon_threadsafe(self._entregar, cola, evento)
+            except RuntimeError:
+                # El loop de esa conexión ya cerró; su suscripción se retira sola
+                pass
+        return evento
+
+    @staticmethod
+    def _entregar(cola, evento):
+        if cola.full():
+            # Cliente demasiado lento: se descarta lo pendiente y se le pide recargar
+            while not cola.empty():
+                cola.get_nowait()
+            evento = Evento(None, 'recargar', {})
+        cola.put_nowait(evento)
+
+    def _pendientes(self, ultimo_id):
+        """
+        Eventos posteriores a ``ultimo_id``; ``None`` si ya salieron del historial.
+        """
+        if ultimo_id == self._ultimo_id:
+            return []
+        if ultimo_id > self._ultimo_id:
+            # El proceso se reinició y la numeración volvió a empezar
+            return None
+        if not self._historial or self._historial[0].id > ultimo_id + 1:
+            return None
+        return [evento for evento in self._historial if evento.id > ultimo_id]
+
+    async def suscribir(self, ultimo_id=None, latido=LATIDO):
+        """
+        Itera los eventos nuevos. Entrega ``None`` cada ``latido`` segundos sin novedades.
+        """
+        suscriptor = (asyncio.get_running_loop(), asyncio.Queue(self._tamano_cola))
+        with self._lock:
+            self._suscriptores.add(suscriptor)
+            atrasados = self._pendientes(ultimo_id) if ultimo_id is not None else []
+        try:
+            if atrasados is None:
+                yield Evento(None, 'recargar', {})
+            for evento in atrasados or []:
+                yield evento
+            while True:
+                try:
+                    yield await asyncio.wait_for(suscriptor[1].get(), timeout=latido)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._suscriptores.discard(suscriptor)
+
+
+@lru_cache(maxsize=None)
+def canal():
+    return import_string(getattr(settings, 'HABITACIONES_CANAL_EVENTOS', 'habitaciones.eventos.CanalLocal'))()
+
+
+# --------------------------------
+# 📌 Deltas de estado de habitación
+# --------------------------------
+ESTADOS = dict(Habitacion.ESTADO_CHOICES)
+
+
+def publicar_estados(habitacion_ids):
+    """
+    Publica el estado actual de las habitaciones con una sola consulta. Las que ya no
+    existen se publican como eliminadas.
+    """
+    habitacion_ids = {pk for pk in habitacion_ids if pk}
+    if not habitacion_ids:
+        return
+    filas = Habitacion.objects.filter(pk__in=habitacion_ids).values(
+        'id', 'numero', 'estado_habitacion', 'ocupacion', 'capacidad'
+    )
+    vigentes = set()
+    for fila in filas:
+        vigentes.add(fila['id'])
+        canal().publicar('habitacion', {
+            'id': fila['id'],
+            'numero': fila['numero'],
+            'estado': fila['estado_habitacion'],
+            'estado_display': ESTADOS.get(fila['estado_habitacion'], fila['estado_habitacion']),
+            'ocupacion': fila['ocupacion'],
+            'capacidad': fila['capacidad'],
+        })
+    for pk in sorted(habitacion_ids - vigentes):
+        canal().publicar('habitacion', {'id': pk, 'eliminada': True})
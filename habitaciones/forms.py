@@ -1,4 +1,5 @@
 from django import forms
+from .aseo import ACCIONES_ASEO
 from .models import Habitacion
 
 class HabitacionForm(forms.ModelForm):
@@ -8,9 +9,10 @@ class HabitacionForm(forms.ModelForm):
     """
     class Meta:
         model = Habitacion
-        fields = ['numero', 'tipo', 'estado_habitacion', 'capacidad', 'precio', 'descripcion', 'imagen']
+        fields = ['numero', 'piso', 'tipo', 'estado_habitacion', 'capacidad', 'precio', 'descripcion', 'imagen']
         widgets = {
             'numero': forms.TextInput(attrs={'placeholder': 'Ej: 101'}),
+            'piso': forms.NumberInput(attrs={'min': 0, 'placeholder': 'Se deduce del número'}),
             'tipo': forms.Select(),
             'estado_habitacion': forms.Select(),
             'capacidad': forms.NumberInput(attrs={'min': 1}),
@@ -33,3 +35,85 @@ class HabitacionForm(forms.ModelForm):
         if qs.exists():
             raise forms.ValidationError("Ya existe una habitación con este número.")
         return numero
+
+
+class DisponibilidadForm(forms.Form):
+    """
+    Parámetros de búsqueda de habitaciones libres en un rango de fechas.
+    """
+    fecha_entrada = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    fecha_salida = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    tipo = forms.ChoiceField(
+        choices=[('', 'Cualquiera')] + Habitacion.TIPOS_HABITACION,
+        required=False
+    )
+    personas = forms.IntegerField(min_value=1, initial=1, required=False)
+
+    def clean_personas(self):
+        return self.cleaned_data.get('personas') or 1
+
+    def clean(self):
+        cleaned_data = super().clean()
+        entrada = cleaned_data.get('fecha_entrada')
+        salida = cleaned_data.get('fecha_salida')
+        if entrada and salida and salida <= entrada:
+            raise forms.ValidationError("La fecha de salida debe ser posterior a la de entrada.")
+        return cleaned_data
+
+
+class HabitacionLoteForm(HabitacionForm):
+    """
+    Valida una fila de la importación masiva. La unicidad de ``numero`` se revisa
+    para todo el lote con una sola consulta, no fila por fila.
+    """
+    class Meta(HabitacionForm.Meta):
+        fields = ['numero', 'tipo', 'estado_habitacion', 'capacidad', 'precio', 'descripcion']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # El archivo puede omitir el estado: se usa el del modelo
+        self.fields['estado_habitacion'].required = False
+
+    def clean_numero(self):
+        return self.cleaned_data.get('numero').strip()
+
+    def clean_estado_habitacion(self):
+        return self.cleaned_data.get('estado_habitacion') or Habitacion._meta.get_field('estado_habitacion').get_default()
+
+    def validate_unique(self):
+        pass
+
+
+class HabitacionEdicionLoteForm(forms.Form):
+    """
+    Valida una fila de la edición masiva: número y los campos a cambiar.
+    """
+    numero = forms.CharField(max_length=10)
+    precio = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    estado_habitacion = forms.ChoiceField(choices=Habitacion.ESTADO_CHOICES, required=False)
+    tipo = forms.ChoiceField(choices=Habitacion.TIPOS_HABITACION, required=False)
+
+    def clean_numero(self):
+        return self.cleaned_data.get('numero').strip()
+
+
+class ImportacionHabitacionesForm(forms.Form):
+    ACCIONES = [
+        ('crear', 'Crear habitaciones'),
+        ('editar', 'Editar precio, estado o tipo'),
+    ]
+
+    archivo = forms.FileField(help_text="Archivo CSV o JSON con una habitación por fila.")
+    accion = forms.ChoiceField(choices=ACCIONES, initial='crear')
+
+
+class ConfirmacionAseoForm(forms.Form):
+    """
+    Confirmación por lotes de la cola de aseo: varias habitaciones en un solo envío.
+    """
+    habitaciones = forms.ModelMultipleChoiceField(
+        queryset=Habitacion.objects.filter(estado_habitacion='aseo'),
+        widget=forms.CheckboxSelectMultiple,
+        error_messages={'invalid_choice': "La habitación %(value)s ya no está en aseo."},
+    )
+    accion = forms.ChoiceField(choices=ACCIONES_ASEO, initial='limpia')
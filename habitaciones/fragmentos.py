@@ -0,0 +1,47 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Las tarjetas se invalidan por versión; el tiempo solo limita la memoria ocupada
+TIEMPO_TARJETA = 60 * 60 * 24
+
+
+# --------------------------------
+# 📌 Versión por habitación
+# --------------------------------
+def _clave_version(habitacion_id):
+    return f'habitaciones:tarjeta:{habitacion_id}:version'
+
+
+def _nuevas_versiones(habitacion_ids):
+    cache.set_many({_clave_version(pk): uuid4().hex for pk in habitacion_ids}, timeout=None)
+
+
+def invalidar_tarjetas(habitacion_ids):
+    """
+    Cambia la versión de las tarjetas: la próxima carga del tablero las vuelve a renderizar.
+    Se renueva ya y otra vez al confirmar la transacción, por si otra petición guardó
+    la tarjeta leyendo datos aún sin confirmar.
+    """
+    habitacion_ids = {pk for pk in habitacion_ids if pk}
+    if not habitacion_ids:
+        return
+    _nuevas_versiones(habitacion_ids)
+    transaction.on_commit(lambda: _nuevas_versiones(habitacion_ids))
+
+
+def asignar_versiones(habitaciones):
+    """
+    Pone ``version_tarjeta`` en cada habitación con un único ``get_many`` a la caché.
+    """
+    claves = {_clave_version(h.pk): h for h in habitaciones}
+    versiones = cache.get_many(claves)
+    faltantes = {}
+    for clave, habitacion in claves.items():
+        if clave not in versiones:
+            versiones[clave] = faltantes[clave] = uuid4().hex
+        habitacion.version_tarjeta = versiones[clave]
+    if faltantes:
+        cache.set_many(faltantes, timeout=None)
+    return habitaciones
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils.functional import cached_property
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Ancho máximo en píxeles de cada derivado
+TAMANOS = {
+    'miniatura': 320,
+    'mediana': 800,
+}
+
+CALIDAD_JPEG = 82
+CALIDAD_WEBP = 80
+
+# Un solo hilo basta: los derivados se generan fuera de la petición, en orden
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='derivados')
+
+
+# --------------------------------
+# 📌 Rutas de los derivados
+# --------------------------------
+def ruta_derivado(nombre, tamano, webp=False):
+    """
+    ``habitaciones/foto.jpg`` -> ``habitaciones/foto__miniatura.jpg`` (o ``.webp``).
+    Los derivados se guardan junto al original.
+    """
+    base, extension = os.path.splitext(nombre)
+    return f"{base}__{tamano}{'.webp' if webp else extension.lower()}"
+
+
+def _rutas_derivados(nombre):
+    return [ruta_derivado(nombre, tamano, webp) for tamano in TAMANOS for webp in (False, True)]
+
+
+# --------------------------------
+# 📌 Registro de derivados existentes
+# --------------------------------
+def _clave_registro(nombre):
+    return f'imagenes:derivados:{hashlib.md5(nombre.encode()).hexdigest()}'
+
+
+def registrar_derivados(imagen, rutas):
+    """
+    Anota qué derivados de ``imagen`` existen: las plantillas leen esto en vez de
+    preguntarle al storage en cada render.
+    """
+    cache.set(_clave_registro(imagen.name), frozenset(rutas), None)
+
+
+def derivados_existentes(imagen):
+    """
+    Rutas de los derivados de ``imagen`` que existen. Sin registro (otro proceso, caché
+    vaciada) se revisa el storage una vez y se anota.
+    """
+    existentes = cache.get(_clave_registro(imagen.name))
+    if existentes is None:
+        existentes = frozenset(ruta for ruta in _rutas_derivados(imagen.name) if imagen.storage.exists(ruta))
+        registrar_derivados(imagen, existentes)
+    return existentes
+
+
+def derivados_pendientes(imagen):
+    if not imagen:
+        return False
+    return ruta_derivado(imagen.name, 'miniatura', webp=True) not in derivados_existentes(imagen)
+
+
+class DerivadosImagen:
+    """
+    URLs de los derivados de un ``ImageField``. Si un derivado aún no existe se usa
+    el original, así la plantilla nunca queda sin imagen. Cuáles existen se lee una vez
+    del registro (ver ``derivados_existentes``), no del storage.
+    """
+
+    def __init__(self, imagen):
+        self.imagen = imagen
+
+    def __bool__(self):
+        return bool(self.imagen)
+
+    @cached_property
+    def _existentes(self):
+        return derivados_existentes(self.imagen)
+
+    def url(self, tamano, webp=False):
+        if not self.imagen:
+            return ''
+        ruta = ruta_derivado(self.imagen.name, tamano, webp)
+        if ruta in self._existentes:
+            return self.imagen.storage.url(ruta)
+        return '' if webp else self.imagen.url
+
+    @property
+    def miniatura(self):
+        return self.url('miniatura')
+
+    @property
+    def mediana(self):
+        return self.url('mediana')
+
+    def srcset(self, webp=False):
+        """
+        ``srcset`` con los derivados que existen; vacío si aún no hay ninguno.
+        """
+        if not self.imagen:
+            return ''
+        partes = []
+        for tamano, ancho in TAMANOS.items():
+            ruta = ruta_derivado(self.imagen.name, tamano, webp)
+            if ruta in self._existentes:
+                partes.append(f"{self.imagen.storage.url(ruta)} {ancho}w")
+        return ', '.join(partes)
+
+
+# --------------------------------
+# 📌 Generación con Pillow
+# --------------------------------
+def _codificar(imagen, formato, calidad):
+    salida = BytesIO()
+    if formato == 'JPEG' and imagen.mode not in ('RGB', 'L'):
+        imagen = imagen.convert('RGB')
+    imagen.save(salida, format=formato, quality=calidad, optimize=True)
+    return salida.getvalue()
+
+
+def _guardar(storage, ruta, contenido):
+    if storage.exists(ruta):
+        storage.delete(ruta)
+    storage.save(ruta, ContentFile(contenido))
+
+
+def generar_derivados(imagen):
+    """
+    Genera los tamaños de ``TAMANOS`` en el formato original y en WebP y los anota en el
+    registro. Devuelve las rutas escritas.
+    """
+    storage = imagen.storage
+    with storage.open(imagen.name, 'rb') as archivo:
+        original = ImageOps.exif_transpose(Image.open(archivo))
+        original.load()
+
+    formato = (original.format or Image.registered_extensions().get(
+        os.path.splitext(imagen.name)[1].lower(), 'JPEG'
+    ))
+    if formato not in ('JPEG', 'PNG', 'WEBP', 'GIF'):
+        formato = 'JPEG'
+
+    escritas = []
+    for tamano, ancho in TAMANOS.items():
+        copia = original.copy()
+        copia.thumbnail((ancho, ancho), Image.LANCZOS)
+
+        ruta = ruta_derivado(imagen.name, tamano)
+        _guardar(storage, ruta, _codificar(copia, formato, CALIDAD_JPEG))
+        escritas.append(ruta)
+
+        ruta_webp = ruta_derivado(imagen.name, tamano, webp=True)
+        _guardar(storage, ruta_webp, _codificar(copia, 'WEBP', CALIDAD_WEBP))
+        escritas.append(ruta_webp)
+    registrar_derivados(imagen, escritas)
+    return escritas
+
+
+def _generar_en_segundo_plano(modelo, pk, campo, al_terminar=None):
+    close_old_connections()
+    try:
+        instancia = modelo.objects.filter(pk=pk).only(campo).first()
+        imagen = getattr(instancia, campo, None)
+        if imagen:
+            generar_derivados(imagen)
+            if al_terminar:
+                al_terminar(pk)
+    except Exception:
+        logger.exception("No se pudieron generar los derivados de %s %s", modelo.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def encolar_derivados(instancia, campo='imagen', al_terminar=None):
+    """
+    Programa la generación de derivados fuera del ciclo de la petición. ``al_terminar``
+    recibe el ``pk`` una vez escritos los derivados: lo que se cacheó con la imagen
+    original (sin ``srcset``) puede invalidarse ahí.
+    """
+    return _executor.submit(_generar_en_segundo_plano, type(instancia), instancia.pk, campo, al_terminar)
@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from .eventos import publicar_estados
+from .fragmentos import invalidar_tarjetas
+from .forms import HabitacionEdicionLoteForm, HabitacionLoteForm
+from .models import Habitacion
+
+CAMPOS_EDICION = ['precio', 'estado_habitacion', 'tipo']
+
+
+# --------------------------------
+# 📌 Lectura del archivo
+# --------------------------------
+class ArchivoInvalido(ValueError):
+    pass
+
+
+def leer_filas(archivo):
+    """
+    Convierte un archivo CSV o JSON subido en una lista de diccionarios.
+    El JSON puede ser una lista de objetos o ``{"habitaciones": [...]}``.
+    """
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+
+    if archivo.name.lower().endswith('.json'):
+        try:
+            datos = json.loads(contenido)
+        except json.JSONDecodeError as e:
+            raise ArchivoInvalido(f"JSON inválido: {e}")
+        if isinstance(datos, dict):
+            datos = datos.get('habitaciones', [])
+        if not isinstance(datos, list) or not all(isinstance(fila, dict) for fila in datos):
+            raise ArchivoInvalido("El JSON debe ser una lista de habitaciones.")
+        return datos
+
+    lector = csv.DictReader(io.StringIO(contenido))
+    return [
+        {clave.strip(): (valor or '').strip() for clave, valor in fila.items() if clave}
+        for fila in lector
+    ]
+
+
+def _numeros_repetidos(numeros):
+    vistos, repetidos = set(), set()
+    for numero in numeros:
+        (repetidos if numero in vistos else vistos).add(numero)
+    return repetidos
+
+
+# --------------------------------
+# 📌 Importación masiva
+# --------------------------------
+def importar_habitaciones(filas):
+    """
+    Crea todas las habitaciones del lote o ninguna.
+    Devuelve ``(creadas, errores)`` donde ``errores`` es una lista de
+    ``{'fila': n, 'errores': {campo: [mensajes]}}`` con filas numeradas desde 1.
+    """
+    errores = []
+    validas = []
+    for n, fila in enumerate(filas, start=1):
+        form = HabitacionLoteForm(data=fila)
+        if form.is_valid():
+            validas.append((n, form.instance))
+        else:
+            errores.append({'fila': n, 'errores': form.errors.get_json_data()})
+
+    numeros = [habitacion.numero for _, habitacion in validas]
+    repetidos = _numeros_repetidos(numeros)
+    existentes = set(Habitacion.objects.filter(numero__in=numeros).values_list('numero', flat=True))
+    for n, habitacion in validas:
+        if habitacion.numero in existentes:
+            mensaje = "Ya existe una habitación con este número."
+        elif habitacion.numero in repetidos:
+            mensaje = "El número está repetido en el archivo."
+        else:
+            continue
+        errores.append({'fila': n, 'errores': {'numero': [{'message': mensaje, 'code': 'unique'}]}})
+
+    if errores:
+        return 0, sorted(errores, key=lambda e: e['fila'])
+
+    for _, habitacion in validas:
+        # bulk_create no pasa por save()
+        if habitacion.piso is None:
+            habitacion.piso = Habitacion.piso_desde_numero(habitacion.numero)
+
+    with transaction.atomic():
+        creadas = Habitacion.objects.bulk_create([h for _, h in validas], batch_size=500)
+        # bulk_create no emite señales
+        invalidar_tarjetas(h.pk for h in creadas)
+    return len(validas), []
+
+
+# --------------------------------
+# 📌 Edición masiva de precio, estado y tipo
+# --------------------------------
+def editar_habitaciones(filas):
+    """
+    Cambia precio, estado o tipo de habitaciones existentes identificadas por ``numero``.
+    Solo se actualizan los campos presentes en cada fila. Todo el lote o nada.
+    Devuelve ``(actualizadas, errores)`` con el mismo formato que ``importar_habitaciones``.
+    """
+    errores = []
+    cambios = []
+    for n, fila in enumerate(filas, start=1):
+        form = HabitacionEdicionLoteForm(data=fila)
+        if not form.is_valid():
+            errores.append({'fila': n, 'errores': form.errors.get_json_data()})
+            continue
+        datos = {
+            campo: form.cleaned_data[campo] for campo in CAMPOS_EDICION
+            if fila.get(campo) not in (None, '')
+        }
+        cambios.append((n, form.cleaned_data['numero'], datos))
+
+    numeros = [numero for _, numero, _ in cambios]
+    repetidos = _numeros_repetidos(numeros)
+    habitaciones = Habitacion.objects.only('id', 'numero', *CAMPOS_EDICION).in_bulk(numeros, field_name='numero')
+    for n, numero, _ in cambios:
+        if numero not in habitaciones:
+            mensaje = "No existe una habitación con este número."
+        elif numero in repetidos:
+            mensaje = "El número está repetido en el archivo."
+        else:
+            continue
+        errores.append({'fila': n, 'errores': {'numero': [{'message': mensaje, 'code': 'invalid'}]}})
+
+    if errores:
+        return 0, sorted(errores, key=lambda e: e['fila'])
+
+    campos = set()
+    modificadas = []
+    for _, numero, datos in cambios:
+        habitacion = habitaciones[numero]
+        for campo, valor in datos.items():
+            setattr(habitacion, campo, valor)
+        campos.update(datos)
+        modificadas.append(habitacion)
+
+    if campos:
+        with transaction.atomic():
+            Habitacion.objects.bulk_update(modificadas, sorted(campos), batch_size=500)
+            # bulk_update no emite señales: las tarjetas y las pantallas en vivo se avisan aquí
+            ids = [h.pk for h in modificadas]
+            invalidar_tarjetas(ids)
+            if campos & {'estado_habitacion', 'tipo'}:
+                transaction.on_commit(lambda: publicar_estados(ids))
+    return len(modificadas), []
@@ -0,0 +1,214 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from huespedes.models import Estadia
+from .models import Habitacion, NocheHabitacion
+
+
+# --------------------------------
+# 📌 Noches de una estadía
+# --------------------------------
+def como_fecha(valor):
+    """
+    ``Estadia.fecha_entrada`` usa ``timezone.now`` por defecto, así que antes de guardarse
+    puede ser un datetime. Se normaliza a fecha local.
+    """
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    return valor
+
+
+def noches_estadia(fecha_entrada, fecha_salida):
+    """
+    Noches ocupadas por una estadía: desde la entrada hasta la noche previa a la salida.
+    Las estadías abiertas (sin salida) no se materializan; se suman al leer, ver
+    ``noches_abiertas``. Así las noches de una estadía dependen solo de sus fechas.
+    """
+    entrada = como_fecha(fecha_entrada)
+    salida = como_fecha(fecha_salida)
+    if entrada is None or salida is None:
+        return []
+    return [entrada + timedelta(days=i) for i in range((salida - entrada).days)]
+
+
+# --------------------------------
+# 📌 Mantenimiento incremental
+# --------------------------------
+def sumar_noches(habitacion_id, fechas, cantidad=1):
+    """
+    Suma huéspedes a las noches indicadas. Las filas faltantes se insertan en cero y luego
+    todas se incrementan con un UPDATE, así dos altas simultáneas no se pisan.
+    """
+    if not habitacion_id or not fechas:
+        return
+    with transaction.atomic():
+        NocheHabitacion.objects.bulk_create(
+            [NocheHabitacion(habitacion_id=habitacion_id, fecha=fecha) for fecha in fechas],
+            ignore_conflicts=True,
+        )
+        NocheHabitacion.objects.filter(habitacion_id=habitacion_id, fecha__in=fechas).update(
+            huespedes=F('huespedes') + cantidad
+        )
+
+
+def restar_noches(habitacion_id, fechas, cantidad=1):
+    """
+    Resta huéspedes de las noches indicadas y elimina las noches que quedan vacías.
+    """
+    if not habitacion_id or not fechas:
+        return
+    with transaction.atomic():
+        noches = NocheHabitacion.objects.filter(habitacion_id=habitacion_id, fecha__in=fechas)
+        noches.filter(huespedes__lte=cantidad).delete()
+        noches.update(huespedes=F('huespedes') - cantidad)
+
+
+def sumar_estadias(estadias):
+    """
+    ``sumar_noches`` para varias estadías ``(habitacion_id, fecha_entrada, fecha_salida)``
+    a la vez, para altas con ``bulk_create`` (que no emite señales). Un INSERT para todas
+    las noches y un UPDATE por habitación y cantidad de huéspedes.
+    """
+    conteo = Counter()
+    for habitacion_id, fecha_entrada, fecha_salida in estadias:
+        for fecha in noches_estadia(fecha_entrada, fecha_salida):
+            conteo[(habitacion_id, fecha)] += 1
+    if not conteo:
+        return
+    grupos = defaultdict(list)
+    for (habitacion_id, fecha), cantidad in conteo.items():
+        grupos[(habitacion_id, cantidad)].append(fecha)
+    with transaction.atomic():
+        NocheHabitacion.objects.bulk_create(
+            [NocheHabitacion(habitacion_id=habitacion_id, fecha=fecha) for habitacion_id, fecha in conteo],
+            ignore_conflicts=True,
+        )
+        for (habitacion_id, cantidad), fechas in grupos.items():
+            NocheHabitacion.objects.filter(habitacion_id=habitacion_id, fecha__in=fechas).update(
+                huespedes=F('huespedes') + cantidad
+            )
+
+
+def mover_estadia(anterior, nueva):
+    """
+    Aplica el cambio entre dos estadías ``(habitacion_id, fecha_entrada, fecha_salida)``.
+    Solo se tocan las noches que realmente cambian.
+    """
+    if anterior == nueva:
+        return
+    habitacion_anterior, noches_anteriores = anterior[0], set(noches_estadia(*anterior[1:]))
+    habitacion_nueva, noches_nuevas = nueva[0], set(noches_estadia(*nueva[1:]))
+
+    if habitacion_anterior == habitacion_nueva:
+        restar_noches(habitacion_anterior, sorted(noches_anteriores - noches_nuevas))
+        sumar_noches(habitacion_nueva, sorted(noches_nuevas - noches_anteriores))
+    else:
+        restar_noches(habitacion_anterior, sorted(noches_anteriores))
+        sumar_noches(habitacion_nueva, sorted(noches_nuevas))
+
+
+# --------------------------------
+# 📌 Reconstrucción completa
+# --------------------------------
+def reconstruir_inventario(estadias, tamano_lote=1000):
+    """
+    Reconstruye la tabla a partir de ``estadias``: un iterable de
+    ``(habitacion_id, fecha_entrada, fecha_salida)`` ordenado por habitación.
+    Se acumula una habitación a la vez y se inserta por lotes, así la memoria no crece
+    con el historial. Devuelve el número de noches escritas.
+    """
+    escritas = 0
+    lote = []
+    actual = None
+    noches = Counter()
+
+    def volcar_habitacion():
+        for fecha, huespedes in sorted(noches.items()):
+            lote.append(NocheHabitacion(habitacion_id=actual, fecha=fecha, huespedes=huespedes))
+        noches.clear()
+
+    with transaction.atomic():
+        NocheHabitacion.objects.all().delete()
+        for habitacion_id, fecha_entrada, fecha_salida in estadias:
+            if habitacion_id != actual:
+                volcar_habitacion()
+                actual = habitacion_id
+            noches.update(noches_estadia(fecha_entrada, fecha_salida))
+            if len(lote) >= tamano_lote:
+                NocheHabitacion.objects.bulk_create(lote)
+                escritas += len(lote)
+                lote.clear()
+        volcar_habitacion()
+        NocheHabitacion.objects.bulk_create(lote, batch_size=tamano_lote)
+        escritas += len(lote)
+    return escritas
+
+
+# --------------------------------
+# 📌 Lecturas sobre el inventario
+# --------------------------------
+def rango_fechas(desde, hasta):
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days)]
+
+
+def noches_abiertas(desde, hasta, habitaciones=None):
+    """
+    Noches en [desde, hasta) de las estadías sin fecha de salida, que se asumen
+    ocupando todo el rango. Solo lee el pequeño conjunto de estadías abiertas.
+    """
+    abiertas = Estadia.objects.filter(fecha_salida__isnull=True, fecha_entrada__lt=hasta)
+    if habitaciones is not None:
+        abiertas = abiertas.filter(habitacion__in=habitaciones)
+    noches = Counter()
+    for habitacion_id, fecha_entrada in abiertas.values_list('habitacion_id', 'fecha_entrada'):
+        for fecha in rango_fechas(max(fecha_entrada, desde), hasta):
+            noches[(habitacion_id, fecha)] += 1
+    return noches
+
+
+def calendario_ocupacion(desde, hasta, habitaciones=None):
+    """
+    ``{(habitacion_id, fecha): huespedes}`` para las noches ocupadas en [desde, hasta).
+    """
+    noches = NocheHabitacion.objects.filter(fecha__gte=desde, fecha__lt=hasta)
+    if habitaciones is not None:
+        noches = noches.filter(habitacion__in=habitaciones)
+    calendario = noches_abiertas(desde, hasta, habitaciones)
+    for habitacion_id, fecha, huespedes in noches.values_list('habitacion_id', 'fecha', 'huespedes'):
+        calendario[(habitacion_id, fecha)] += huespedes
+    return dict(calendario)
+
+
+def disponibles_por_tipo(desde, hasta):
+    """
+    Cuadro de habitaciones libres por tipo y noche: ``{fecha: {tipo: libres}}``.
+    Lee el total por tipo, las noches materializadas y las estadías abiertas.
+    """
+    habitaciones = Habitacion.objects.exclude(estado_habitacion='mantenimiento')
+    tipos = dict(habitaciones.values_list('id', 'tipo'))
+    totales = Counter(tipos.values())
+
+    ocupadas = defaultdict(Counter)
+    for habitacion_id, fecha in calendario_ocupacion(desde, hasta):
+        if habitacion_id in tipos:
+            ocupadas[fecha][tipos[habitacion_id]] += 1
+
+    return {
+        fecha: {tipo: total - ocupadas[fecha][tipo] for tipo, total in totales.items()}
+        for fecha in rango_fechas(desde, hasta)
+    }
+
+
+def ocupacion_por_noche(desde, hasta):
+    """
+    Pronóstico simple: habitaciones y huéspedes por noche en [desde, hasta).
+    """
+    resultado = {fecha: {'habitaciones': 0, 'huespedes': 0} for fecha in rango_fechas(desde, hasta)}
+    for (habitacion_id, fecha), huespedes in calendario_ocupacion(desde, hasta).items():
+        resultado[fecha]['habitaciones'] += 1
+        resultado[fecha]['huespedes'] += huespedes
+    return resultado
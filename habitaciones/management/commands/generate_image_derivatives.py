@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from habitaciones.imagenes import derivados_pendientes, generar_derivados
+from habitaciones.models import Habitacion
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = "Genera miniaturas, tamaños medianos y variantes WebP de las fotos de habitaciones y productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenera aunque ya existan.")
+
+    def handle(self, *args, **options):
+        generadas = errores = 0
+        for modelo in (Habitacion, Producto):
+            instancias = modelo.objects.exclude(imagen='').exclude(imagen__isnull=True).only('id', 'imagen')
+            for instancia in instancias.iterator(chunk_size=200):
+                if not options['force'] and not derivados_pendientes(instancia.imagen):
+                    continue
+                try:
+                    generar_derivados(instancia.imagen)
+                    generadas += 1
+                except Exception as e:
+                    errores += 1
+                    self.stderr.write(f"{modelo.__name__} {instancia.pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"{generadas} imágenes procesadas, {errores} con errores."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from habitaciones.inventario import reconstruir_inventario
+from huespedes.archivo import historial_estadias
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el inventario de noches por habitación a partir de las estadías."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Filas por inserción.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Estadías leídas por bloque.")
+
+    def handle(self, *args, **options):
+        # Estadías cerradas (también las archivadas) en orden de habitación, leídas en
+        # bloques sin cargar el historial
+        estadias = (
+            historial_estadias(('habitacion_id', 'fecha_entrada', 'fecha_salida'), Q(fecha_salida__isnull=False))
+            .order_by('habitacion_id', 'fecha_entrada')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        escritas = reconstruir_inventario(estadias, tamano_lote=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Inventario reconstruido: {escritas} noches."))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from habitaciones.models import Habitacion
+from huespedes.models import Estadia
+
+
+class Command(BaseCommand):
+    help = "Recalcula el contador de ocupación de las habitaciones por lotes y corrige desviaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Habitaciones por lote.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo reporta, no corrige.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        revisadas = corregidas = 0
+        ultimo_id = 0
+
+        while True:
+            lote = list(
+                Habitacion.objects.filter(pk__gt=ultimo_id)
+                .order_by('pk')
+                .only('id', 'numero', 'ocupacion')[:chunk_size]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].pk
+
+            conteos = dict(
+                Estadia.objects.activas().filter(habitacion_id__in=[h.pk for h in lote])
+                .order_by()
+                .values_list('habitacion_id')
+                .annotate(total=Count('id'))
+            )
+
+            desviadas = []
+            for habitacion in lote:
+                real = conteos.get(habitacion.pk, 0)
+                if habitacion.ocupacion != real:
+                    self.stdout.write(
+                        f"Habitación {habitacion.numero}: {habitacion.ocupacion} -> {real}"
+                    )
+                    desviadas.append(habitacion.pk)
+
+            if desviadas and not dry_run:
+                # El recuento se repite dentro del UPDATE para no pisar cambios concurrentes
+                conteo = Estadia.objects.activas().filter(
+                    habitacion=OuterRef('pk')
+                ).order_by().values('habitacion').annotate(c=Count('id')).values('c')
+                Habitacion.objects.filter(pk__in=desviadas).update(
+                    ocupacion=Coalesce(Subquery(conteo), 0)
+                )
+
+            revisadas += len(lote)
+            corregidas += len(desviadas)
+
+        accion = "con desviación" if dry_run else "corregidas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{revisadas} habitaciones revisadas, {corregidas} {accion}."
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def calcular_ocupacion(apps, schema_editor):
+    Habitacion = apps.get_model('habitaciones', 'Habitacion')
+    Huesped = apps.get_model('huespedes', 'Huesped')
+    conteo = Huesped.objects.filter(
+        habitacion=OuterRef('pk')
+    ).order_by().values('habitacion').annotate(c=Count('id')).values('c')
+    Habitacion.objects.update(ocupacion=Coalesce(Subquery(conteo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0012_habitacion_descripcion'),
+        ('huespedes', '0008_alter_huesped_fecha_salida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitacion',
+            name='ocupacion',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Huéspedes alojados'),
+        ),
+        migrations.RunPython(calcular_ocupacion, migrations.RunPython.noop),
+    ]
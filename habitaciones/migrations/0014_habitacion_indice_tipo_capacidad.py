@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0013_habitacion_ocupacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habitacion',
+            index=models.Index(fields=['tipo', 'capacidad'], name='habitacione_tipo_ed4589_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:12
+
+from collections import Counter
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def construir_inventario(apps, schema_editor):
+    Huesped = apps.get_model('huespedes', 'Huesped')
+    NocheHabitacion = apps.get_model('habitaciones', 'NocheHabitacion')
+    noches = Counter()
+    estadias = Huesped.objects.filter(fecha_salida__isnull=False).values_list(
+        'habitacion_id', 'fecha_entrada', 'fecha_salida'
+    )
+    for habitacion_id, entrada, salida in estadias.iterator():
+        for i in range((salida - entrada).days):
+            noches[(habitacion_id, entrada + timedelta(days=i))] += 1
+    NocheHabitacion.objects.bulk_create(
+        [NocheHabitacion(habitacion_id=h, fecha=f, huespedes=n) for (h, f), n in noches.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0014_habitacion_indice_tipo_capacidad'),
+        ('huespedes', '0009_huesped_indices_estadia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NocheHabitacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Noche')),
+                ('huespedes', models.PositiveIntegerField(default=0, verbose_name='Huéspedes')),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='noches', to='habitaciones.habitacion', verbose_name='Habitación')),
+            ],
+            options={
+                'verbose_name': 'Noche de habitación',
+                'verbose_name_plural': 'Noches de habitación',
+                'ordering': ['fecha', 'habitacion'],
+                'indexes': [models.Index(fields=['fecha', 'habitacion'], name='habitacione_fecha_85440e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('habitacion', 'fecha'), name='noche_habitacion_unica')],
+            },
+        ),
+        migrations.RunPython(construir_inventario, migrations.RunPython.noop),
+    ]
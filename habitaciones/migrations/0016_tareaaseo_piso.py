@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def deducir_pisos(apps, schema_editor):
+    Habitacion = apps.get_model('habitaciones', 'Habitacion')
+    habitaciones = list(Habitacion.objects.only('id', 'numero'))
+    for habitacion in habitaciones:
+        numero = (habitacion.numero or '').strip()
+        habitacion.piso = int(numero[:-2]) if numero.isdigit() and len(numero) >= 3 else None
+    Habitacion.objects.bulk_update(habitaciones, ['piso'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0015_nochehabitacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitacion',
+            name='piso',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Piso'),
+        ),
+        migrations.RunPython(deducir_pisos, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TareaAseo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creada', models.DateTimeField(auto_now_add=True, verbose_name='En cola desde')),
+                ('completada', models.DateTimeField(blank=True, null=True, verbose_name='Completada')),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tareas_aseo', to='habitaciones.habitacion', verbose_name='Habitación')),
+            ],
+            options={
+                'verbose_name': 'Tarea de aseo',
+                'verbose_name_plural': 'Tareas de aseo',
+                'ordering': ['creada'],
+                'indexes': [models.Index(fields=['completada', 'habitacion'], name='habitacione_complet_d14933_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('completada__isnull', True)), fields=('habitacion',), name='aseo_pendiente_unico')],
+            },
+        ),
+    ]
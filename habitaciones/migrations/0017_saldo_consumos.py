@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0016_tareaaseo_piso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitacion',
+            name='saldo_consumos',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Saldo de consumos'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.apps import apps
+from .imagenes import DerivadosImagen
 from django.core.validators import MinValueValidator
 
 class Habitacion(models.Model):
@@ -60,43 +63,159 @@ class Habitacion(models.Model):
         upload_to='habitaciones/', null=True, blank=True
     )
 
+    # Si no se indica, se deduce del número (305 -> piso 3); ordena la cola de aseo
+    piso = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Piso"
+    )
+
+    # Contador desnormalizado de huéspedes; se mantiene con incrementos atómicos
+    ocupacion = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Huéspedes alojados"
+    )
+
+    # Suma de precio_total de sus consumos (también los archivados); la mantienen los
+    # servicios de consumos en la misma transacción. Ver verify_balances
+    saldo_consumos = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Saldo de consumos"
+    )
+
     class Meta:
         ordering = ['numero']
         verbose_name = "Habitación"
         verbose_name_plural = "Habitaciones"
+        indexes = [
+            models.Index(fields=['tipo', 'capacidad']),
+        ]
 
     def __str__(self):
         return f"Habitación {self.numero} - {self.get_tipo_display()} ({self.get_estado_habitacion_display()})"
 
+    @staticmethod
+    def piso_desde_numero(numero):
+        numero = (numero or '').strip()
+        return int(numero[:-2]) if numero.isdigit() and len(numero) >= 3 else None
+
+    def save(self, *args, **kwargs):
+        if self.piso is None:
+            self.piso = self.piso_desde_numero(self.numero)
+        # Ocupación y saldo solo cambian con incrementos atómicos; un save normal no los pisa
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in ('ocupacion', 'saldo_consumos')
+            ]
+        super().save(*args, **kwargs)
 
+    @property
+    def imagen_derivados(self):
+        return DerivadosImagen(self.imagen)
 
     def obtener_huespedes(self):
         Huesped = apps.get_model('huespedes', 'Huesped')
-        return list(Huesped.objects.filter(habitacion=self))
+        return list(Huesped.objects.filter(estadias__habitacion=self, estadias__activa=True))
 
     @property
     def capacidad_actual(self):
-        return len(self.obtener_huespedes())
+        return self.ocupacion
 
     def esta_disponible(self):
-        if self.estado_habitacion == 'disponible' and self.capacidad_actual < self.capacidad:
-            return True
-        else:
-            if self.capacidad_actual >= self.capacidad:
-                self.estado_habitacion = 'ocupada'
-                self.save()
-            return False
-
+        return self.estado_habitacion == 'disponible' and self.ocupacion < self.capacidad
 
     def esta_llena(self):
-        return self.capacidad_actual >= self.capacidad
+        return self.ocupacion >= self.capacidad
+
+    def sumar_ocupacion(self, cantidad=1):
+        """
+        Incrementa el contador de ocupación directamente en la base de datos.
+        """
+        Habitacion.objects.filter(pk=self.pk).update(ocupacion=F('ocupacion') + cantidad)
+        self.refresh_from_db(fields=['ocupacion'])
+
+    def restar_ocupacion(self, cantidad=1):
+        """
+        Decrementa el contador de ocupación en la base de datos sin bajar de cero.
+        """
+        Habitacion.objects.filter(pk=self.pk).update(
+            ocupacion=Greatest(F('ocupacion') - cantidad, Value(0))
+        )
+        self.refresh_from_db(fields=['ocupacion'])
 
     def actualizar_estado(self):
-        if self.capacidad_actual >= self.capacidad:
+        if self.ocupacion >= self.capacidad:
             self.estado_habitacion = 'ocupada'
-        elif self.capacidad_actual == 0:
+        elif self.ocupacion == 0:
             self.estado_habitacion = 'disponible'
         else:
             self.estado_habitacion = 'disponible'
-        self.save()
+        self.save(update_fields=['estado_habitacion'])
+
+
+class NocheHabitacion(models.Model):
+    """
+    Inventario materializado de noches: una fila por habitación y noche ocupada.
+    Se mantiene de forma incremental desde las estadías (``huespedes.Estadia``).
+    """
+    habitacion = models.ForeignKey(
+        Habitacion,
+        on_delete=models.CASCADE,
+        related_name='noches',
+        verbose_name="Habitación"
+    )
+    fecha = models.DateField(verbose_name="Noche")
+    huespedes = models.PositiveIntegerField(default=0, verbose_name="Huéspedes")
+
+    class Meta:
+        ordering = ['fecha', 'habitacion']
+        verbose_name = "Noche de habitación"
+        verbose_name_plural = "Noches de habitación"
+        constraints = [
+            models.UniqueConstraint(fields=['habitacion', 'fecha'], name='noche_habitacion_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha', 'habitacion']),
+        ]
+
+    def __str__(self):
+        return f"Habitación {self.habitacion_id} - {self.fecha} ({self.huespedes})"
+
+
+class TareaAseo(models.Model):
+    """
+    Limpieza pendiente o hecha de una habitación. Se crea al quedar vacía en el check-out;
+    ``completada`` vacío significa que sigue en la cola.
+    """
+    habitacion = models.ForeignKey(
+        Habitacion,
+        on_delete=models.CASCADE,
+        related_name='tareas_aseo',
+        verbose_name="Habitación"
+    )
+    creada = models.DateTimeField(auto_now_add=True, verbose_name="En cola desde")
+    completada = models.DateTimeField(null=True, blank=True, verbose_name="Completada")
 
+    class Meta:
+        ordering = ['creada']
+        verbose_name = "Tarea de aseo"
+        verbose_name_plural = "Tareas de aseo"
+        constraints = [
+            # Una habitación no entra dos veces a la cola
+            models.UniqueConstraint(
+                fields=['habitacion'],
+                condition=models.Q(completada__isnull=True),
+                name='aseo_pendiente_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['completada', 'habitacion']),
+        ]
+
+    def __str__(self):
+        return f"Habitación {self.habitacion_id} - aseo {'completado' if self.completada else 'pendiente'}"
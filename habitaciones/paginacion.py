@@ -0,0 +1,155 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+TAMANO_PAGINA = 24
+
+
+class CursorInvalido(ValueError):
+    """
+    El cursor recibido no se pudo decodificar o no corresponde al orden de la lista.
+    """
+
+
+# --------------------------------
+# 📌 Cursores
+# --------------------------------
+def _serializar(valor):
+    if hasattr(valor, 'isoformat'):
+        # Sin pérdida de microsegundos: el cursor debe reproducir el valor exacto
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(valores):
+    datos = json.dumps([_serializar(valor) for valor in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, claves):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError) as error:
+        raise CursorInvalido("Cursor de paginación inválido.") from error
+    if not isinstance(valores, list) or len(valores) != len(claves):
+        raise CursorInvalido("Cursor de paginación inválido.")
+    return valores
+
+
+# --------------------------------
+# 📌 Paginación por clave (keyset)
+# --------------------------------
+def claves_orden(orden):
+    """
+    ``('-fecha_consumo', '-id')`` -> ``[('fecha_consumo', True), ('id', True)]``.
+    """
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+
+def filtro_siguientes(orden, valores):
+    """
+    Filas posteriores a ``valores`` en el orden dado, sin OFFSET:
+    ``a > x OR (a = x AND b > y) ...``. La primera clave se acota además por separado
+    para que el motor recorra el índice como un rango.
+    """
+    claves = claves_orden(orden)
+    filtro = Q()
+    iguales = Q()
+    for (campo, descendente), valor in zip(claves, valores):
+        filtro |= iguales & Q(**{f"{campo}__{'lt' if descendente else 'gt'}": valor})
+        iguales &= Q(**{campo: valor})
+
+    campo, descendente = claves[0]
+    return Q(**{f"{campo}__{'lte' if descendente else 'gte'}": valores[0]}) & filtro
+
+
+class Pagina:
+    def __init__(self, objetos, siguiente):
+        self.objetos = objetos
+        self.siguiente = siguiente
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def hay_mas(self):
+        return self.siguiente is not None
+
+
+def paginar(queryset, orden, cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Una página de ``queryset`` ordenada por ``orden``, que debe terminar en una clave
+    única y no nula (normalmente ``id``). Se pide una fila de más para saber si hay
+    otra página; el cursor siguiente guarda las claves de la última fila entregada.
+    """
+    queryset = queryset.order_by(*orden)
+    if cursor:
+        queryset = queryset.filter(filtro_siguientes(orden, decodificar_cursor(cursor, orden)))
+
+    objetos = list(queryset[:tamano + 1])
+    siguiente = None
+    if len(objetos) > tamano:
+        objetos = objetos[:tamano]
+        ultimo = objetos[-1]
+        siguiente = codificar_cursor([getattr(ultimo, campo) for campo, _ in claves_orden(orden)])
+    return Pagina(objetos, siguiente)
+
+
+# --------------------------------
+# 📌 Integración con las vistas
+# --------------------------------
+def es_parcial(request):
+    """
+    Las peticiones AJAX (scroll infinito) reciben solo el fragmento de la página.
+    """
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest' or 'parcial' in request.GET
+
+
+def contexto_pagina(request, queryset, orden, tamano=TAMANO_PAGINA):
+    """
+    Pagina ``queryset`` con el ``?cursor=`` de la petición. Devuelve la página y la URL
+    de la siguiente conservando los demás parámetros de la consulta.
+    """
+    try:
+        pagina = paginar(queryset, orden, request.GET.get('cursor'), tamano)
+    except CursorInvalido as error:
+        raise BadRequest(str(error)) from error
+
+    url_siguiente = None
+    if pagina.hay_mas:
+        parametros = request.GET.copy()
+        parametros.pop('parcial', None)
+        parametros['cursor'] = pagina.siguiente
+        url_siguiente = f"{request.path}?{parametros.urlencode()}"
+    return {'pagina': pagina, 'url_siguiente': url_siguiente}
+
+
+class PaginacionKeysetMixin:
+    """
+    Para ``ListView``: reemplaza la lista completa por una página keyset y, en peticiones
+    AJAX, responde con ``plantilla_parcial`` (solo las tarjetas y el disparador).
+    """
+    orden_keyset = ('id',)
+    tamano_pagina = TAMANO_PAGINA
+    plantilla_parcial = None
+
+    def get_template_names(self):
+        if self.plantilla_parcial and es_parcial(self.request):
+            return [self.plantilla_parcial]
+        return super().get_template_names()
+
+    def get_context_data(self, **kwargs):
+        paginado = contexto_pagina(self.request, self.object_list, self.orden_keyset, self.tamano_pagina)
+        kwargs.setdefault('object_list', paginado['pagina'].objetos)
+        context = super().get_context_data(**kwargs)
+        context.update(paginado)
+        return context
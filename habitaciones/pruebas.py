@@ -0,0 +1,42 @@
+"""
+Ayudas compartidas por las pruebas de las apps: habitaciones con huéspedes alojados y
+perfiles de huésped sin guardar.
+"""
+
+from huespedes.models import Estadia, Huesped
+from .models import Habitacion
+
+
+def crear_habitaciones(cantidad, inicio=100, huespedes_por_habitacion=2):
+    for i in range(inicio, inicio + cantidad):
+        habitacion = Habitacion.objects.create(
+            numero=str(i), tipo='familiar', precio=100, capacidad=4
+        )
+        for j in range(huespedes_por_habitacion):
+            alojar(
+                habitacion,
+                nombre=f'Nombre{j}',
+                apellido=f'Apellido{j}',
+                numero_documento=f'{i}-{j}',
+                correo_electronico=f'huesped{i}-{j}@example.com',
+                telefono='3000000000',
+            )
+
+
+def alojar(habitacion, fecha_entrada=None, fecha_salida=None, **perfil):
+    """
+    Crea el perfil y su estadía activa sin pasar por el check-in (no toca la ocupación).
+    """
+    perfil.setdefault('telefono', '1')
+    estadia = Estadia(huesped=Huesped.objects.create(**perfil), habitacion=habitacion, fecha_salida=fecha_salida)
+    if fecha_entrada:
+        estadia.fecha_entrada = fecha_entrada
+    estadia.save()
+    return estadia
+
+
+def nuevo_huesped(sufijo):
+    return Huesped(
+        nombre='Hilo', apellido=str(sufijo), numero_documento=f'hilo-{sufijo}',
+        correo_electronico=f'hilo{sufijo}@example.com', telefono='1',
+    )
@@ -1,7 +1,27 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from huespedes.models import Estadia
+from .api import CamposSeleccionablesMixin
 from .models import Habitacion
 
-class HabitacionSerializer(serializers.ModelSerializer):
+
+def prefetch_estadias_activas():
+    return Prefetch(
+        'estadias', queryset=Estadia.objects.activas().only('id', 'habitacion_id', 'huesped_id'),
+        to_attr='estadias_activas'
+    )
+
+
+class HabitacionSerializer(CamposSeleccionablesMixin, serializers.ModelSerializer):
+    # Solo lectura: la ocupación la mantienen el check-in y el check-out
+    huespedes = serializers.SerializerMethodField()
+
     class Meta:
         model = Habitacion
         fields = '__all__'
+
+    def get_huespedes(self, habitacion):
+        # Ids de los huéspedes alojados; la vista precarga sus estadías activas
+        if not hasattr(habitacion, 'estadias_activas'):
+            return list(habitacion.estadias.activas().values_list('huesped_id', flat=True))
+        return [estadia.huesped_id for estadia in habitacion.estadias_activas]
@@ -0,0 +1,348 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Prefetch, Q, Value, When
+from django.utils import timezone
+
+from huespedes.models import CAMPOS_UNICOS, Estadia, Huesped, campo_duplicado
+from .aseo import enviar_a_aseo
+from .eventos import publicar_estados
+from .fragmentos import invalidar_tarjetas
+from .inventario import como_fecha, sumar_estadias
+from .models import Habitacion
+
+
+# --------------------------------
+# 📌 Tablero de habitaciones
+# --------------------------------
+def resumen_estados():
+    """
+    Totales del tablero calculados con un único agregado condicional.
+    """
+    return Habitacion.objects.aggregate(
+        total=Count('id'),
+        disponibles=Count('id', filter=Q(estado_habitacion='disponible')),
+        ocupadas=Count('id', filter=Q(estado_habitacion='ocupada')),
+        mantenimiento=Count('id', filter=Q(estado_habitacion='mantenimiento')),
+    )
+
+
+def habitaciones_tablero():
+    """
+    Habitaciones ordenadas por número con las estadías activas y sus huéspedes
+    precargados y ordenados en ``estadias_tablero``. Cuesta dos consultas sin importar
+    cuántas habitaciones haya, y solo lee las estadías activas, no el historial.
+    """
+    estadias = Estadia.objects.activas().select_related('huesped').only(
+        'id', 'habitacion_id', 'huesped__id', 'huesped__nombre', 'huesped__apellido'
+    ).order_by('huesped__apellido', 'huesped__nombre', 'huesped__id')
+    return Habitacion.objects.prefetch_related(
+        Prefetch('estadias', queryset=estadias, to_attr='estadias_tablero')
+    ).order_by('numero')
+
+
+# --------------------------------
+# 📌 Check-in sin condiciones de carrera
+# --------------------------------
+class CheckInRechazado(Exception):
+    """
+    El check-in no puede hacerse; ``str(error)`` explica por qué y ``campo`` indica el
+    dato del huésped responsable, si es uno.
+    """
+    mensaje = "No se pudo registrar al huésped."
+    campo = None
+
+    def __init__(self, mensaje=None):
+        super().__init__(mensaje or self.mensaje)
+
+
+class HabitacionLlena(CheckInRechazado):
+    """
+    La habitación no tiene cupo para otro huésped.
+    """
+    mensaje = "La habitación ya alcanzó su capacidad máxima."
+
+
+class HuespedAlojado(CheckInRechazado):
+    """
+    El huésped ya tiene una estadía activa en otra habitación.
+    """
+    mensaje = "El huésped ya está alojado en otra habitación."
+
+
+class PerfilDuplicado(CheckInRechazado):
+    """
+    Otro huésped con el mismo documento o correo se guardó entre la validación y el
+    INSERT; lo detecta el índice único.
+    """
+
+    def __init__(self, campo):
+        super().__init__(CAMPOS_UNICOS[campo][1])
+        self.campo = campo
+
+
+@contextmanager
+def _perfil_unico():
+    """
+    Convierte la violación del índice único de documento o correo en ``PerfilDuplicado``.
+    Envuelve la transacción completa, así ya está revertida al traducir el error.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        campo = campo_duplicado(error)
+        if campo is None:
+            raise
+        raise PerfilDuplicado(campo) from error
+
+
+def reservar_cupo(habitacion_id, cantidad=1):
+    """
+    Reserva cupo con un UPDATE condicional: solo suma si la ocupación resultante no
+    supera la capacidad. Devuelve ``True`` si la reserva se hizo.
+    """
+    return bool(
+        Habitacion.objects.filter(
+            pk=habitacion_id, ocupacion__lte=F('capacidad') - cantidad
+        ).update(ocupacion=F('ocupacion') + cantidad)
+    )
+
+
+def _marcar_si_llena(*habitacion_ids):
+    Habitacion.objects.filter(
+        pk__in=habitacion_ids, ocupacion__gte=F('capacidad')
+    ).update(estado_habitacion='ocupada')
+
+
+def registrar_huesped(habitacion, huesped, fecha_entrada=None, fecha_salida=None):
+    """
+    Check-in de ``huesped`` en ``habitacion``: guarda el perfil (nuevo o de un huésped que
+    vuelve) y abre su estadía. El cupo se reserva en la misma transacción; si la habitación
+    está llena, el huésped ya está alojado o su documento o correo ya está en uso se lanza
+    ``CheckInRechazado`` y no se escribe nada. Devuelve la estadía.
+    """
+    with _perfil_unico(), transaction.atomic():
+        if huesped.pk and huesped.estadias.activas().exists():
+            raise HuespedAlojado()
+        if not reservar_cupo(habitacion.pk):
+            raise HabitacionLlena()
+        huesped.save()
+        estadia = Estadia(huesped=huesped, habitacion=habitacion, fecha_salida=fecha_salida)
+        if fecha_entrada:
+            estadia.fecha_entrada = fecha_entrada
+        estadia.save()
+        _marcar_si_llena(habitacion.pk)
+    habitacion.refresh_from_db(fields=['ocupacion', 'estado_habitacion'])
+    return estadia
+
+
+def trasladar_huesped(huesped, nueva_habitacion):
+    """
+    Guarda el perfil y, si cambia de habitación, mueve su estadía activa reservando cupo
+    en la nueva y liberándolo en la anterior. Sin estadía activa es un check-in.
+    """
+    estadia = huesped.estadias.activas().select_related('habitacion').first() if huesped.pk else None
+    if nueva_habitacion is None or (estadia and estadia.habitacion_id == nueva_habitacion.pk):
+        with _perfil_unico(), transaction.atomic():
+            huesped.save()
+        return huesped
+    if estadia is None:
+        return registrar_huesped(nueva_habitacion, huesped).huesped
+
+    anterior = estadia.habitacion
+    with _perfil_unico(), transaction.atomic():
+        if not reservar_cupo(nueva_habitacion.pk):
+            raise HabitacionLlena("La habitación seleccionada ya está ocupada.")
+        huesped.save()
+        estadia.habitacion = nueva_habitacion
+        estadia.save(update_fields=['habitacion'])
+        anterior.restar_ocupacion()
+        _liberar(anterior)
+        _marcar_si_llena(nueva_habitacion.pk)
+    nueva_habitacion.refresh_from_db(fields=['ocupacion', 'estado_habitacion'])
+    return huesped
+
+
+# --------------------------------
+# 📌 Check-in grupal
+# --------------------------------
+class GrupoInvalido(Exception):
+    """
+    Algún huésped del grupo no puede registrarse. ``errores`` va alineada con la lista
+    recibida: un diccionario ``{campo: [mensajes]}`` por huésped, vacío si está bien.
+    """
+
+    def __init__(self, errores):
+        super().__init__("El grupo tiene huéspedes con datos inválidos.")
+        self.errores = errores
+
+
+def _identificar_perfiles(llegadas, errores):
+    """
+    Quien vuelve (mismo documento) reutiliza su perfil tal como está guardado. El correo
+    no puede ser de otra persona y nada se repite dentro del grupo; sin distinguir
+    mayúsculas, como los índices únicos. Una consulta por campo para todo el grupo, más
+    una para las estadías activas de los que vuelven.
+    """
+    documentos = [llegada.huesped.numero_documento.lower() for llegada in llegadas]
+    correos = [llegada.huesped.correo_electronico.lower() for llegada in llegadas]
+    perfiles = {h.numero_documento.lower(): h for h in Huesped.objects.con_clave('numero_documento', documentos)}
+    duenos_correo = {
+        correo.lower(): documento.lower()
+        for correo, documento in Huesped.objects.con_clave('correo_electronico', correos).values_list(
+            'correo_electronico', 'numero_documento'
+        )
+    }
+    alojados = set(
+        Estadia.objects.activas().filter(huesped__in=perfiles.values()).values_list('huesped_id', flat=True)
+    )
+
+    documentos_vistos, correos_vistos = set(), set()
+    for error, llegada, documento, correo in zip(errores, llegadas, documentos, correos):
+        if documento in documentos_vistos:
+            error.setdefault('numero_documento', []).append("Está repetido dentro del grupo.")
+        if correo in correos_vistos:
+            error.setdefault('correo_electronico', []).append("Está repetido dentro del grupo.")
+        elif duenos_correo.get(correo, documento) != documento:
+            error.setdefault('correo_electronico', []).append("Ya existe un huésped con este correo electrónico.")
+        documentos_vistos.add(documento)
+        correos_vistos.add(correo)
+
+        perfil = perfiles.get(documento)
+        if perfil is not None:
+            if perfil.pk in alojados:
+                error.setdefault('numero_documento', []).append(HuespedAlojado.mensaje)
+            llegada.huesped = perfil
+
+
+def reservar_cupos(cantidades):
+    """
+    Reserva ``{habitacion_id: huespedes}`` con un único UPDATE condicional. Devuelve las
+    habitaciones reservadas; si no son todas, quien llama debe revertir la transacción.
+    """
+    suma = Case(*(When(pk=pk, then=Value(n)) for pk, n in cantidades.items()), default=Value(0))
+    return Habitacion.objects.filter(
+        pk__in=cantidades, ocupacion__lte=F('capacidad') - suma
+    ).update(ocupacion=F('ocupacion') + suma)
+
+
+def _errores_de_cupo(cantidades, llegadas, errores):
+    habitaciones = {
+        fila['pk']: fila
+        for fila in Habitacion.objects.filter(pk__in=cantidades).values('pk', 'numero', 'ocupacion', 'capacidad')
+    }
+    for error, llegada in zip(errores, llegadas):
+        habitacion = habitaciones.get(llegada.habitacion_id)
+        if habitacion is None:
+            error['habitacion'] = ["La habitación no existe."]
+        elif habitacion['ocupacion'] + cantidades[llegada.habitacion_id] > habitacion['capacidad']:
+            libres = max(habitacion['capacidad'] - habitacion['ocupacion'], 0)
+            error['habitacion'] = [
+                f"La habitación {habitacion['numero']} tiene {libres} cupo(s) libre(s) "
+                f"y el grupo le asigna {cantidades[llegada.habitacion_id]}."
+            ]
+
+
+def registrar_grupo(llegadas):
+    """
+    Check-in de un grupo: ``llegadas`` son estadías sin guardar con ``habitacion_id`` y
+    su huésped (también sin guardar). Se validan documentos y correos, se reserva el cupo
+    de todas las habitaciones y se insertan perfiles y estadías con ``bulk_create``, todo
+    o nada. Lanza ``GrupoInvalido`` si algo falla; devuelve las estadías creadas.
+    """
+    errores = [{} for _ in llegadas]
+    _identificar_perfiles(llegadas, errores)
+    if any(errores):
+        raise GrupoInvalido(errores)
+
+    cantidades = Counter(llegada.habitacion_id for llegada in llegadas)
+    try:
+        with transaction.atomic():
+            if reservar_cupos(cantidades) != len(cantidades):
+                raise HabitacionLlena()
+            Huesped.objects.bulk_create([llegada.huesped for llegada in llegadas if llegada.huesped.pk is None])
+            creadas = Estadia.objects.bulk_create(llegadas)
+            _marcar_si_llena(*cantidades)
+            # bulk_create no emite señales: inventario, tarjetas y tablero en vivo se avisan aquí
+            sumar_estadias((e.habitacion_id, e.fecha_entrada, e.fecha_salida) for e in creadas)
+            invalidar_tarjetas(cantidades)
+            transaction.on_commit(lambda: publicar_estados(cantidades))
+    except HabitacionLlena:
+        # Ya revertida la reserva parcial, se lee el cupo real para explicar el rechazo
+        _errores_de_cupo(cantidades, llegadas, errores)
+        raise GrupoInvalido(errores)
+    except IntegrityError as error:
+        # Otro registro ocupó un documento o correo del grupo tras la validación: se repite
+        # ya revertido el grupo, y así el error queda en los huéspedes afectados
+        if campo_duplicado(error) is None:
+            raise
+        _identificar_perfiles(llegadas, errores)
+        if not any(errores):
+            raise
+        raise GrupoInvalido(errores) from error
+    return creadas
+
+
+def _liberar(habitacion):
+    """
+    Tras una salida: la habitación que queda vacía entra a la cola de aseo; si aún tiene
+    huéspedes pero ya no está llena, deja de figurar como ocupada.
+    """
+    if habitacion.ocupacion == 0:
+        enviar_a_aseo([habitacion.pk])
+        habitacion.refresh_from_db(fields=['estado_habitacion'])
+    elif habitacion.estado_habitacion == 'ocupada' and not habitacion.esta_llena():
+        habitacion.actualizar_estado()
+
+
+def retirar_huesped(huesped, hoy=None):
+    """
+    Check-out: cierra la estadía activa con la salida real de hoy (queda como historial),
+    libera su cupo y actualiza el estado de la habitación. Una llegada futura se cancela.
+    Devuelve la habitación, o ``None`` si el huésped no estaba alojado.
+    """
+    estadia = huesped.estadias.activas().select_related('habitacion').first()
+    if estadia is None:
+        return None
+    hoy = hoy or timezone.localdate()
+    habitacion = estadia.habitacion
+    with transaction.atomic():
+        if como_fecha(estadia.fecha_entrada) > hoy:
+            estadia.delete()
+        else:
+            estadia.activa = False
+            estadia.fecha_salida = hoy
+            estadia.save(update_fields=['activa', 'fecha_salida'])
+        habitacion.restar_ocupacion()
+        _liberar(habitacion)
+    return habitacion
+
+
+# --------------------------------
+# 📌 Disponibilidad por rango de fechas
+# --------------------------------
+def estadias_solapadas(fecha_entrada, fecha_salida):
+    """
+    Estadías que se cruzan con el rango [fecha_entrada, fecha_salida).
+    Una estadía sin fecha de salida sigue abierta.
+    """
+    return Estadia.objects.filter(
+        Q(fecha_salida__isnull=True) | Q(fecha_salida__gt=fecha_entrada),
+        fecha_entrada__lt=fecha_salida,
+    )
+
+
+def habitaciones_disponibles(fecha_entrada, fecha_salida, tipo=None, personas=1):
+    """
+    Habitaciones libres en el rango de fechas con capacidad para ``personas``.
+    El solapamiento se resuelve en la base de datos con un NOT EXISTS por habitación
+    apoyado en el índice (habitacion, fecha_salida) de las estadías.
+    """
+    ocupada = estadias_solapadas(fecha_entrada, fecha_salida).filter(habitacion=OuterRef('pk'))
+    habitaciones = Habitacion.objects.filter(capacidad__gte=personas).exclude(
+        estado_habitacion='mantenimiento'
+    )
+    if tipo:
+        habitaciones = habitaciones.filter(tipo=tipo)
+    return habitaciones.filter(~Exists(ocupada)).order_by('numero')
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from huespedes.models import Estadia, Huesped
+from .eventos import publicar_estados
+from .fragmentos import invalidar_tarjetas
+from .imagenes import derivados_pendientes, encolar_derivados
+from .inventario import mover_estadia, noches_estadia, restar_noches, sumar_noches
+from .models import Habitacion
+
+CAMPOS_ESTADIA = ('habitacion_id', 'fecha_entrada', 'fecha_salida')
+
+
+def _estadia(huesped):
+    # Se lee de __dict__ para no disparar consultas sobre campos diferidos
+    return tuple(huesped.__dict__.get(campo) for campo in CAMPOS_ESTADIA)
+
+
+def _estadia_completa(huesped):
+    return all(campo in huesped.__dict__ for campo in CAMPOS_ESTADIA)
+
+
+# --------------------------------
+# 📌 Inventario de noches desde las estadías
+# --------------------------------
+@receiver(post_init, sender=Estadia)
+def recordar_estadia(sender, instance, **kwargs):
+    instance._estadia_guardada = _estadia(instance) if _estadia_completa(instance) else None
+
+
+@receiver(pre_save, sender=Estadia)
+def cargar_estadia_guardada(sender, instance, **kwargs):
+    if instance.pk and instance._estadia_guardada is None:
+        instance._estadia_guardada = (
+            Estadia.objects.filter(pk=instance.pk).values_list(*CAMPOS_ESTADIA).first()
+        )
+
+
+@receiver(post_save, sender=Estadia)
+def actualizar_inventario(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nueva = _estadia(instance)
+    if created or instance._estadia_guardada is None:
+        sumar_noches(nueva[0], noches_estadia(*nueva[1:]))
+    else:
+        mover_estadia(instance._estadia_guardada, nueva)
+    instance._estadia_guardada = nueva
+
+
+@receiver(post_delete, sender=Estadia)
+def liberar_inventario(sender, instance, **kwargs):
+    estadia = instance._estadia_guardada or _estadia(instance)
+    restar_noches(estadia[0], noches_estadia(*estadia[1:]))
+
+
+# --------------------------------
+# 📌 Caché de tarjetas del tablero
+# --------------------------------
+@receiver(pre_save, sender=Estadia)
+def recordar_habitacion_anterior(sender, instance, **kwargs):
+    # Se conecta después de cargar_estadia_guardada, que ya dejó la estadía previa
+    instance._habitacion_anterior = (instance._estadia_guardada or (None,))[0]
+
+
+@receiver(post_save, sender=Estadia)
+@receiver(post_delete, sender=Estadia)
+def invalidar_tarjetas_estadia(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_tarjetas([instance.habitacion_id, getattr(instance, '_habitacion_anterior', None)])
+
+
+@receiver(post_save, sender=Huesped)
+def invalidar_tarjetas_huesped(sender, instance, created, raw=False, **kwargs):
+    # La tarjeta muestra el nombre: cambia si se edita el perfil de alguien alojado
+    if not raw and not created:
+        invalidar_tarjetas(
+            Estadia.objects.activas().filter(huesped=instance).values_list('habitacion_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Habitacion)
+@receiver(post_delete, sender=Habitacion)
+def invalidar_tarjeta_habitacion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_tarjetas([instance.pk])
+
+
+# --------------------------------
+# 📌 Estado en vivo del tablero (SSE)
+# --------------------------------
+def _publicar_al_confirmar(habitacion_ids):
+    # Tras el commit: los clientes nunca ven un estado que luego se revierte
+    transaction.on_commit(lambda: publicar_estados(habitacion_ids))
+
+
+@receiver(post_save, sender=Estadia)
+@receiver(post_delete, sender=Estadia)
+def publicar_estado_estadia(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _publicar_al_confirmar([instance.habitacion_id, getattr(instance, '_habitacion_anterior', None)])
+
+
+@receiver(post_save, sender=Habitacion)
+@receiver(post_delete, sender=Habitacion)
+def publicar_estado_habitacion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _publicar_al_confirmar([instance.pk])
+
+
+# --------------------------------
+# 📌 Derivados de imagen
+# --------------------------------
+@receiver(post_save, sender=Habitacion)
+def programar_derivados(sender, instance, raw=False, **kwargs):
+    if not raw and derivados_pendientes(instance.imagen):
+        # La tarjeta pudo cachearse con la imagen original mientras tanto
+        transaction.on_commit(lambda: encolar_derivados(instance, al_terminar=lambda pk: invalidar_tarjetas([pk])))
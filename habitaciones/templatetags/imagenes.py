@@ -0,0 +1,26 @@
+from django import template
+from django.utils.html import format_html
+
+from habitaciones.imagenes import DerivadosImagen
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagen_responsive(imagen, alt='', tamano='miniatura', sizes='(min-width: 640px) 320px, 100vw', **atributos):
+    """
+    ``<picture>`` con la variante WebP y el ``srcset`` de los derivados de ``imagen``.
+    Uso: ``{% imagen_responsive habitacion.imagen alt="..." class="..." %}``
+    """
+    derivados = DerivadosImagen(imagen)
+    clase = atributos.get('class', '')
+    srcset_webp = derivados.srcset(webp=True)
+    srcset = derivados.srcset()
+
+    fuente_webp = format_html(
+        '<source type="image/webp" srcset="{}" sizes="{}">', srcset_webp, sizes
+    ) if srcset_webp else ''
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        fuente_webp, derivados.url(tamano), srcset, sizes, alt, clase,
+    )
@@ -1,3 +1,805 @@
-from django.test import TestCase
+import asyncio
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.template import Context, Template
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from huespedes.models import Estadia
+from .eventos import CanalLocal
+from .aseo import cola_aseo, confirmar_aseo
+from .fragmentos import asignar_versiones, invalidar_tarjetas
+from .imagenes import _generar_en_segundo_plano, generar_derivados, ruta_derivado
+from .importacion import editar_habitaciones, importar_habitaciones
+from .inventario import calendario_ocupacion, disponibles_por_tipo
+from .models import Habitacion, NocheHabitacion, TareaAseo
+from .paginacion import paginar
+from .pruebas import alojar, crear_habitaciones, nuevo_huesped
+from .services import (
+    HabitacionLlena,
+    habitaciones_disponibles,
+    habitaciones_tablero,
+    registrar_huesped,
+    resumen_estados,
+    retirar_huesped,
+    trasladar_huesped,
+)
+
+
+class TableroHabitacionesTests(TestCase):
+    def consultas_tablero(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('habitaciones:habitacion_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_consultas_constantes_con_mas_habitaciones(self):
+        crear_habitaciones(3)
+        pocas = self.consultas_tablero()
+        crear_habitaciones(30, inicio=200)
+        muchas = self.consultas_tablero()
+        self.assertEqual(pocas, muchas)
+
+    def test_presupuesto_de_consultas(self):
+        crear_habitaciones(10)
+        with self.assertNumQueries(3):
+            resumen_estados()
+            for habitacion in habitaciones_tablero():
+                list(habitacion.estadias_tablero)
+
+    def test_resumen_estados(self):
+        crear_habitaciones(2, huespedes_por_habitacion=0)
+        Habitacion.objects.filter(numero='100').update(estado_habitacion='ocupada')
+        self.assertEqual(resumen_estados(), {
+            'total': 2, 'disponibles': 1, 'ocupadas': 1, 'mantenimiento': 0,
+        })
+
+    def test_huespedes_ordenados(self):
+        crear_habitaciones(1, huespedes_por_habitacion=3)
+        habitacion = habitaciones_tablero().get()
+        apellidos = [e.huesped.apellido for e in habitacion.estadias_tablero]
+        self.assertEqual(apellidos, sorted(apellidos))
+
+
+class OcupacionHabitacionTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(
+            numero='301', tipo='pareja', precio=80, capacidad=2
+        )
+
+    def datos_huesped(self, sufijo):
+        return {
+            'nombre': 'Ana',
+            'apellido': 'Pérez',
+            'tipo_documento': 'Cedula de ciudadania',
+            'numero_documento': f'doc-{sufijo}',
+            'correo_electronico': f'ana{sufijo}@example.com',
+            'telefono': '3000000000',
+        }
+
+    def test_agregar_y_eliminar_actualizan_ocupacion(self):
+        url = reverse('habitaciones:agregar_huesped', args=[self.habitacion.pk])
+        self.client.post(url, self.datos_huesped(1))
+        self.client.post(url, self.datos_huesped(2))
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 2)
+        self.assertEqual(self.habitacion.estado_habitacion, 'ocupada')
+
+        response = self.client.post(url, self.datos_huesped(3))
+        self.assertEqual(response.status_code, 400)
+
+        estadia = self.habitacion.estadias.activas().first()
+        self.client.post(reverse('huespedes:eliminar_huesped', args=[estadia.huesped_id]))
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 1)
+        self.assertEqual(self.habitacion.estado_habitacion, 'disponible')
+
+    def test_disponibilidad_sin_consultas(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.habitacion.esta_disponible())
+            self.assertFalse(self.habitacion.esta_llena())
+
+    def test_save_no_pisa_ocupacion(self):
+        copia = Habitacion.objects.get(pk=self.habitacion.pk)
+        self.habitacion.sumar_ocupacion()
+        copia.precio = 90
+        copia.save()
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 1)
+        self.assertEqual(self.habitacion.precio, 90)
+
+    def test_reconcile_occupancy_corrige_desviacion(self):
+        crear_habitaciones(3, inicio=400, huespedes_por_habitacion=2)
+        Habitacion.objects.update(ocupacion=0)
+        call_command('reconcile_occupancy', chunk_size=2, stdout=StringIO())
+        self.assertEqual(
+            list(Habitacion.objects.filter(numero__startswith='4').values_list('ocupacion', flat=True)),
+            [2, 2, 2],
+        )
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 0)
+
+
+class DisponibilidadTests(TestCase):
+    def setUp(self):
+        self.h101 = Habitacion.objects.create(numero='101', tipo='pareja', precio=80, capacidad=2)
+        self.h102 = Habitacion.objects.create(numero='102', tipo='pareja', precio=80, capacidad=2)
+        self.h103 = Habitacion.objects.create(numero='103', tipo='familiar', precio=120, capacidad=5)
+        alojar(
+            self.h101, date(2026, 3, 10), date(2026, 3, 13),
+            nombre='Luis', apellido='Gómez', numero_documento='1', correo_electronico='l@example.com',
+        )
+        alojar(
+            self.h102, date(2026, 3, 1),
+            nombre='Eva', apellido='Ruiz', numero_documento='2', correo_electronico='e@example.com',
+        )
+
+    def numeros(self, *args, **kwargs):
+        return [h.numero for h in habitaciones_disponibles(*args, **kwargs)]
+
+    def test_solapamiento(self):
+        self.assertEqual(self.numeros(date(2026, 3, 12), date(2026, 3, 15)), ['103'])
+        # La salida del 13 libera la habitación para una entrada ese mismo día
+        self.assertEqual(self.numeros(date(2026, 3, 13), date(2026, 3, 15)), ['101', '103'])
+        # Una estadía abierta bloquea cualquier rango posterior
+        self.assertNotIn('102', self.numeros(date(2027, 1, 1), date(2027, 1, 2)))
+
+    def test_filtros_tipo_y_personas(self):
+        rango = (date(2026, 4, 1), date(2026, 4, 3))
+        self.assertEqual(self.numeros(*rango, tipo='pareja'), ['101'])
+        self.assertEqual(self.numeros(*rango, personas=3), ['103'])
+
+    def test_una_sola_consulta(self):
+        with self.assertNumQueries(1):
+            list(habitaciones_disponibles(date(2026, 3, 12), date(2026, 3, 15)))
+
+    def test_api(self):
+        url = reverse('habitaciones:disponibilidad_api')
+        response = self.client.get(url, {'fecha_entrada': '2026-03-12', 'fecha_salida': '2026-03-15'})
+        self.assertEqual([h['numero'] for h in response.json()['habitaciones']], ['103'])
+
+        response = self.client.get(url, {'fecha_entrada': '2026-03-15', 'fecha_salida': '2026-03-12'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_vista_busqueda(self):
+        response = self.client.get(reverse('habitaciones:disponibilidad'), {
+            'fecha_entrada': '2026-03-12', 'fecha_salida': '2026-03-15', 'tipo': 'familiar',
+        })
+        self.assertContains(response, 'Habitación #103')
+
+
+class InventarioNochesTests(TestCase):
+    def setUp(self):
+        self.h1 = Habitacion.objects.create(numero='201', tipo='suite', precio=200, capacidad=2)
+        self.h2 = Habitacion.objects.create(numero='202', tipo='suite', precio=200, capacidad=2)
+
+    def crear_estadia(self, habitacion, entrada, salida, sufijo='1'):
+        return alojar(
+            habitacion, entrada, salida,
+            nombre='Ana', apellido='Mora', numero_documento=f'inv-{sufijo}',
+            correo_electronico=f'inv{sufijo}@example.com',
+        )
+
+    def noches(self):
+        return list(NocheHabitacion.objects.values_list('habitacion__numero', 'fecha', 'huespedes'))
+
+    def test_alta_movimiento_y_baja(self):
+        estadia = self.crear_estadia(self.h1, date(2026, 5, 1), date(2026, 5, 3))
+        self.crear_estadia(self.h1, date(2026, 5, 2), date(2026, 5, 4), sufijo='2')
+        self.assertEqual(self.noches(), [
+            ('201', date(2026, 5, 1), 1), ('201', date(2026, 5, 2), 2), ('201', date(2026, 5, 3), 1),
+        ])
+
+        estadia = Estadia.objects.get(pk=estadia.pk)
+        estadia.habitacion = self.h2
+        estadia.fecha_salida = date(2026, 5, 2)
+        estadia.save()
+        self.assertEqual(self.noches(), [
+            ('202', date(2026, 5, 1), 1), ('201', date(2026, 5, 2), 1), ('201', date(2026, 5, 3), 1),
+        ])
+
+        estadia.delete()
+        self.assertEqual(self.noches(), [('201', date(2026, 5, 2), 1), ('201', date(2026, 5, 3), 1)])
+
+    def test_rebuild_coincide_con_incremental(self):
+        self.crear_estadia(self.h1, date(2026, 5, 1), date(2026, 5, 3))
+        self.crear_estadia(self.h2, date(2026, 5, 2), date(2026, 5, 5), sufijo='2')
+        esperado = self.noches()
+        NocheHabitacion.objects.all().delete()
+        call_command('rebuild_inventory', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.noches(), esperado)
+
+    def test_estadias_abiertas_se_suman_al_leer(self):
+        self.crear_estadia(self.h1, date(2026, 5, 1), None)
+        self.assertFalse(NocheHabitacion.objects.exists())
+        calendario = calendario_ocupacion(date(2026, 5, 2), date(2026, 5, 4))
+        self.assertEqual(calendario, {(self.h1.pk, date(2026, 5, 2)): 1, (self.h1.pk, date(2026, 5, 3)): 1})
+
+    def test_disponibles_por_tipo(self):
+        self.crear_estadia(self.h1, date(2026, 5, 1), date(2026, 5, 2))
+        cuadro = disponibles_por_tipo(date(2026, 5, 1), date(2026, 5, 3))
+        self.assertEqual(cuadro[date(2026, 5, 1)]['suite'], 1)
+        self.assertEqual(cuadro[date(2026, 5, 2)]['suite'], 2)
+
+    def test_vista_inventario(self):
+        response = self.client.get(reverse('habitaciones:inventario'), {'dias': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['filas']), 7)
+
+
+class ImportacionHabitacionesTests(TestCase):
+    def fila(self, numero, **extra):
+        datos = {'numero': str(numero), 'tipo': 'pareja', 'estado_habitacion': 'disponible',
+                 'capacidad': '2', 'precio': '90.00', 'descripcion': ''}
+        datos.update(extra)
+        return datos
+
+    def test_importa_lote_con_consultas_constantes(self):
+        # Un lote que cabe en un INSERT: SQLite admite 999 parámetros (10 columnas por fila)
+        filas = [self.fila(n) for n in range(1000, 1090)]
+        with self.assertNumQueries(4):
+            creadas, errores = importar_habitaciones(filas)
+        self.assertEqual((creadas, errores), (90, []))
+        self.assertEqual(Habitacion.objects.count(), 90)
+
+    def test_errores_por_fila_sin_escribir(self):
+        Habitacion.objects.create(numero='10', tipo='suite', precio=1, capacidad=1)
+        creadas, errores = importar_habitaciones([
+            self.fila(10), self.fila(11), self.fila(11), self.fila(12, capacidad='0'), self.fila(13),
+        ])
+        self.assertEqual(creadas, 0)
+        self.assertEqual([e['fila'] for e in errores], [1, 2, 3, 4])
+        self.assertIn('numero', errores[0]['errores'])
+        self.assertIn('capacidad', errores[3]['errores'])
+        self.assertEqual(Habitacion.objects.count(), 1)
+
+    def test_edicion_masiva(self):
+        importar_habitaciones([self.fila(1), self.fila(2)])
+        actualizadas, errores = editar_habitaciones([
+            {'numero': '1', 'precio': '150'},
+            {'numero': '2', 'estado_habitacion': 'mantenimiento', 'tipo': 'suite'},
+        ])
+        self.assertEqual((actualizadas, errores), (2, []))
+        h1, h2 = Habitacion.objects.order_by('numero')
+        self.assertEqual((h1.precio, h1.estado_habitacion), (150, 'disponible'))
+        self.assertEqual((h2.tipo, h2.estado_habitacion), ('suite', 'mantenimiento'))
+
+        _, errores = editar_habitaciones([{'numero': '99', 'precio': '1'}])
+        self.assertEqual(errores[0]['fila'], 1)
+
+    def test_edicion_masiva_publica_el_estado(self):
+        importar_habitaciones([self.fila(1), self.fila(2)])
+        canal = CanalLocal()
+        with mock.patch('habitaciones.eventos.canal', return_value=canal):
+            with self.captureOnCommitCallbacks(execute=True):
+                editar_habitaciones([{'numero': '2', 'estado_habitacion': 'mantenimiento'}])
+            with self.captureOnCommitCallbacks(execute=True):
+                editar_habitaciones([{'numero': '1', 'precio': '150'}])
+        self.assertEqual(
+            [(e.datos['numero'], e.datos['estado']) for e in canal._historial], [('2', 'mantenimiento')]
+        )
+
+    def test_vista_importar_csv(self):
+        archivo = SimpleUploadedFile(
+            'habitaciones.csv',
+            b'numero,tipo,estado_habitacion,capacidad,precio\n501,suite,disponible,2,300\n502,pareja,disponible,2,120\n',
+        )
+        response = self.client.post(reverse('habitaciones:habitacion_importar'), {'archivo': archivo, 'accion': 'crear'})
+        self.assertRedirects(response, reverse('habitaciones:habitacion_list'))
+        self.assertEqual(Habitacion.objects.count(), 2)
+
+    def test_importar_sin_estado_usa_el_del_modelo(self):
+        archivo = SimpleUploadedFile('habitaciones.csv', b'numero,tipo,capacidad,precio\n601,suite,2,300\n')
+        response = self.client.post(reverse('habitaciones:habitacion_importar'), {'archivo': archivo, 'accion': 'crear'})
+        self.assertRedirects(response, reverse('habitaciones:habitacion_list'))
+        creadas, errores = importar_habitaciones([self.fila(602, estado_habitacion='')])
+        self.assertEqual((creadas, errores), (1, []))
+        self.assertEqual(
+            list(Habitacion.objects.order_by('numero').values_list('numero', 'estado_habitacion')),
+            [('601', 'disponible'), ('602', 'disponible')],
+        )
+
+    def test_vista_importar_json_con_errores(self):
+        archivo = SimpleUploadedFile('habitaciones.json', b'[{"numero": "1", "tipo": "castillo"}]')
+        response = self.client.post(
+            reverse('habitaciones:habitacion_importar'), {'archivo': archivo, 'accion': 'crear'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['filas'][0]['fila'], 1)
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='601', tipo='pareja', precio=80, capacidad=2)
+
+    def test_habitacion_llena_no_escribe(self):
+        registrar_huesped(self.habitacion, nuevo_huesped(1))
+        registrar_huesped(self.habitacion, nuevo_huesped(2))
+        self.assertEqual(self.habitacion.estado_habitacion, 'ocupada')
+        with self.assertRaises(HabitacionLlena):
+            registrar_huesped(self.habitacion, nuevo_huesped(3))
+        self.assertEqual(self.habitacion.estadias.activas().count(), 2)
+        self.assertEqual(self.habitacion.ocupacion, 2)
+
+    def test_error_al_insertar_libera_cupo(self):
+        registrar_huesped(self.habitacion, nuevo_huesped(1))
+        with self.assertRaises(Exception):
+            registrar_huesped(self.habitacion, nuevo_huesped(1))
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 1)
+
+    def test_vista_devuelve_habitacion_llena(self):
+        url = reverse('huespedes:agregar_huesped', args=[self.habitacion.pk])
+        for i in range(3):
+            response = self.client.post(url, {
+                'nombre': 'Ana', 'apellido': 'Paz', 'tipo_documento': 'Pasaporte',
+                'numero_documento': f'v{i}', 'correo_electronico': f'v{i}@example.com', 'telefono': '1',
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.habitacion.estadias.activas().count(), 2)
+
+
+class CheckInConcurrenteTests(TransactionTestCase):
+    HILOS = 12
+
+    def test_muchos_hilos_no_sobrellenan_la_habitacion(self):
+        habitacion = Habitacion.objects.create(numero='701', tipo='familiar', precio=100, capacidad=4)
+        barrera = threading.Barrier(self.HILOS)
+        terminados = []
+
+        def check_in(i):
+            try:
+                barrera.wait()
+                for intento in range(200):
+                    try:
+                        registrar_huesped(
+                            Habitacion.objects.get(pk=habitacion.pk), nuevo_huesped(f'{i}-{intento}')
+                        )
+                        return
+                    except HabitacionLlena:
+                        return
+                    except OperationalError:
+                        # SQLite bloquea escrituras simultáneas; se reintenta
+                        time.sleep(0.001 * (intento % 10 + 1))
+            finally:
+                terminados.append(i)
+                connections.close_all()
+
+        hilos = [threading.Thread(target=check_in, args=(i,)) for i in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        habitacion.refresh_from_db()
+        self.assertEqual(len(terminados), self.HILOS)
+        # El cupo nunca se supera y el contador coincide con los huéspedes insertados
+        self.assertEqual(habitacion.estadias.activas().count(), 4)
+        self.assertEqual(habitacion.ocupacion, 4)
+        self.assertEqual(habitacion.estado_habitacion, 'ocupada')
+
+
+class DerivadosImagenTests(TestCase):
+    def setUp(self):
+        # El registro de derivados vive en la caché y cada prueba usa otro MEDIA_ROOT
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = self.settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def foto(self):
+        contenido = BytesIO()
+        Image.new('RGB', (1600, 1000), 'navy').save(contenido, format='JPEG')
+        return SimpleUploadedFile('foto.jpg', contenido.getvalue(), content_type='image/jpeg')
+
+    def test_guardar_programa_derivados_tras_commit(self):
+        with mock.patch('habitaciones.signals.encolar_derivados') as encolar:
+            with self.captureOnCommitCallbacks() as callbacks:
+                habitacion = Habitacion.objects.create(numero='801', tipo='suite', precio=1, capacidad=1, imagen=self.foto())
+            encolar.assert_not_called()
+            for callback in callbacks:
+                callback()
+        encolar.assert_called_once_with(habitacion, al_terminar=mock.ANY)
+
+    def test_la_tarjeta_se_invalida_al_terminar_los_derivados(self):
+        with mock.patch('habitaciones.signals.encolar_derivados'):
+            habitacion = Habitacion.objects.create(numero='803', tipo='suite', precio=1, capacidad=1, imagen=self.foto())
+        version = asignar_versiones([habitacion])[0].version_tarjeta
+        al_terminar = mock.Mock(side_effect=lambda pk: invalidar_tarjetas([pk]))
+        with mock.patch('habitaciones.imagenes.close_old_connections'):
+            _generar_en_segundo_plano(Habitacion, habitacion.pk, 'imagen', al_terminar)
+        al_terminar.assert_called_once_with(habitacion.pk)
+        self.assertNotEqual(asignar_versiones([habitacion])[0].version_tarjeta, version)
+        self.assertTrue(habitacion.imagen_derivados.srcset())
+
+    def test_genera_tamanos_y_webp(self):
+        habitacion = Habitacion.objects.create(numero='802', tipo='suite', precio=1, capacidad=1, imagen=self.foto())
+        self.assertEqual(habitacion.imagen_derivados.miniatura, habitacion.imagen.url)
+
+        rutas = generar_derivados(habitacion.imagen)
+        self.assertEqual(len(rutas), 4)
+        storage = habitacion.imagen.storage
+        with storage.open(ruta_derivado(habitacion.imagen.name, 'miniatura')) as archivo:
+            self.assertEqual(Image.open(archivo).size, (320, 200))
+        with storage.open(ruta_derivado(habitacion.imagen.name, 'mediana', webp=True)) as archivo:
+            self.assertEqual(Image.open(archivo).format, 'WEBP')
+
+        self.assertTrue(habitacion.imagen_derivados.miniatura.endswith('__miniatura.jpg'))
+        html = Template(
+            '{% load imagenes %}{% imagen_responsive habitacion.imagen alt="Foto" class="w-full" %}'
+        ).render(Context({'habitacion': habitacion}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('320w', html)
+        self.assertIn('800w', html)
+
+    def test_render_lee_el_registro_y_no_el_storage(self):
+        with mock.patch('habitaciones.signals.encolar_derivados'):
+            habitacion = Habitacion.objects.create(numero='804', tipo='suite', precio=1, capacidad=1, imagen=self.foto())
+        generar_derivados(habitacion.imagen)
+        plantilla = Template('{% load imagenes %}{% imagen_responsive habitacion.imagen alt="Foto" %}')
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            html = plantilla.render(Context({'habitacion': Habitacion.objects.get(pk=habitacion.pk)}))
+        exists.assert_not_called()
+        self.assertIn('800w', html)
+
+        # Sin registro (otro proceso) se revisa el storage una sola vez
+        cache.clear()
+        with mock.patch.object(FileSystemStorage, 'exists', return_value=True) as exists:
+            for _ in range(3):
+                plantilla.render(Context({'habitacion': habitacion}))
+        self.assertEqual(exists.call_count, 4)
+
+
+class PaginacionKeysetTests(TestCase):
+    def recorrer(self, queryset, orden, tamano):
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar(queryset, orden, cursor, tamano)
+            vistos.extend(objeto.pk for objeto in pagina)
+            if not pagina.hay_mas:
+                return vistos
+            cursor = pagina.siguiente
+
+    def test_recorre_todo_sin_repetir_con_empates(self):
+        crear_habitaciones(7, huespedes_por_habitacion=0)
+        Habitacion.objects.filter(numero__in=['101', '103', '104']).update(capacidad=2)
+        orden = ('-capacidad', 'numero')
+        esperado = list(Habitacion.objects.order_by(*orden).values_list('pk', flat=True))
+        self.assertEqual(self.recorrer(Habitacion.objects.all(), orden, 2), esperado)
+
+    def test_cursor_con_fechas(self):
+        crear_habitaciones(3, huespedes_por_habitacion=3)
+        Estadia.objects.filter(huesped__nombre='Nombre1').update(fecha_entrada=date(2025, 1, 1))
+        orden = ('-fecha_entrada', '-id')
+        esperado = list(Estadia.objects.order_by(*orden).values_list('pk', flat=True))
+        self.assertEqual(self.recorrer(Estadia.objects.all(), orden, 4), esperado)
+
+    def test_vista_entrega_paginas_y_fragmentos(self):
+        crear_habitaciones(30, huespedes_por_habitacion=0)
+        respuesta = self.client.get(reverse('habitaciones:habitacion_list'))
+        self.assertEqual(len(respuesta.context['habitaciones']), 24)
+        siguiente = respuesta.context['url_siguiente']
+        self.assertContains(respuesta, 'data-siguiente')
+
+        with self.assertNumQueries(2):
+            fragmento = self.client.get(siguiente, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertTemplateUsed(fragmento, 'habitaciones/habitacion_list_items.html')
+        self.assertTemplateNotUsed(fragmento, 'base_generic.html')
+        self.assertEqual([h.numero for h in fragmento.context['habitaciones']], [str(n) for n in range(124, 130)])
+        self.assertIsNone(fragmento.context['url_siguiente'])
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get(reverse('productos:producto_list'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ApiRestTests(TestCase):
+    def setUp(self):
+        crear_habitaciones(3, huespedes_por_habitacion=1)
+        Habitacion.objects.filter(numero='100').update(estado_habitacion='mantenimiento')
+        Estadia.objects.filter(habitacion__numero='101').update(
+            fecha_entrada=date(2026, 3, 10), fecha_salida=date(2026, 3, 13)
+        )
+        Estadia.objects.filter(habitacion__numero__in=['100', '102']).update(fecha_entrada=date(2026, 1, 1))
+
+    def test_campos_seleccionados_y_consultas(self):
+        url = reverse('habitaciones:habitacion-list')
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(url, {'fields': 'id,numero'})
+        self.assertEqual(set(respuesta.json()['results'][0]), {'id', 'numero'})
+
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(url)
+        self.assertEqual(len(respuesta.json()['results'][0]['huespedes']), 1)
+
+        # Los perfiles y, en una segunda consulta, solo sus estadías activas
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('huespedes:huesped-list'), {'fields': 'id,habitacion_numero'})
+        self.assertEqual(len(consultas), 2)
+        self.assertIn('"huespedes_estadia"."activa"', consultas[1]['sql'])
+        self.assertEqual([h['habitacion_numero'] for h in respuesta.json()['results']], ['100', '101', '102'])
+
+    def test_paginacion_por_cursor(self):
+        url = reverse('habitaciones:habitacion-list')
+        primera = self.client.get(url, {'page_size': 2, 'fields': 'numero'}).json()
+        self.assertEqual([h['numero'] for h in primera['results']], ['100', '101'])
+        self.assertNotIn('count', primera)
+        segunda = self.client.get(primera['next']).json()
+        self.assertEqual([h['numero'] for h in segunda['results']], ['102'])
+        self.assertIsNone(segunda['next'])
+
+    def test_filtros(self):
+        url = reverse('habitaciones:habitacion-list')
+        numeros = lambda **params: [h['numero'] for h in self.client.get(url, {'fields': 'numero', **params}).json()['results']]
+        self.assertEqual(numeros(estado_habitacion='mantenimiento'), ['100'])
+        self.assertEqual(numeros(tipo='familiar'), ['100', '101', '102'])
+        self.assertEqual(numeros(fecha_entrada='2026-03-13', fecha_salida='2026-03-15'), ['101'])
+
+        huespedes = self.client.get(reverse('huespedes:huesped-list'), {'fecha': '2026-03-12'}).json()['results']
+        self.assertEqual(len(huespedes), 3)
+        huespedes = self.client.get(reverse('huespedes:huesped-list'), {'entrada_desde': '2026-02-01'}).json()['results']
+        self.assertEqual([h['habitacion_numero'] for h in huespedes], ['101'])
+
+    def test_parametros_invalidos(self):
+        url = reverse('habitaciones:habitacion-list')
+        self.assertEqual(self.client.get(url, {'fields': 'numero,clave'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'fecha_entrada': '2026-02-30', 'fecha_salida': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'fecha_entrada': '2026-03-01'}).status_code, 400)
+
+    def test_altas_y_bajas_mantienen_la_ocupacion(self):
+        habitacion = Habitacion.objects.create(numero='900', tipo='sencilla', precio=50, capacidad=1)
+        datos = {
+            'nombre': 'Ana', 'apellido': 'Paz', 'numero_documento': 'api-1', 'correo_electronico': 'ana@example.com',
+            'telefono': '1', 'habitacion': habitacion.pk, 'fecha_entrada': '2026-05-01',
+        }
+        url = reverse('huespedes:huesped-list')
+        respuesta = self.client.post(url, datos, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        habitacion.refresh_from_db()
+        self.assertEqual((habitacion.ocupacion, habitacion.estado_habitacion), (1, 'ocupada'))
+
+        lleno = self.client.post(url, {**datos, 'numero_documento': 'api-2', 'correo_electronico': 'b@example.com'},
+                                 content_type='application/json')
+        self.assertEqual(lleno.status_code, 400)
+        self.assertIn('habitacion', lleno.json())
+
+        detalle = reverse('huespedes:huesped-detail', args=[respuesta.json()['id']])
+        self.assertEqual(self.client.delete(detalle).status_code, 204)
+        habitacion.refresh_from_db()
+        self.assertEqual(habitacion.ocupacion, 0)
+
+
+class CacheTarjetasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.habitacion = Habitacion.objects.create(numero='701', tipo='pareja', precio=80, capacidad=2)
+        self.otra = Habitacion.objects.create(numero='702', tipo='pareja', precio=90, capacidad=2)
+        self.url = reverse('habitaciones:habitacion_list')
+
+    def test_cambios_sin_senal_no_se_ven_hasta_invalidar(self):
+        self.assertContains(self.client.get(self.url), '$80')
+        # update() no emite señales: la tarjeta cacheada se sigue sirviendo
+        Habitacion.objects.filter(pk=self.habitacion.pk).update(precio=85)
+        self.assertNotContains(self.client.get(self.url), '$85')
+
+        self.habitacion.precio = 99
+        self.habitacion.save()
+        self.assertContains(self.client.get(self.url), '$99')
+
+    def test_huespedes_invalidan_origen_y_destino(self):
+        self.client.get(self.url)
+        huesped = registrar_huesped(self.habitacion, nuevo_huesped('cache')).huesped
+        self.assertContains(self.client.get(self.url), 'Hilo cache')
+
+        trasladar_huesped(huesped, self.otra)
+        contenido = self.client.get(self.url).content.decode()
+        tarjeta_701, tarjeta_702 = contenido.split('Habitación #701')[1].split('Habitación #702')
+        self.assertNotIn('Hilo cache', tarjeta_701)
+        self.assertIn('Hilo cache', tarjeta_702)
+
+        huesped.delete()
+        self.assertNotContains(self.client.get(self.url), 'Hilo cache')
+
+    def test_edicion_masiva_invalida(self):
+        self.client.get(self.url)
+        editar_habitaciones([{'numero': '701', 'precio': '120'}])
+        self.assertContains(self.client.get(self.url), '$120')
+
+    def test_token_csrf_fuera_de_la_cache(self):
+        Habitacion.objects.filter(pk=self.habitacion.pk).update(imagen='habitaciones/x.jpg')
+        tokens = [
+            re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', self.client_class().get(self.url).content.decode())[1]
+            for _ in range(2)
+        ]
+        self.assertNotEqual(tokens[0], tokens[1])
+
+
+class CanalEventosTests(SimpleTestCase):
+    def test_entrega_en_vivo_y_latido(self):
+        canal = CanalLocal()
+
+        async def escenario():
+            suscripcion = canal.suscribir(latido=0.01)
+            self.assertIsNone(await anext(suscripcion))
+            canal.publicar('habitacion', {'id': 1})
+            evento = await anext(suscripcion)
+            await suscripcion.aclose()
+            return evento
+
+        evento = asyncio.run(escenario())
+        self.assertEqual((evento.id, evento.datos), (1, {'id': 1}))
+        self.assertEqual(canal._suscriptores, set())
+        self.assertEqual(evento.como_sse(), 'id: 1\nevent: habitacion\ndata: {"id":1}\n\n')
+
+    def test_reconexion_recupera_o_pide_recargar(self):
+        canal = CanalLocal(historial=2)
+        for pk in range(1, 4):
+            canal.publicar('habitacion', {'id': pk})
+
+        async def primeros(ultimo_id, cantidad):
+            suscripcion = canal.suscribir(ultimo_id, latido=0.01)
+            eventos = [await anext(suscripcion) for _ in range(cantidad)]
+            await suscripcion.aclose()
+            return eventos
+
+        self.assertEqual([e.id for e in asyncio.run(primeros(1, 2))], [2, 3])
+        self.assertEqual(asyncio.run(primeros(0, 1))[0].tipo, 'recargar')
+        self.assertEqual(asyncio.run(primeros(9, 1))[0].tipo, 'recargar')
+
+    def test_cliente_lento_recibe_recargar(self):
+        canal = CanalLocal(tamano_cola=2)
+
+        async def escenario():
+            suscripcion = canal.suscribir(latido=0.01)
+            await anext(suscripcion)
+            for pk in range(3):
+                canal.publicar('habitacion', {'id': pk})
+            await asyncio.sleep(0)
+            evento = await anext(suscripcion)
+            await suscripcion.aclose()
+            return evento
+
+        self.assertEqual(asyncio.run(escenario()).tipo, 'recargar')
+
+
+class EventosHabitacionesTests(TestCase):
+    def setUp(self):
+        self.canal = CanalLocal()
+        for modulo in ('habitaciones.eventos', 'habitaciones.views'):
+            parche = mock.patch(f'{modulo}.canal', return_value=self.canal)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.habitacion = Habitacion.objects.create(numero='501', tipo='pareja', precio=80, capacidad=1)
+
+    def ultimo(self):
+        return self.canal._historial[-1].datos
+
+    def test_deltas_se_publican_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            huesped = registrar_huesped(self.habitacion, nuevo_huesped('sse')).huesped
+            self.assertEqual(len(self.canal._historial), 0)
+        self.assertEqual(self.ultimo(), {
+            'id': self.habitacion.pk, 'numero': '501', 'estado': 'ocupada',
+            'estado_display': 'Ocupada', 'ocupacion': 1, 'capacidad': 1,
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            retirar_huesped(huesped)
+        self.assertEqual(self.ultimo()['ocupacion'], 0)
+
+        pk = self.habitacion.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.habitacion.delete()
+        self.assertEqual(self.ultimo(), {'id': pk, 'eliminada': True})
+
+    async def test_flujo_sse_reenvia_desde_last_event_id(self):
+        self.canal.publicar('habitacion', {'id': 1})
+        self.canal.publicar('habitacion', {'id': 2})
+        respuesta = await AsyncClient().get(reverse('habitaciones:habitacion_eventos'), headers={'Last-Event-ID': '1'})
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        partes = respuesta.streaming_content
+        self.assertEqual(await anext(partes), b'retry: 3000\n\n')
+        self.assertEqual(await anext(partes), b'id: 2\nevent: habitacion\ndata: {"id":2}\n\n')
+
+    def test_bajo_wsgi_no_hay_flujo(self):
+        self.assertEqual(self.client.get(reverse('habitaciones:habitacion_eventos')).status_code, 204)
+        tablero = self.client.get(reverse('habitaciones:habitacion_list'))
+        self.assertFalse(tablero.context['eventos_en_vivo'])
+        self.assertContains(tablero, 'if (false && window.EventSource)')
+
+
+class AseoTests(TestCase):
+    def habitacion(self, numero, piso=None):
+        return Habitacion.objects.create(numero=numero, tipo='pareja', precio=80, capacidad=2, piso=piso)
+
+    def test_check_out_encola_la_habitacion_vacia(self):
+        habitacion = self.habitacion('301')
+        self.assertEqual(habitacion.piso, 3)
+        primero = registrar_huesped(habitacion, nuevo_huesped('a1')).huesped
+        segundo = registrar_huesped(habitacion, nuevo_huesped('a2')).huesped
+
+        retirar_huesped(primero)
+        habitacion.refresh_from_db()
+        self.assertEqual(habitacion.estado_habitacion, 'disponible')
+        self.assertFalse(TareaAseo.objects.exists())
+
+        self.client.post(reverse('habitaciones:eliminar_huesped', args=[segundo.pk]))
+        habitacion.refresh_from_db()
+        self.assertEqual(habitacion.estado_habitacion, 'aseo')
+        self.assertEqual(TareaAseo.objects.filter(habitacion=habitacion, completada__isnull=True).count(), 1)
+
+    def test_traslado_encola_la_habitacion_que_queda_vacia(self):
+        origen, destino = self.habitacion('401'), self.habitacion('402')
+        huesped = registrar_huesped(origen, nuevo_huesped('t1')).huesped
+        trasladar_huesped(huesped, destino)
+        origen.refresh_from_db()
+        self.assertEqual(origen.estado_habitacion, 'aseo')
+
+    def test_cola_por_llegada_y_piso_en_una_consulta(self):
+        hoy = date(2026, 6, 1)
+        sin_llegada = self.habitacion('101')
+        tarde = self.habitacion('102')
+        piso_3 = self.habitacion('301')
+        piso_2 = self.habitacion('201')
+        for habitacion, dias in ((tarde, 5), (piso_3, 1), (piso_2, 1)):
+            alojar(
+                habitacion, hoy + timedelta(days=dias),
+                nombre='Llega', apellido=habitacion.numero, numero_documento=f'll-{habitacion.numero}',
+                correo_electronico=f'll{habitacion.numero}@example.com',
+            )
+        crear_habitaciones(40, inicio=600, huespedes_por_habitacion=0)
+        TareaAseo.objects.bulk_create([TareaAseo(habitacion=h) for h in Habitacion.objects.all()])
+
+        with self.assertNumQueries(1):
+            cola = [(t.habitacion.numero, t.proxima_llegada) for t in cola_aseo(hoy)]
+        self.assertEqual([numero for numero, _ in cola[:4]], ['201', '301', '102', '101'])
+        self.assertEqual(cola[0][1], hoy + timedelta(days=1))
+        self.assertEqual(len(cola), 44)
+
+    def test_confirmacion_por_lotes_con_un_update_de_estado(self):
+        habitaciones = [self.habitacion(str(n)) for n in range(500, 510)]
+        for habitacion in habitaciones:
+            retirar_huesped(registrar_huesped(habitacion, nuevo_huesped(habitacion.numero)).huesped)
+        ids = [h.pk for h in habitaciones]
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(confirmar_aseo(ids), 10)
+        updates = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "habitaciones_habitacion"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(Habitacion.objects.filter(pk__in=ids).values_list('estado_habitacion', flat=True)), {'disponible'})
+        self.assertFalse(cola_aseo().exists())
+
+    def test_vista_confirma_y_marca_mantenimiento(self):
+        limpia, rota = self.habitacion('701'), self.habitacion('702')
+        for habitacion in (limpia, rota):
+            retirar_huesped(registrar_huesped(habitacion, nuevo_huesped(habitacion.numero)).huesped)
+        url = reverse('habitaciones:aseo')
+        self.assertContains(self.client.get(url), '#701')
+
+        self.client.post(url, {'habitaciones': [limpia.pk], 'accion': 'limpia'})
+        respuesta = self.client.post(url, {'habitaciones': [rota.pk], 'accion': 'mantenimiento'},
+                                     HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(respuesta.json(), {'success': True, 'confirmadas': 1})
+        limpia.refresh_from_db()
+        rota.refresh_from_db()
+        self.assertEqual((limpia.estado_habitacion, rota.estado_habitacion), ('disponible', 'mantenimiento'))
+
+        repetida = self.client.post(url, {'habitaciones': [limpia.pk], 'accion': 'limpia'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(repetida.status_code, 400)
@@ -1,29 +1,52 @@
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 from .views import (
     HabitacionListView,
     HabitacionDetailView,
     HabitacionCreateView,
     HabitacionUpdateView,
-    HabitacionDeleteView
-)
-from huespedes.views import (
-    HuespedCreateView,
-    HuespedListAllView,
+    HabitacionDeleteView,
+    HabitacionViewSet,
+    aseo,
+    disponibilidad,
+    eventos_habitaciones,
+    disponibilidad_api,
+    inventario,
+    habitacion_importar,
     agregar_huesped,
     obtener_huesped,
     editar_huesped,
     eliminar_huesped
 )
+from huespedes.views import (
+    HuespedCreateView,
+    HuespedListAllView
+)
 
 app_name = 'habitaciones'
 
+# Router de la API REST
+router = DefaultRouter()
+router.register(r'habitaciones', HabitacionViewSet)
+
 urlpatterns = [
     # Habitaciones: listar, crear, detalle
     path('', HabitacionListView.as_view(), name='habitacion_list'),
     path('nueva/', HabitacionCreateView.as_view(), name='habitacion_create'),
+    path('importar/', habitacion_importar, name='habitacion_importar'),
     path('<int:pk>/editar/', HabitacionUpdateView.as_view(), name='habitacion_update'),
     path('<int:pk>/', HabitacionDetailView.as_view(), name='habitacion_detail'),
+    path('eventos/', eventos_habitaciones, name='habitacion_eventos'),
     
+    # Disponibilidad por rango de fechas
+    path('disponibilidad/', disponibilidad, name='disponibilidad'),
+    path('api/disponibilidad/', disponibilidad_api, name='disponibilidad_api'),
+    path('inventario/', inventario, name='inventario'),
+    path('aseo/', aseo, name='aseo'),
+
+    # API REST
+    path('api/', include(router.urls)),
+
     # Eliminar para eliminar habitación
     path('<int:pk>/eliminar/', HabitacionDeleteView.as_view(), name='habitacion_confirm_delete'),
 
@@ -1,13 +1,37 @@
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from datetime import timedelta
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from huespedes.forms import HuespedForm
-from habitaciones.forms import HabitacionForm
+from habitaciones.forms import ConfirmacionAseoForm, DisponibilidadForm, HabitacionForm, ImportacionHabitacionesForm
 from .models import Habitacion
-from huespedes.models import Huesped
-from django.db.models import Count
+from huespedes.models import Estadia, Huesped
+from .serializers import HabitacionSerializer, prefetch_estadias_activas
+from .services import (
+    CheckInRechazado,
+    HabitacionLlena,
+    estadias_solapadas,
+    habitaciones_disponibles,
+    habitaciones_tablero,
+    registrar_huesped,
+    resumen_estados,
+    retirar_huesped,
+    trasladar_huesped,
+)
+from .api import CamposSolicitadosMixin, PaginacionCursorApi, fecha_parametro
+from .aseo import cola_aseo, confirmar_aseo
+from .eventos import canal
+from .fragmentos import TIEMPO_TARJETA, asignar_versiones
+from .inventario import disponibles_por_tipo
+from .importacion import ArchivoInvalido, editar_habitaciones, importar_habitaciones, leer_filas
+from .paginacion import PaginacionKeysetMixin, es_parcial
 
 def some_view(request):
     habitacion = Habitacion.objects.filter(estado_habitacion="disponible")
@@ -18,24 +42,118 @@ def some_view(request):
 # --------------------------------
 # 📌 Vista para listar habitaciones
 # --------------------------------
-class HabitacionListView(ListView):
+class HabitacionListView(PaginacionKeysetMixin, ListView):
     model = Habitacion
     template_name = 'habitaciones/habitacion_list.html'
+    plantilla_parcial = 'habitaciones/habitacion_list_items.html'
     context_object_name = 'habitaciones'
-    queryset = Habitacion.objects.annotate(num_huespedes=Count('huespedes')).order_by('numero')
+    orden_keyset = ('numero', 'id')
+
+    def get_queryset(self):
+        # Habitaciones + huéspedes precargados: el tablero no hace consultas por tarjeta
+        return habitaciones_tablero()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context.update({
-            'total': Habitacion.objects.count(),
-            'disponibles': Habitacion.objects.filter(estado_habitacion='disponible').count(),
-            'ocupadas': Habitacion.objects.filter(estado_habitacion='ocupada').count(),
-            'mantenimiento': Habitacion.objects.filter(estado_habitacion='mantenimiento').count(),
-            
-        })
+        # Cada tarjeta se cachea con la versión de su habitación; solo se renderizan las que cambiaron
+        asignar_versiones(context['habitaciones'])
+        context['tiempo_tarjeta'] = TIEMPO_TARJETA
+        if not es_parcial(self.request):
+            context.update(resumen_estados())
+            context['eventos_en_vivo'] = transmite_en_vivo(self.request)
         return context
     
 
+# --------------------------------
+# 📌 Estado en vivo del tablero (Server-Sent Events)
+# --------------------------------
+def transmite_en_vivo(request):
+    """
+    ``True`` si la petición llega por ASGI, el único modo en que el flujo SSE se envía.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+async def eventos_habitaciones(request):
+    """
+    Flujo SSE con los cambios de estado y ocupación de las habitaciones. Bajo ASGI cada
+    pantalla es una corrutina en espera, sin hilo ni consultas propias; al reconectar,
+    ``Last-Event-ID`` recupera lo que se perdió. Bajo WSGI la respuesta nunca se
+    enviaría (Django consume el flujo entero antes) y dejaría un hilo tomado: se responde
+    204, que le indica al navegador que no vuelva a conectar.
+    """
+    if not transmite_en_vivo(request):
+        return HttpResponse(status=204)
+    ultimo = request.headers.get('Last-Event-ID', '')
+    ultimo_id = int(ultimo) if ultimo.isdigit() else None
+
+    async def flujo():
+        yield 'retry: 3000\n\n'
+        async for evento in canal().suscribir(ultimo_id):
+            yield ': latido\n\n' if evento is None else evento.como_sse()
+
+    respuesta = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+# --------------------------------
+# 📌 Disponibilidad por rango de fechas
+# --------------------------------
+def _buscar_disponibles(form):
+    datos = form.cleaned_data
+    return habitaciones_disponibles(
+        datos['fecha_entrada'], datos['fecha_salida'],
+        tipo=datos.get('tipo'), personas=datos['personas']
+    )
+
+
+def disponibilidad(request):
+    form = DisponibilidadForm(request.GET or None)
+    habitaciones = _buscar_disponibles(form) if form.is_valid() else None
+    return render(request, 'habitaciones/habitacion_disponibilidad.html', {
+        'form': form,
+        'habitaciones': habitaciones,
+    })
+
+
+def disponibilidad_api(request):
+    form = DisponibilidadForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Parámetros inválidos', 'errors': form.errors}, status=400)
+
+    habitaciones = _buscar_disponibles(form).values('id', 'numero', 'tipo', 'capacidad', 'precio')
+    return JsonResponse({
+        'fecha_entrada': form.cleaned_data['fecha_entrada'],
+        'fecha_salida': form.cleaned_data['fecha_salida'],
+        'habitaciones': list(habitaciones),
+    })
+
+
+# --------------------------------
+# 📌 Habitaciones libres por tipo y noche
+# --------------------------------
+def inventario(request):
+    try:
+        dias = min(max(int(request.GET.get('dias', 14)), 1), 90)
+    except ValueError:
+        dias = 14
+    desde = timezone.localdate()
+    cuadro = disponibles_por_tipo(desde, desde + timedelta(days=dias))
+
+    tipos = Habitacion.TIPOS_HABITACION
+    filas = [
+        (fecha, [libres.get(tipo, 0) for tipo, _ in tipos])
+        for fecha, libres in cuadro.items()
+    ]
+    return render(request, 'habitaciones/habitacion_inventario.html', {
+        'tipos': [nombre for _, nombre in tipos],
+        'filas': filas,
+        'dias': dias,
+    })
+
+
 # --------------------------------
 # 📌 Vista para crear habitaciones
 # --------------------------------
@@ -56,6 +174,66 @@ class HabitacionCreateView(CreateView):
 
 
 
+# --------------------------------
+# 📌 Importación y edición masiva de habitaciones
+# --------------------------------
+def habitacion_importar(request):
+    form = ImportacionHabitacionesForm(request.POST or None, request.FILES or None)
+    es_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    errores = []
+
+    if request.method == 'POST' and form.is_valid():
+        try:
+            filas = leer_filas(form.cleaned_data['archivo'])
+        except ArchivoInvalido as e:
+            form.add_error('archivo', str(e))
+        else:
+            if form.cleaned_data['accion'] == 'editar':
+                procesadas, errores = editar_habitaciones(filas)
+                mensaje = f"✅ {procesadas} habitaciones actualizadas."
+            else:
+                procesadas, errores = importar_habitaciones(filas)
+                mensaje = f"✅ {procesadas} habitaciones creadas."
+
+            if not errores:
+                if es_ajax:
+                    return JsonResponse({'success': True, 'procesadas': procesadas})
+                messages.success(request, mensaje)
+                return redirect('habitaciones:habitacion_list')
+
+    if request.method == 'POST' and es_ajax:
+        return JsonResponse({'success': False, 'errors': form.errors, 'filas': errores}, status=400)
+
+    return render(request, 'habitaciones/habitacion_importar.html', {
+        'form': form,
+        'errores': errores,
+    })
+
+
+# --------------------------------
+# 📌 Cola de aseo
+# --------------------------------
+def aseo(request):
+    form = ConfirmacionAseoForm(request.POST or None)
+    es_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+    if request.method == 'POST':
+        if form.is_valid():
+            habitacion_ids = [h.pk for h in form.cleaned_data['habitaciones']]
+            confirmadas = confirmar_aseo(habitacion_ids, form.cleaned_data['accion'])
+            if es_ajax:
+                return JsonResponse({'success': True, 'confirmadas': confirmadas})
+            messages.success(request, f"🧹 {confirmadas} habitaciones confirmadas.")
+            return redirect('habitaciones:aseo')
+        if es_ajax:
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+
+    return render(request, 'habitaciones/habitacion_aseo.html', {
+        'form': form,
+        'tareas': cola_aseo(),
+    })
+
+
 # --------------------------------
 # 📌 Vista para ver detalles de una habitación
 # --------------------------------
@@ -67,7 +245,7 @@ class HabitacionDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['huesped_form'] = HuespedForm()
-        context['huespedes'] = self.object.huespedes.all()
+        context['huespedes'] = Huesped.objects.filter(estadias__habitacion=self.object, estadias__activa=True)
         return context
 
 
@@ -128,27 +306,20 @@ class HabitacionDeleteView(DeleteView):
 # --------------------------------
 def crear_huesped(request, habitacion_id):
     habitacion = get_object_or_404(Habitacion, id=habitacion_id)
-    form = HuespedForm(request.POST or None)
+    form = HuespedForm.para_check_in(request.POST or None)
 
     if request.method == 'POST':
         if form.is_valid():
-            # Validar si la habitación ya está llena
-            if habitacion.huespedes.count() >= habitacion.capacidad:
+            # El cupo se reserva y la estadía se abre en una sola transacción
+            try:
+                registrar_huesped(habitacion, form.save(commit=False))
+            except CheckInRechazado as e:
                 return render(request, 'habitacion_form.html', {
                     'form': form,
                     'habitacion': habitacion,
-                    'error': '⚠️ La habitación ya alcanzó su capacidad máxima.'
+                    'error': f'⚠️ {e}'
                 })
 
-            huesped = form.save(commit=False)
-            huesped.habitacion = habitacion
-            huesped.save()
-
-            # Si ya se completó la capacidad, marcar como ocupada
-            if habitacion.huespedes.count() == habitacion.capacidad:
-                habitacion.estado_habitacion = 'ocupada'
-                habitacion.save()
-
             return redirect('huesped_list', habitacion_id=habitacion.id)
 
         else:
@@ -174,19 +345,14 @@ def agregar_huesped(request, pk):
     if request.method != "POST":
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
-    num_huespedes = habitacion.huespedes.count()
-    if num_huespedes >= habitacion.capacidad:
-        return JsonResponse({'error': 'La habitación ya está llena.'}, status=400)
-    
-    form = HuespedForm(request.POST)
+    form = HuespedForm.para_check_in(request.POST)
     if form.is_valid():
-        huesped = form.save(commit=False)
-        huesped.habitacion = habitacion
-        huesped.save()
-
-        if habitacion.huespedes.count() == habitacion.capacidad:
-            habitacion.estado_habitacion = 'ocupada'
-            habitacion.save()
+        try:
+            registrar_huesped(habitacion, form.save(commit=False))
+        except HabitacionLlena:
+            return JsonResponse({'error': 'La habitación ya está llena.'}, status=400)
+        except CheckInRechazado as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
         return JsonResponse({
             'success': True,
@@ -199,7 +365,8 @@ def agregar_huesped(request, pk):
 # 📌 Obtener datos de un huésped
 # --------------------------------
 def obtener_huesped(request, id):
-    huesped = get_object_or_404(Huesped.objects.select_related('habitacion'), id=id)
+    huesped = get_object_or_404(Huesped, id=id)
+    habitacion = huesped.habitacion
     
     return JsonResponse({
         'id': huesped.id,
@@ -211,7 +378,7 @@ def obtener_huesped(request, id):
         'telefono': huesped.telefono,
         'vehiculo': huesped.vehiculo,
         'placas': huesped.placas,
-        'habitacion': huesped.habitacion.numero
+        'habitacion': habitacion.numero if habitacion else None
     })
 
 # --------------------------------
@@ -224,23 +391,23 @@ def editar_huesped(request, id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
+    nueva_habitacion = huesped.habitacion
     nueva_habitacion_id = request.POST.get('habitacion_id')
     if nueva_habitacion_id:
         nueva_habitacion = get_object_or_404(Habitacion, pk=nueva_habitacion_id)
 
-        if nueva_habitacion.estado_habitacion == 'ocupada' and nueva_habitacion != huesped.habitacion:
-            return JsonResponse({'error': 'La habitación seleccionada ya está ocupada.'}, status=400)
-
-        huesped.habitacion = nueva_habitacion
-
     for campo in ['nombre', 'apellido', 'tipo_documento', 'numero_documento', 'correo_electronico', 'telefono', 'vehiculo', 'placas']:
         valor = request.POST.get(campo)
         if valor:
             setattr(huesped, campo, valor)
+    # Documento y correo se guardan normalizados, como desde el formulario
+    huesped.clean()
 
     try:
-        huesped.save()
+        trasladar_huesped(huesped, nueva_habitacion)
         return JsonResponse({'success': True, 'redirect_url': '/huespedes/listado-completo/'})
+    except CheckInRechazado as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': f'Ocurrió un error al guardar: {str(e)}'}, status=500)
 
@@ -250,12 +417,38 @@ def editar_huesped(request, id):
 # 📌 Eliminar un huésped
 # --------------------------------
 def eliminar_huesped(request, id):
-    huesped = get_object_or_404(Huesped, id=id)
-    habitacion = huesped.habitacion
-    huesped.delete()
-
-    if habitacion.huespedes.count() == 0:
-        habitacion.estado_habitacion = 'disponible'
-        habitacion.save()
-    
+    # Si la habitación queda vacía pasa a la cola de aseo, no directo a "disponible"
+    retirar_huesped(get_object_or_404(Huesped, id=id))
     return JsonResponse({'success': True})
+
+
+# --------------------------------
+# 📌 API REST de habitaciones
+# --------------------------------
+class HabitacionViewSet(CamposSolicitadosMixin, viewsets.ModelViewSet):
+    """
+    Filtros: ``?estado_habitacion=``, ``?tipo=`` y ``?fecha_entrada=&fecha_salida=``
+    (libres en ese rango). ``?fields=`` limita la respuesta y evita precargar
+    huéspedes cuando no se piden.
+    """
+    queryset = Habitacion.objects.all()
+    serializer_class = HabitacionSerializer
+    pagination_class = PaginacionCursorApi
+    orden_cursor = 'numero'
+    campos_relacionados = {'huespedes': ('prefetch_related', prefetch_estadias_activas)}
+
+    def get_queryset(self):
+        queryset = self.optimizar_queryset(super().get_queryset())
+        parametros = self.request.query_params
+        for campo in ('estado_habitacion', 'tipo'):
+            if parametros.get(campo):
+                queryset = queryset.filter(**{campo: parametros[campo]})
+
+        fecha_entrada = fecha_parametro(self.request, 'fecha_entrada')
+        fecha_salida = fecha_parametro(self.request, 'fecha_salida')
+        if fecha_entrada or fecha_salida:
+            if not (fecha_entrada and fecha_salida) or fecha_salida <= fecha_entrada:
+                raise ValidationError({'fecha_salida': ["Indique entrada y una salida posterior."]})
+            ocupada = estadias_solapadas(fecha_entrada, fecha_salida).filter(habitacion=OuterRef('pk'))
+            queryset = queryset.filter(~Exists(ocupada))
+        return queryset
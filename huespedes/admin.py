@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Huesped
+from .models import Estadia, EstadiaArchivada, Huesped
 
 admin.site.register(Huesped)
+admin.site.register(Estadia)
+admin.site.register(EstadiaArchivada)
 
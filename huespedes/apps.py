@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def restaurar_indice_busqueda(sender, using, **kwargs):
+    from .busqueda import asegurar_indice
+    asegurar_indice(connections[using])
 
 
 class HuespedesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'huespedes'
+
+    def ready(self):
+        # Los triggers del índice FTS5 se pierden si una migración rehace la tabla
+        post_migrate.connect(restaurar_indice_busqueda, sender=self)
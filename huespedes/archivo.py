@@ -0,0 +1,71 @@
+from calendar import monthrange
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Estadia, EstadiaArchivada
+
+CAMPOS_ESTADIA_ARCHIVADA = ('id', 'huesped_id', 'habitacion_id', 'fecha_entrada', 'fecha_salida')
+TAMANO_LOTE = 1000
+
+
+def limite_archivo(meses, hoy=None):
+    """
+    Fecha de hace ``meses`` meses: lo cerrado antes de ella se archiva.
+    """
+    hoy = hoy or timezone.localdate()
+    anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - meses, 12)
+    return hoy.replace(year=anio, month=mes + 1, day=min(hoy.day, monthrange(anio, mes + 1)[1]))
+
+
+# --------------------------------
+# 📌 Traslado por lotes
+# --------------------------------
+def mover_por_lotes(origen, destino, campos, tamano_lote=TAMANO_LOTE):
+    """
+    Copia las filas de ``origen`` (un queryset) en el modelo ``destino`` y las borra de
+    su tabla, ``tamano_lote`` filas por transacción: un corte a mitad deja lotes enteros
+    movidos. El borrado es directo, sin señales: archivar no es un check-out ni una
+    devolución, el inventario y el stock no cambian. Devuelve cuántas filas movió.
+    """
+    movidas = 0
+    while True:
+        with transaction.atomic():
+            filas = list(origen.order_by('pk').values(*campos)[:tamano_lote])
+            if not filas:
+                return movidas
+            destino.objects.bulk_create([destino(**fila) for fila in filas])
+            _borrar_filas(origen, [fila['id'] for fila in filas])
+        movidas += len(filas)
+
+
+def _borrar_filas(origen, ids):
+    # DELETE explícito: ni señales ni cascadas del ORM, dentro de la transacción del lote
+    conexion = connections[origen.db]
+    opciones = origen.model._meta
+    tabla, columna = conexion.ops.quote_name(opciones.db_table), conexion.ops.quote_name(opciones.pk.column)
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def archivar_estadias(antes_de, tamano_lote=TAMANO_LOTE):
+    """
+    Archiva las estadías con check-out anterior a ``antes_de``.
+    """
+    cerradas = Estadia.objects.filter(activa=False, fecha_salida__lt=antes_de)
+    return mover_por_lotes(cerradas, EstadiaArchivada, CAMPOS_ESTADIA_ARCHIVADA, tamano_lote)
+
+
+# --------------------------------
+# 📌 Lectura de ambas tablas
+# --------------------------------
+def historial_estadias(campos, filtro=Q()):
+    """
+    ``values_list(*campos)`` de las estadías que cumplen ``filtro``, vigentes y archivadas,
+    en una sola consulta (UNION ALL). El filtro solo puede usar campos comunes a las dos
+    tablas y el orden, columnas de ``campos``.
+    """
+    vigentes = Estadia.objects.filter(filtro).values_list(*campos)
+    archivadas = EstadiaArchivada.objects.filter(filtro).values_list(*campos)
+    return vigentes.union(archivadas, all=True)
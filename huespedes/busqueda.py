@@ -0,0 +1,109 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Huesped
+
+CAMPOS_BUSQUEDA = ('nombre', 'apellido', 'numero_documento', 'correo_electronico', 'placas')
+TABLA_FTS = 'huespedes_huesped_fts'
+LONGITUD_MINIMA = 2
+
+
+# --------------------------------
+# 📌 Índice FTS5 (solo SQLite)
+# --------------------------------
+def _columnas(prefijo=''):
+    return ', '.join(f'{prefijo}{campo}' for campo in CAMPOS_BUSQUEDA)
+
+
+def _sql_triggers():
+    tabla = Huesped._meta.db_table
+    insertar = f"INSERT INTO {TABLA_FTS}(rowid, {_columnas()}) VALUES (new.id, {_columnas('new.')});"
+    borrar = (
+        f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {_columnas()}) "
+        f"VALUES ('delete', old.id, {_columnas('old.')});"
+    )
+    return {
+        f'{TABLA_FTS}_ai': f"AFTER INSERT ON {tabla} BEGIN {insertar} END",
+        f'{TABLA_FTS}_ad': f"AFTER DELETE ON {tabla} BEGIN {borrar} END",
+        f'{TABLA_FTS}_au': f"AFTER UPDATE OF {_columnas()} ON {tabla} BEGIN {borrar} {insertar} END",
+    }
+
+
+def asegurar_indice(conexion=connection):
+    """
+    Crea la tabla FTS5 (contenido externo sobre ``huespedes_huesped``) y los triggers que
+    la mantienen al día, incluso con ``update()`` y ``bulk_create``. SQLite rehace la tabla
+    en algunas migraciones y con ella pierde los triggers: por eso se llama también tras
+    cada ``migrate``. Si faltaba algún trigger el índice se reconstruye.
+    """
+    if conexion.vendor != 'sqlite':
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+            f"{_columnas()}, content='{Huesped._meta.db_table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            [Huesped._meta.db_table],
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        faltantes = {nombre: sql for nombre, sql in _sql_triggers().items() if nombre not in existentes}
+        for nombre, sql in faltantes.items():
+            cursor.execute(f"CREATE TRIGGER {nombre} {sql}")
+        if faltantes:
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+    return True
+
+
+def eliminar_indice(conexion=connection):
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        for nombre in _sql_triggers():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+# --------------------------------
+# 📌 Búsqueda
+# --------------------------------
+def terminos(texto):
+    return re.findall(r'\w+', texto or '')
+
+
+def consulta_fts(texto):
+    """
+    ``"ana gó"`` -> ``"ana"* "gó"*``: cada palabra es un prefijo y todas deben aparecer.
+    Las comillas evitan que la entrada del usuario se interprete como sintaxis FTS5.
+    """
+    return ' '.join(f'"{termino}"*' for termino in terminos(texto))
+
+
+def buscar_huespedes(texto, queryset=None):
+    """
+    Huéspedes cuyo nombre, apellido, documento, correo o placas empiezan por cada palabra
+    de ``texto``. En SQLite resuelve el MATCH en el índice FTS5; en otros motores usa
+    búsquedas por prefijo sobre columnas indexadas.
+    """
+    queryset = Huesped.objects.all() if queryset is None else queryset
+    palabras = terminos(texto)
+    if not palabras or max(len(p) for p in palabras) < LONGITUD_MINIMA:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'sqlite':
+        coincidencias = RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", [consulta_fts(texto)]
+        )
+        return queryset.filter(id__in=coincidencias)
+
+    for palabra in palabras:
+        condicion = Q()
+        for campo in CAMPOS_BUSQUEDA:
+            condicion |= Q(**{f'{campo}__istartswith': palabra})
+        queryset = queryset.filter(condicion)
+    return queryset
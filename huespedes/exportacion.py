@@ -0,0 +1,88 @@
+import csv
+import json
+
+from django.db.models import Q
+
+from .archivo import historial_estadias
+
+# Columna del registro -> campo leído de la estadía
+COLUMNAS_REGISTRO = {
+    'tipo_documento': 'huesped__tipo_documento',
+    'numero_documento': 'huesped__numero_documento',
+    'apellido': 'huesped__apellido',
+    'nombre': 'huesped__nombre',
+    'habitacion': 'habitacion__numero',
+    'fecha_entrada': 'fecha_entrada',
+    'fecha_salida': 'fecha_salida',
+}
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+FILAS_POR_BLOQUE = 500
+
+
+# --------------------------------
+# 📌 Lectura
+# --------------------------------
+def estadias_registro(desde, hasta, tamano_bloque=2000):
+    """
+    Filas del registro de huéspedes alojados entre ``desde`` y ``hasta`` (ambos incluidos),
+    en orden de llegada, incluidas las estadías archivadas. Se leen como tuplas por
+    bloques con ``iterator()``: nunca hay más de ``tamano_bloque`` estadías en memoria.
+    """
+    filas = (
+        historial_estadias(
+            ('id', *COLUMNAS_REGISTRO.values()),
+            (Q(fecha_salida__isnull=True) | Q(fecha_salida__gte=desde)) & Q(fecha_entrada__lte=hasta),
+        )
+        .order_by('fecha_entrada', 'id')
+        .iterator(chunk_size=tamano_bloque)
+    )
+    # El id solo desempata el orden
+    return (fila[1:] for fila in filas)
+
+
+# --------------------------------
+# 📌 Escritura por líneas
+# --------------------------------
+class _Eco:
+    """
+    "Archivo" que devuelve lo escrito: ``csv.writer`` arma la línea y el generador la entrega.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS_REGISTRO)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def lineas_jsonl(filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(COLUMNAS_REGISTRO, fila)), default=str, ensure_ascii=False) + '\n'
+
+
+def exportar_registro(desde, hasta, formato='csv', filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Genera el registro en ``formato`` (``csv`` o ``jsonl``) en bloques de texto de
+    ``filas_por_bloque`` líneas, listo para ``StreamingHttpResponse`` o para un archivo.
+    La memoria usada no depende de cuántas estadías haya.
+    """
+    lineas = (lineas_jsonl if formato == 'jsonl' else lineas_csv)(estadias_registro(desde, hasta))
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= filas_por_bloque:
+            yield ''.join(bloque)
+            bloque.clear()
+    if bloque:
+        yield ''.join(bloque)
+
+
+def nombre_archivo(desde, hasta, formato):
+    return f'registro-huespedes-{desde:%Y%m%d}-{hasta:%Y%m%d}.{formato}'
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Huesped
+from .exportacion import FORMATOS
+from .models import Huesped, normalizar_correo, normalizar_documento
 
 class HuespedForm(forms.ModelForm):
     class Meta:
@@ -32,16 +33,45 @@ class HuespedForm(forms.ModelForm):
 
         return placas.upper() if placas else placas
 
+    @classmethod
+    def para_check_in(cls, data=None, **kwargs):
+        """
+        Formulario de check-in. Si el documento ya está registrado se edita ese perfil
+        (un huésped que vuelve) en lugar de chocar con la unicidad de documento y correo.
+        """
+        return cls(data, instance=perfil_por_documento(data), **kwargs)
+
+    # La unicidad de documento y correo la valida el modelo (Huesped.validate_constraints)
     def clean_numero_documento(self):
-        return self.cleaned_data.get('numero_documento').strip()
+        return normalizar_documento(self.cleaned_data.get('numero_documento'))
 
     def clean_correo_electronico(self):
-        correo = self.cleaned_data.get('correo_electronico')
-        if correo:
-            correo = correo.strip().lower()
-            qs = Huesped.objects.filter(correo_electronico=correo)
-            if self.instance.pk:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise forms.ValidationError('Ya existe un huésped con este correo electrónico.')
-        return correo
+        return normalizar_correo(self.cleaned_data.get('correo_electronico'))
+
+
+def perfil_por_documento(data):
+    """
+    Perfil ya registrado con el ``numero_documento`` de ``data``, o ``None``.
+    """
+    documento = normalizar_documento((data or {}).get('numero_documento'))
+    return Huesped.objects.con_clave('numero_documento', [documento]).first() if documento else None
+
+
+class ExportacionRegistroForm(forms.Form):
+    """
+    Rango de fechas y formato del registro de huéspedes para las autoridades.
+    """
+    desde = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    formato = forms.ChoiceField(choices=[(formato, formato.upper()) for formato in FORMATOS], required=False)
+
+    def clean_formato(self):
+        return self.cleaned_data.get('formato') or 'csv'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get('desde')
+        hasta = cleaned_data.get('hasta')
+        if desde and hasta and hasta < desde:
+            raise forms.ValidationError("La fecha final no puede ser anterior a la inicial.")
+        return cleaned_data
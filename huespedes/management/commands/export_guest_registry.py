@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from huespedes.exportacion import FORMATOS, exportar_registro, nombre_archivo
+from huespedes.forms import ExportacionRegistroForm
+
+
+class Command(BaseCommand):
+    help = "Escribe el registro de huéspedes y estadías de un rango de fechas (CSV o JSON Lines)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help="Primera fecha, AAAA-MM-DD.")
+        parser.add_argument('--hasta', required=True, help="Última fecha, AAAA-MM-DD.")
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--salida', help="Archivo de salida. Por defecto, registro-huespedes-<desde>-<hasta>.<formato>.")
+
+    def handle(self, *args, **options):
+        # Mismas validaciones que la descarga desde la web
+        form = ExportacionRegistroForm({campo: options[campo] for campo in ('desde', 'hasta', 'formato')})
+        if not form.is_valid():
+            errores = '; '.join(' '.join(mensajes) for mensajes in form.errors.values())
+            raise CommandError(errores)
+
+        desde, hasta, formato = (form.cleaned_data[campo] for campo in ('desde', 'hasta', 'formato'))
+        ruta = options['salida'] or nombre_archivo(desde, hasta, formato)
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            for bloque in exportar_registro(desde, hasta, formato):
+                archivo.write(bloque)
+        self.stdout.write(self.style.SUCCESS(f"Registro escrito en {ruta}."))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0014_habitacion_indice_tipo_capacidad'),
+        ('huespedes', '0008_alter_huesped_fecha_salida'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='huesped',
+            index=models.Index(fields=['habitacion', 'fecha_entrada', 'fecha_salida'], name='huespedes_h_habitac_c9e739_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='huesped',
+            index=models.Index(fields=['fecha_entrada', 'fecha_salida'], name='huespedes_h_fecha_e_f08a4d_idx'),
+        ),
+    ]
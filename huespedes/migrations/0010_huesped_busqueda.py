@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+def crear_indice_fts(apps, schema_editor):
+    from huespedes.busqueda import asegurar_indice
+    asegurar_indice(schema_editor.connection)
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    from huespedes.busqueda import eliminar_indice
+    eliminar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0016_tareaaseo_piso'),
+        ('huespedes', '0009_huesped_indices_estadia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='huesped',
+            index=models.Index(fields=['apellido', 'nombre'], name='huespedes_h_apellid_bf689a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='huesped',
+            index=models.Index(fields=['nombre'], name='huespedes_h_nombre_b5a9ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='huesped',
+            index=models.Index(fields=['placas'], name='huespedes_h_placas_6a948c_idx'),
+        ),
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
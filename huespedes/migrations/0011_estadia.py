@@ -0,0 +1,85 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def separar_estadias(apps, schema_editor):
+    # Cada fila de Huesped era una persona alojada: pasa a ser su perfil más una estadía activa
+    Huesped = apps.get_model('huespedes', 'Huesped')
+    Estadia = apps.get_model('huespedes', 'Estadia')
+    filas = (
+        Huesped.objects.order_by('pk')
+        .values_list('pk', 'habitacion_id', 'fecha_entrada', 'fecha_salida')
+        .iterator(chunk_size=2000)
+    )
+    lote = []
+    for huesped_id, habitacion_id, fecha_entrada, fecha_salida in filas:
+        lote.append(Estadia(
+            huesped_id=huesped_id, habitacion_id=habitacion_id,
+            fecha_entrada=fecha_entrada, fecha_salida=fecha_salida, activa=True,
+        ))
+        if len(lote) >= 2000:
+            Estadia.objects.bulk_create(lote)
+            lote.clear()
+    Estadia.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0016_tareaaseo_piso'),
+        ('huespedes', '0010_huesped_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estadia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_entrada', models.DateField(default=django.utils.timezone.now)),
+                ('fecha_salida', models.DateField(blank=True, null=True)),
+                ('activa', models.BooleanField(default=True)),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias', to='habitaciones.habitacion')),
+                ('huesped', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias', to='huespedes.huesped')),
+            ],
+        ),
+        migrations.RunPython(separar_estadias, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='estadia',
+            index=models.Index(fields=['habitacion', 'fecha_salida'], name='huespedes_e_habitac_9ca898_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estadia',
+            index=models.Index(fields=['fecha_entrada'], name='huespedes_e_fecha_e_6fc7c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estadia',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['habitacion'], name='estadia_activa_habitacion'),
+        ),
+        migrations.AddConstraint(
+            model_name='estadia',
+            constraint=models.UniqueConstraint(condition=models.Q(('activa', True)), fields=('huesped',), name='estadia_activa_unica'),
+        ),
+        migrations.RemoveIndex(
+            model_name='huesped',
+            name='huespedes_h_habitac_c9e739_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='huesped',
+            name='huespedes_h_fecha_e_f08a4d_idx',
+        ),
+        migrations.RemoveField(
+            model_name='huesped',
+            name='fecha_entrada',
+        ),
+        migrations.RemoveField(
+            model_name='huesped',
+            name='fecha_salida',
+        ),
+        migrations.RemoveField(
+            model_name='huesped',
+            name='habitacion',
+        ),
+    ]
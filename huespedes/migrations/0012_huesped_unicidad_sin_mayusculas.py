@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:49
+
+import django.db.models.functions.text
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def normalizar_claves(apps, schema_editor):
+    # Los correos se guardan en minúsculas y sin espacios, como ya hacía el formulario
+    Huesped = apps.get_model('huespedes', 'Huesped')
+    Huesped.objects.update(
+        correo_electronico=Lower(Trim('correo_electronico')), numero_documento=Trim('numero_documento')
+    )
+    # Fusionar perfiles arrastra estadías y consumos: se detiene la migración con la lista
+    # de duplicados para unificarlos a mano antes de crear las restricciones
+    duplicados = []
+    for campo in ('numero_documento', 'correo_electronico'):
+        claves = (
+            Huesped.objects.order_by().annotate(clave=Lower(campo)).values('clave')
+            .annotate(veces=Count('id')).filter(veces__gt=1).values_list('clave', flat=True)
+        )
+        for clave in claves:
+            ids = Huesped.objects.annotate(clave=Lower(campo)).filter(clave=clave).order_by('id').values_list('id', flat=True)
+            duplicados.append(f"  {campo} '{clave}': huéspedes {', '.join(map(str, ids))}")
+    if duplicados:
+        raise CommandError(
+            "Hay huéspedes que solo difieren en mayúsculas o espacios; unifícalos antes de migrar:\n"
+            + "\n".join(duplicados)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('huespedes', '0011_estadia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='huesped',
+            name='correo_electronico',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='huesped',
+            name='numero_documento',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.RunPython(normalizar_claves, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='huesped',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('numero_documento'), name='huesped_documento_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='huesped',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('correo_electronico'), name='huesped_correo_unico'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0016_tareaaseo_piso'),
+        ('huespedes', '0012_huesped_unicidad_sin_mayusculas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadiaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_entrada', models.DateField()),
+                ('fecha_salida', models.DateField(blank=True, null=True)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias_archivadas', to='habitaciones.habitacion')),
+                ('huesped', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias_archivadas', to='huespedes.huesped')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['habitacion', 'fecha_salida'], name='huespedes_e_habitac_70c1d6_idx'), models.Index(fields=['fecha_entrada'], name='huespedes_e_fecha_e_6bdbd8_idx')],
+            },
+        ),
+    ]
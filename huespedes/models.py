@@ -1,9 +1,48 @@
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from habitaciones.models import Habitacion
 
+# Campos que identifican a un huésped: restricción única (sobre LOWER(campo)) y mensaje
+CAMPOS_UNICOS = {
+    'numero_documento': ('huesped_documento_unico', "Ya existe un huésped con este número de documento."),
+    'correo_electronico': ('huesped_correo_unico', "Ya existe un huésped con este correo electrónico."),
+}
 
-## MODELO DE HUESPEDES
+
+def campo_duplicado(error):
+    """
+    Campo cuya restricción única violó ``error`` (un ``IntegrityError``), o ``None``.
+    """
+    texto = str(error)
+    for campo, (restriccion, _) in CAMPOS_UNICOS.items():
+        if restriccion in texto:
+            return campo
+    return None
+
+
+def normalizar_correo(correo):
+    return correo.strip().lower() if correo else correo
+
+
+def normalizar_documento(documento):
+    return documento.strip() if documento else documento
+
+
+class HuespedQuerySet(models.QuerySet):
+    def con_clave(self, campo, valores):
+        """
+        Huéspedes cuyo ``campo`` (documento o correo) es alguno de ``valores`` sin distinguir
+        mayúsculas. Compara ``LOWER(campo)``, la expresión del índice único.
+        """
+        return self.alias(**{f'{campo}_clave': Lower(campo)}).filter(
+            **{f'{campo}_clave__in': {valor.lower() for valor in valores if valor}}
+        )
+
+
+## MODELO DE HUESPEDES (perfil de la persona; sus visitas están en Estadia)
 
 class Huesped(models.Model):
     TIPO_DOCUMENTO_CHOICES = [
@@ -22,17 +61,191 @@ class Huesped(models.Model):
         default='Cedula de ciudadania'  # O cualquiera válida de la lista
     )
 
-    numero_documento = models.CharField(max_length=50, unique=True)
-    correo_electronico = models.EmailField(unique=True)  # Evita duplicados
+    # Únicos sin distinguir mayúsculas: ver CAMPOS_UNICOS y validate_constraints
+    numero_documento = models.CharField(max_length=50)
+    correo_electronico = models.EmailField()
     telefono = models.CharField(max_length=15)
     vehiculo = models.CharField(max_length=50, blank=True, null=True)
     placas = models.CharField(max_length=10, blank=True, null=True)
-    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name='huespedes')
-    fecha_entrada = models.DateField(default=timezone.now)
-    fecha_salida = models.DateField(null=True, blank=True)  # ✅ Ahora puede estar vacío
+
+    # Suma de precio_total de sus consumos (también los archivados); la mantienen los
+    # servicios de consumos en la misma transacción. Ver verify_balances
+    saldo_consumos = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Saldo de consumos"
+    )
+
+    objects = HuespedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower(campo), name=restriccion)
+            for campo, (restriccion, _) in CAMPOS_UNICOS.items()
+        ]
+        indexes = [
+            # Búsqueda por prefijo fuera de SQLite (en SQLite se usa el índice FTS5)
+            models.Index(fields=['apellido', 'nombre']),
+            models.Index(fields=['nombre']),
+            models.Index(fields=['placas']),
+        ]
 
     def __str__(self):
         return f'{self.nombre} {self.apellido}'
-    
+
+    def save(self, *args, **kwargs):
+        # El saldo solo cambia con incrementos atómicos; editar el perfil no lo pisa
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'saldo_consumos'
+            ]
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        super().clean()
+        self.numero_documento = normalizar_documento(self.numero_documento)
+        self.correo_electronico = normalizar_correo(self.correo_electronico)
+
+    def claves_en_uso(self, exclude=()):
+        """
+        ``{campo: mensaje}`` con el documento y el correo que ya usa otro huésped, sin
+        distinguir mayúsculas. Una sola consulta para ambos campos.
+        """
+        valores = {
+            campo: getattr(self, campo).lower()
+            for campo in CAMPOS_UNICOS if campo not in exclude and getattr(self, campo)
+        }
+        if not valores:
+            return {}
+        coincide = Q()
+        for campo, valor in valores.items():
+            coincide |= Q(**{f'{campo}_clave': valor})
+        otros = Huesped.objects.annotate(
+            **{f'{campo}_clave': Lower(campo) for campo in valores}
+        ).filter(coincide)
+        if self.pk:
+            otros = otros.exclude(pk=self.pk)
+        en_uso = {}
+        for fila in otros.values(*(f'{campo}_clave' for campo in valores)):
+            for campo, valor in valores.items():
+                if fila[f'{campo}_clave'] == valor:
+                    en_uso[campo] = CAMPOS_UNICOS[campo][1]
+        return en_uso
+
+    def validate_constraints(self, exclude=None):
+        """
+        Documento y correo se validan juntos con ``claves_en_uso`` (una consulta, el error
+        en su campo) en vez de una consulta por restricción con un error general.
+        """
+        exclude = set(exclude or ())
+        errores = {}
+        try:
+            super().validate_constraints(exclude=exclude | set(CAMPOS_UNICOS))
+        except ValidationError as error:
+            errores = error.update_error_dict(errores)
+        for campo, mensaje in self.claves_en_uso(exclude).items():
+            errores.setdefault(campo, []).append(ValidationError(mensaje, code='unique'))
+        if errores:
+            raise ValidationError(errores)
+
+    @property
+    def estadia_actual(self):
+        """
+        Estadía activa del huésped, o ``None``. Usa ``estadias_activas`` si la vista la
+        precargó (ver ``con_estadia_actual``); si no, hace una consulta.
+        """
+        if hasattr(self, 'estadias_activas'):
+            return self.estadias_activas[0] if self.estadias_activas else None
+        return self.estadias.activas().select_related('habitacion').first()
+
+    @property
+    def habitacion(self):
+        estadia = self.estadia_actual
+        return estadia.habitacion if estadia else None
+
+
+## MODELO DE ESTADÍAS
+
+class EstadiaQuerySet(models.QuerySet):
+    def activas(self):
+        """
+        Estadías sin check-out: los huéspedes alojados ahora (o con la llegada reservada).
+        """
+        return self.filter(activa=True)
+
+    def en_fecha(self, fecha):
+        """
+        Estadías que ocupan la noche ``fecha``.
+        """
+        return self.filter(
+            Q(fecha_salida__isnull=True) | Q(fecha_salida__gt=fecha), fecha_entrada__lte=fecha
+        )
+
+
+class Estadia(models.Model):
+    """
+    Una visita de un huésped a una habitación. ``activa`` sigue en ``True`` hasta el
+    check-out, que deja la estadía como historial con la salida real.
+    """
+    huesped = models.ForeignKey(Huesped, on_delete=models.CASCADE, related_name='estadias')
+    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name='estadias')
+    fecha_entrada = models.DateField(default=timezone.now)
+    fecha_salida = models.DateField(null=True, blank=True)
+    activa = models.BooleanField(default=True)
+
+    objects = EstadiaQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Una persona no puede estar alojada en dos habitaciones a la vez
+            models.UniqueConstraint(fields=['huesped'], condition=Q(activa=True), name='estadia_activa_unica'),
+        ]
+        indexes = [
+            # Solapamiento de fechas por habitación (disponibilidad) e historial por llegada
+            models.Index(fields=['habitacion', 'fecha_salida']),
+            models.Index(fields=['fecha_entrada']),
+            # Huéspedes actuales: el índice solo contiene las estadías activas
+            models.Index(fields=['habitacion'], condition=Q(activa=True), name='estadia_activa_habitacion'),
+        ]
+
+    def __str__(self):
+        return f'{self.huesped} en {self.habitacion.numero} desde {self.fecha_entrada}'
+
+
+## ARCHIVO HISTÓRICO (ver huespedes/archivo.py)
+
+class EstadiaArchivada(models.Model):
+    """
+    Estadía cerrada hace tiempo, fuera de la tabla de trabajo. Conserva el ``id`` original:
+    el folio y los enlaces del historial siguen sirviendo.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    huesped = models.ForeignKey(Huesped, on_delete=models.CASCADE, related_name='estadias_archivadas')
+    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name='estadias_archivadas')
+    fecha_entrada = models.DateField()
+    fecha_salida = models.DateField(null=True, blank=True)
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    # Solo se archivan estadías con check-out
+    activa = False
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['habitacion', 'fecha_salida']),
+            models.Index(fields=['fecha_entrada']),
+        ]
+
+    def __str__(self):
+        return f'{self.huesped} en {self.habitacion.numero} desde {self.fecha_entrada} (archivada)'
+
+
+def prefetch_estadia_actual():
+    return models.Prefetch(
+        'estadias', queryset=Estadia.objects.activas().select_related('habitacion'), to_attr='estadias_activas'
+    )
 
 
+def con_estadia_actual(huespedes):
+    """
+    Precarga en ``estadias_activas`` la estadía activa de cada huésped con su habitación.
+    """
+    return huespedes.prefetch_related(prefetch_estadia_actual())
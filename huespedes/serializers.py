@@ -1,7 +1,73 @@
 from rest_framework import serializers
-from .models import Huesped
+from habitaciones.api import CamposSeleccionablesMixin
+from habitaciones.models import Habitacion
+from .models import CAMPOS_UNICOS, Estadia, Huesped, normalizar_correo, normalizar_documento
+
+
+class ClavesNormalizadasMixin:
+    """
+    Documento y correo llegan sin espacios y el correo en minúsculas, como los guarda el
+    formulario.
+    """
+
+    def validate_numero_documento(self, valor):
+        return normalizar_documento(valor)
+
+    def validate_correo_electronico(self, valor):
+        return normalizar_correo(valor)
+
+
+class HuespedSerializer(CamposSeleccionablesMixin, ClavesNormalizadasMixin, serializers.ModelSerializer):
+    """
+    Perfil del huésped con los datos de su estadía activa (``null`` si no está alojado).
+    Al crear, ``habitacion`` y las fechas abren la estadía; al editar, otra
+    ``habitacion`` traslada la estadía activa. Documento y correo se validan juntos, sin
+    distinguir mayúsculas, con una sola consulta.
+    """
+    habitacion = serializers.PrimaryKeyRelatedField(
+        source='estadia_actual.habitacion', queryset=Habitacion.objects.all(), required=False, allow_null=True
+    )
+    fecha_entrada = serializers.DateField(source='estadia_actual.fecha_entrada', required=False, allow_null=True)
+    fecha_salida = serializers.DateField(source='estadia_actual.fecha_salida', required=False, allow_null=True)
+    habitacion_numero = serializers.CharField(source='estadia_actual.habitacion.numero', read_only=True, allow_null=True)
 
-class HuespedSerializer(serializers.ModelSerializer):
     class Meta:
         model = Huesped
         fields = '__all__'
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        pedidos = [campo for campo in CAMPOS_UNICOS if campo in attrs]
+        perfil = Huesped(pk=getattr(self.instance, 'pk', None), **{campo: attrs[campo] for campo in pedidos})
+        en_uso = perfil.claves_en_uso(exclude=set(CAMPOS_UNICOS) - set(pedidos))
+        if en_uso:
+            raise serializers.ValidationError({campo: [mensaje] for campo, mensaje in en_uso.items()})
+        return attrs
+
+
+class EstadiaSerializer(serializers.ModelSerializer):
+    habitacion_numero = serializers.CharField(source='habitacion.numero', read_only=True)
+
+    class Meta:
+        model = Estadia
+        fields = ['id', 'huesped', 'habitacion', 'habitacion_numero', 'fecha_entrada', 'fecha_salida', 'activa']
+        read_only_fields = ['huesped', 'activa']
+
+
+class HuespedGrupoSerializer(ClavesNormalizadasMixin, serializers.ModelSerializer):
+    """
+    Un huésped dentro de un check-in grupal, con su habitación (id) y fechas. Ni la
+    habitación ni el documento y el correo se consultan fila por fila: ``registrar_grupo``
+    los valida para todo el grupo a la vez y reutiliza el perfil de quien vuelve.
+    """
+    habitacion = serializers.IntegerField(min_value=1)
+    fecha_entrada = serializers.DateField(required=False)
+    fecha_salida = serializers.DateField(required=False, allow_null=True)
+
+    class Meta:
+        model = Huesped
+        exclude = ['id']
+
+
+class GrupoHuespedesSerializer(serializers.Serializer):
+    huespedes = HuespedGrupoSerializer(many=True, allow_empty=False, max_length=200)
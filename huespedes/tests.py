@@ -1,3 +1,505 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from consumos.archivo import archivar_consumos
+from consumos.folio import calcular_folio
+from consumos.models import Consumo, ConsumoArchivado
+from habitaciones.inventario import calendario_ocupacion
+from habitaciones.models import Habitacion, NocheHabitacion
+from habitaciones.pruebas import alojar, nuevo_huesped
+from habitaciones.services import (
+    PerfilDuplicado,
+    habitaciones_disponibles,
+    habitaciones_tablero,
+    registrar_huesped,
+    retirar_huesped,
+)
+from productos.models import Producto
+from .busqueda import TABLA_FTS, asegurar_indice, buscar_huespedes
+from .archivo import archivar_estadias, limite_archivo
+from .exportacion import exportar_registro
+from .forms import HuespedForm
+from .models import Estadia, EstadiaArchivada, Huesped
+
+
+class BusquedaHuespedesTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='801', tipo='familiar', precio=100, capacidad=50)
+        self.ana = alojar(
+            self.habitacion, nombre='Ana', apellido='Gómez', numero_documento='1020304050',
+            correo_electronico='ana.g@example.com', placas='ABC123',
+        ).huesped
+        alojar(
+            self.habitacion, nombre='Andrés', apellido='Pérez', numero_documento='9080706050',
+            correo_electronico='andres@example.com',
+        )
+
+    def buscar(self, texto):
+        return set(buscar_huespedes(texto).values_list('apellido', flat=True))
+
+    def test_prefijos_sin_tildes_y_todas_las_palabras(self):
+        self.assertEqual(self.buscar('an'), {'Gómez', 'Pérez'})
+        self.assertEqual(self.buscar('ANDRES'), {'Pérez'})
+        self.assertEqual(self.buscar('ana gom'), {'Gómez'})
+        self.assertEqual(self.buscar('abc1'), {'Gómez'})
+        self.assertEqual(self.buscar('10203'), {'Gómez'})
+        self.assertEqual(self.buscar('a'), set())
+        self.assertEqual(self.buscar('"OR* ('), set())
+
+    def test_triggers_siguen_update_y_delete(self):
+        Huesped.objects.filter(pk=self.ana.pk).update(apellido='Restrepo')
+        self.assertEqual(self.buscar('gomez'), set())
+        self.assertEqual(self.buscar('restre'), {'Restrepo'})
+        Huesped.objects.filter(pk=self.ana.pk).delete()
+        self.assertEqual(self.buscar('restre'), set())
+
+    def test_triggers_perdidos_se_restauran(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {TABLA_FTS}_ai")
+        Huesped.objects.create(
+            nombre='Zoe', apellido='Zapata', numero_documento='z1',
+            correo_electronico='zoe@example.com', telefono='1',
+        )
+        self.assertEqual(self.buscar('zapata'), set())
+        self.assertTrue(asegurar_indice(connection))
+        self.assertEqual(self.buscar('zapata'), {'Zapata'})
+
+    def test_endpoint_paginado(self):
+        for i in range(12):
+            alojar(
+                self.habitacion, nombre='Marta', apellido=f'Mora{i}', numero_documento=f'm{i}',
+                correo_electronico=f'marta{i}@example.com',
+            )
+        url = reverse('huespedes:huesped_buscar')
+        with self.assertNumQueries(1):
+            primera = self.client.get(url, {'q': 'marta mo'}).json()
+        self.assertEqual(len(primera['resultados']), 10)
+        self.assertEqual(primera['resultados'][0]['apellido'], 'Mora11')
+        self.assertEqual(primera['resultados'][0]['habitacion_numero'], '801')
+        segunda = self.client.get(url, {'q': 'marta mo', 'cursor': primera['siguiente']}).json()
+        self.assertEqual([r['apellido'] for r in segunda['resultados']], ['Mora1', 'Mora0'])
+        self.assertIsNone(segunda['siguiente'])
+        self.assertEqual(self.client.get(url, {'q': 'marta', 'cursor': 'x'}).status_code, 400)
+
+    def test_listado_filtra_con_q(self):
+        respuesta = self.client.get(reverse('huespedes:huesped_list_all'), {'q': 'gómez'})
+        self.assertContains(respuesta, 'Ana Gómez')
+        self.assertNotContains(respuesta, 'Andrés')
+
+
+class CheckInGrupalTests(TestCase):
+    def setUp(self):
+        self.grande = Habitacion.objects.create(numero='901', tipo='familiar', precio=100, capacidad=30)
+        self.pequena = Habitacion.objects.create(numero='902', tipo='pareja', precio=80, capacidad=10)
+        self.url = reverse('huespedes:huesped-grupo')
+
+    def grupo(self, cantidad, habitacion, prefijo='g'):
+        return [
+            {
+                'nombre': 'Turista', 'apellido': f'{prefijo}{i}', 'numero_documento': f'{prefijo}-{i}',
+                'correo_electronico': f'{prefijo}{i}@example.com', 'telefono': '1',
+                'habitacion': habitacion.pk, 'fecha_entrada': '2026-07-01', 'fecha_salida': '2026-07-03',
+            }
+            for i in range(cantidad)
+        ]
+
+    def test_cuarenta_huespedes_en_una_peticion(self):
+        datos = self.grupo(30, self.grande) + self.grupo(10, self.pequena, prefijo='p')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(self.url, {'huespedes': datos}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(len(respuesta.json()), 40)
+        self.assertLess(len(consultas), 20)
+        inserts = [q['sql'].split('"')[1] for q in consultas if q['sql'].startswith('INSERT INTO "huespedes_')]
+        self.assertEqual(inserts, ['huespedes_huesped', 'huespedes_estadia'])
+
+        self.grande.refresh_from_db()
+        self.pequena.refresh_from_db()
+        self.assertEqual((self.grande.ocupacion, self.grande.estado_habitacion), (30, 'ocupada'))
+        self.assertEqual((self.pequena.ocupacion, self.pequena.estado_habitacion), (10, 'ocupada'))
+        calendario = calendario_ocupacion(date(2026, 7, 1), date(2026, 7, 4))
+        self.assertEqual(calendario[(self.grande.pk, date(2026, 7, 2))], 30)
+        self.assertNotIn((self.grande.pk, date(2026, 7, 3)), calendario)
+        self.assertEqual(set(buscar_huespedes('p9').values_list('apellido', flat=True)), {'p9'})
+
+    def test_duplicados_rechazan_todo_el_grupo(self):
+        alojar(
+            self.grande, nombre='Ya', apellido='Estaba', numero_documento='g-1', correo_electronico='ya@example.com',
+        )
+        datos = self.grupo(3, self.pequena)
+        datos[2]['correo_electronico'] = datos[0]['correo_electronico']
+        respuesta = self.client.post(self.url, {'huespedes': datos}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        errores = respuesta.json()['huespedes']
+        self.assertEqual(errores[0], {})
+        self.assertIn('numero_documento', errores[1])
+        self.assertIn('correo_electronico', errores[2])
+        self.assertEqual(Huesped.objects.count(), 1)
+
+    def test_sin_cupo_no_reserva_en_ninguna_habitacion(self):
+        datos = self.grupo(5, self.grande) + self.grupo(11, self.pequena, prefijo='p')
+        respuesta = self.client.post(self.url, {'huespedes': datos}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        errores = respuesta.json()['huespedes']
+        self.assertEqual(errores[0], {})
+        self.assertIn('902', errores[5]['habitacion'][0])
+
+        datos[-1]['habitacion'] = 999999
+        errores = self.client.post(self.url, {'huespedes': datos[:-2] + datos[-1:]}, content_type='application/json').json()['huespedes']
+        self.assertEqual(errores[-1], {'habitacion': ['La habitación no existe.']})
+
+        self.grande.refresh_from_db()
+        self.assertEqual(self.grande.ocupacion, 0)
+        self.assertFalse(Huesped.objects.exists())
+
+
+class EstadiasTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='311', tipo='pareja', precio=80, capacidad=2)
+        self.datos = {
+            'nombre': 'Rosa', 'apellido': 'Vega', 'tipo_documento': 'Pasaporte',
+            'numero_documento': 'rv-1', 'correo_electronico': 'rosa@example.com', 'telefono': '1',
+        }
+
+    def test_huesped_que_vuelve_reutiliza_su_perfil(self):
+        url = reverse('habitaciones:agregar_huesped', args=[self.habitacion.pk])
+        self.assertEqual(self.client.post(url, self.datos).status_code, 200)
+        huesped = Huesped.objects.get()
+        self.client.post(reverse('huespedes:eliminar_huesped', args=[huesped.pk]))
+
+        respuesta = self.client.post(url, {**self.datos, 'telefono': '2'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(Huesped.objects.get().telefono, '2')
+        self.assertEqual(list(huesped.estadias.order_by('id').values_list('activa', flat=True)), [False, True])
+        # Ya alojado: un segundo check-in se rechaza sin tocar la ocupación
+        self.assertEqual(self.client.post(url, self.datos).status_code, 400)
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 1)
+
+    def test_check_out_conserva_el_historial(self):
+        hoy = date(2026, 8, 5)
+        estadia = registrar_huesped(self.habitacion, nuevo_huesped('h1'), fecha_entrada=date(2026, 8, 1))
+        self.assertEqual(retirar_huesped(estadia.huesped, hoy=hoy), self.habitacion)
+        estadia.refresh_from_db()
+        self.assertEqual((estadia.activa, estadia.fecha_salida), (False, hoy))
+        self.assertIsNone(estadia.huesped.habitacion)
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 0)
+        self.assertIsNone(retirar_huesped(estadia.huesped, hoy=hoy))
+
+        # La llegada futura que se cancela no deja historial
+        futura = registrar_huesped(self.habitacion, estadia.huesped, fecha_entrada=date(2026, 9, 1))
+        retirar_huesped(futura.huesped, hoy=hoy)
+        self.assertFalse(Estadia.objects.filter(pk=futura.pk).exists())
+
+    def test_api_check_in_check_out_e_historial(self):
+        huesped = Huesped.objects.create(**self.datos)
+        check_in = reverse('huespedes:huesped-check-in', args=[huesped.pk])
+        respuesta = self.client.post(check_in, {'habitacion': self.habitacion.pk, 'fecha_entrada': '2026-08-01'},
+                                     content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['habitacion_numero'], '311')
+        self.assertEqual(self.client.post(check_in, {'habitacion': self.habitacion.pk},
+                                          content_type='application/json').status_code, 400)
+
+        detalle = self.client.get(reverse('huespedes:huesped-detail', args=[huesped.pk])).json()
+        self.assertEqual(detalle['habitacion'], self.habitacion.pk)
+        salida = self.client.post(reverse('huespedes:huesped-check-out', args=[huesped.pk])).json()
+        self.assertIsNone(salida['habitacion'])
+
+        historial = self.client.get(reverse('huespedes:huesped-estadias', args=[huesped.pk])).json()
+        self.assertEqual([e['activa'] for e in historial], [False])
+        self.assertEqual(self.client.post(reverse('huespedes:huesped-check-out', args=[huesped.pk])).status_code, 400)
+
+    def test_alojados_solo_lee_estadias_activas(self):
+        for i in range(5):
+            estadia = registrar_huesped(self.habitacion, nuevo_huesped(f'viejo{i}'), fecha_entrada=date(2026, 1, 1))
+            retirar_huesped(estadia.huesped, hoy=date(2026, 1, 3))
+        alojar(self.habitacion, nombre='Sigue', apellido='Aquí', numero_documento='s1', correo_electronico='s@example.com')
+
+        respuesta = self.client.get(reverse('huespedes:huesped_list_all'))
+        self.assertEqual([e.huesped.apellido for e in respuesta.context['estadias']], ['Aquí'])
+        tablero = habitaciones_tablero().get()
+        self.assertEqual([e.huesped.apellido for e in tablero.estadias_tablero], ['Aquí'])
+        self.assertEqual(
+            list(habitaciones_disponibles(date(2026, 1, 1), date(2026, 1, 2))), [],
+        )
+
+
+class MigracionEstadiasTests(TransactionTestCase):
+    # Habitaciones también se fija: sus migraciones posteriores no dependen de huéspedes
+    antes = [('huespedes', '0010_huesped_busqueda'), ('habitaciones', '0016_tareaaseo_piso')]
+    despues = [('huespedes', '0011_estadia')]
+
+    def tearDown(self):
+        # Volver al esquema completo: ir a 0010 también deshace las migraciones que dependen
+        # de huéspedes en otras apps
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        # La migración rehace la tabla de huéspedes y con ella se pierden los triggers FTS
+        asegurar_indice(connection)
+
+    def test_cada_huesped_pasa_a_perfil_con_estadia_activa(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.antes)
+        viejas = executor.loader.project_state(self.antes).apps
+        habitacion = viejas.get_model('habitaciones', 'Habitacion').objects.create(
+            numero='1', tipo='pareja', precio=80, capacidad=2
+        )
+        viejas.get_model('huespedes', 'Huesped').objects.create(
+            nombre='Ana', apellido='Paz', numero_documento='m-1', correo_electronico='m1@example.com',
+            telefono='1', habitacion=habitacion, fecha_entrada=date(2026, 2, 1), fecha_salida=date(2026, 2, 4),
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.despues)
+        nuevas = executor.loader.project_state(self.despues).apps
+        estadia = nuevas.get_model('huespedes', 'Estadia').objects.get()
+        self.assertEqual(
+            (estadia.huesped.numero_documento, estadia.habitacion_id, estadia.fecha_entrada, estadia.fecha_salida, estadia.activa),
+            ('m-1', habitacion.pk, date(2026, 2, 1), date(2026, 2, 4), True),
+        )
+
+
+class MigracionUnicidadHuespedesTests(TransactionTestCase):
+    antes = [('huespedes', '0011_estadia')]
+    despues = [('huespedes', '0012_huesped_unicidad_sin_mayusculas')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        asegurar_indice(connection)
+
+    def test_duplicados_por_mayusculas_detienen_la_migracion(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.antes)
+        Huesped = executor.loader.project_state(self.antes).apps.get_model('huespedes', 'Huesped')
+        for documento, correo in (('AB-1', 'Dup@example.com'), ('ab-1 ', 'dup@example.com '), ('cd-2', 'otro@example.com')):
+            Huesped.objects.create(
+                nombre='Ana', apellido='Paz', numero_documento=documento, correo_electronico=correo, telefono='1'
+            )
+        primero, segundo, _ = Huesped.objects.order_by('id').values_list('id', flat=True)
+        with self.assertRaisesMessage(CommandError, f"numero_documento 'ab-1': huéspedes {primero}, {segundo}") as error:
+            MigrationExecutor(connection).migrate(self.despues)
+        self.assertIn(f"correo_electronico 'dup@example.com': huéspedes {primero}, {segundo}", str(error.exception))
+
+        Huesped.objects.filter(pk=segundo).delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.despues)
+        Huesped = executor.loader.project_state(self.despues).apps.get_model('huespedes', 'Huesped')
+        self.assertEqual(Huesped.objects.get(pk=primero).correo_electronico, 'dup@example.com')
+
+
+class ExportacionRegistroTests(TestCase):
+    def setUp(self):
+        habitacion = Habitacion.objects.create(numero='131', tipo='familiar', precio=100, capacidad=10)
+        for i, (entrada, salida) in enumerate((
+            (date(2026, 3, 1), date(2026, 3, 4)),
+            (date(2026, 3, 5), None),
+            (date(2026, 2, 1), date(2026, 2, 3)),
+            (date(2026, 4, 1), date(2026, 4, 2)),
+        )):
+            alojar(
+                habitacion, entrada, salida, nombre='José', apellido=f'Núñez{i}', tipo_documento='Pasaporte',
+                numero_documento=f'PA{i}', correo_electronico=f'exp{i}@example.com',
+            )
+        self.url = reverse('huespedes:huesped_exportar')
+
+    def test_csv_en_streaming(self):
+        respuesta = self.client.get(self.url, {'desde': '2026-03-03', 'hasta': '2026-03-10'})
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="registro-huespedes-20260303-20260310.csv"')
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0], 'tipo_documento,numero_documento,apellido,nombre,habitacion,fecha_entrada,fecha_salida')
+        self.assertEqual(lineas[1:], [
+            'Pasaporte,PA0,Núñez0,José,131,2026-03-01,2026-03-04',
+            'Pasaporte,PA1,Núñez1,José,131,2026-03-05,',
+        ])
+
+    def test_jsonl_por_bloques_y_una_lectura_por_bloque(self):
+        with self.assertNumQueries(1):
+            bloques = list(exportar_registro(date(2026, 1, 1), date(2026, 12, 31), 'jsonl', filas_por_bloque=3))
+        self.assertEqual([bloque.count('\n') for bloque in bloques], [3, 1])
+        primera = json.loads(bloques[0].splitlines()[0])
+        self.assertEqual(primera, {
+            'tipo_documento': 'Pasaporte', 'numero_documento': 'PA2', 'apellido': 'Núñez2', 'nombre': 'José',
+            'habitacion': '131', 'fecha_entrada': '2026-02-01', 'fecha_salida': '2026-02-03',
+        })
+
+    def test_rango_invalido(self):
+        self.assertEqual(self.client.get(self.url, {'desde': '2026-03-10', 'hasta': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'desde': '2026-03-10'}).status_code, 400)
+
+    def test_comando_escribe_el_mismo_contenido(self):
+        params = {'desde': '2026-02-01', 'hasta': '2026-04-30', 'formato': 'jsonl'}
+        web = b''.join(self.client.get(self.url, params).streaming_content).decode()
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = f'{carpeta}/registro.jsonl'
+            call_command('export_guest_registry', salida=ruta, stdout=StringIO(), **params)
+            with open(ruta, encoding='utf-8') as archivo:
+                self.assertEqual(archivo.read(), web)
+        with self.assertRaises(CommandError):
+            call_command('export_guest_registry', desde='2026-05-01', hasta='2026-04-01', stdout=StringIO())
+
+
+class UnicidadHuespedTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='141', tipo='familiar', precio=100, capacidad=4)
+        self.ana = alojar(
+            self.habitacion, nombre='Ana', apellido='Ruiz', numero_documento='AB-1',
+            correo_electronico='ana@example.com',
+        ).huesped
+
+    def datos(self, **cambios):
+        datos = {
+            'nombre': 'Otra', 'apellido': 'Persona', 'tipo_documento': 'Pasaporte',
+            'numero_documento': 'CD-2', 'correo_electronico': 'otra@example.com', 'telefono': '1',
+        }
+        datos.update(cambios)
+        return datos
+
+    def test_formulario_valida_ambos_campos_con_una_consulta(self):
+        form = HuespedForm(self.datos(numero_documento=' ab-1 ', correo_electronico='ANA@Example.com'))
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'numero_documento', 'correo_electronico'})
+        self.assertNotIn('__all__', form.errors)
+
+    def test_correo_se_guarda_normalizado(self):
+        form = HuespedForm(self.datos(correo_electronico='  Otra@Example.COM '))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().correo_electronico, 'otra@example.com')
+
+    def test_edicion_no_choca_consigo_mismo(self):
+        form = HuespedForm(self.datos(numero_documento='AB-1', correo_electronico='ANA@example.com'), instance=self.ana)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_api_rechaza_duplicado_sin_distinguir_mayusculas(self):
+        respuesta = self.client.post(
+            reverse('huespedes:huesped-list'), self.datos(correo_electronico='Ana@EXAMPLE.com'), content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(list(respuesta.json()), ['correo_electronico'])
+        # Un PATCH parcial solo valida lo que cambia
+        respuesta = self.client.patch(
+            reverse('huespedes:huesped-detail', args=[self.ana.pk]), {'telefono': '2'}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_indice_unico_atrapa_la_carrera(self):
+        # Otro registro gana entre la validación y el INSERT: el índice lo rechaza y el
+        # error llega al campo, no como un 500
+        with mock.patch.object(Huesped, 'claves_en_uso', return_value={}):
+            respuesta = self.client.post(
+                reverse('huespedes:huesped-list'), self.datos(correo_electronico='ANA@example.com'),
+                content_type='application/json',
+            )
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn('correo_electronico', respuesta.json())
+
+            perfil = Huesped(**self.datos(numero_documento='ab-1'))
+            with self.assertRaises(PerfilDuplicado) as error:
+                registrar_huesped(self.habitacion, perfil)
+            self.assertEqual(error.exception.campo, 'numero_documento')
+        self.assertEqual(self.habitacion.estadias.count(), 1)
+        self.habitacion.refresh_from_db()
+        self.assertEqual(self.habitacion.ocupacion, 0)
+
+    def test_busqueda_por_clave_usa_el_indice(self):
+        sql, params = Huesped.objects.con_clave('correo_electronico', ['ana@example.com']).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn('huesped_correo_unico', plan)
+
+
+class ArchivoHistoricoTests(TestCase):
+    def setUp(self):
+        self.a = Habitacion.objects.create(numero='151', tipo='familiar', precio=100, capacidad=4)
+        self.b = Habitacion.objects.create(numero='152', tipo='familiar', precio=100, capacidad=4)
+        self.viejas = [
+            self.estadia(self.a, date(2025, 1, 1), date(2025, 1, 5), 'v1'),
+            self.estadia(self.b, date(2025, 2, 1), date(2025, 2, 3), 'v2'),
+        ]
+        self.reciente = self.estadia(self.a, date(2026, 9, 1), date(2026, 9, 5), 'r')
+        self.larga = alojar(self.b, date(2025, 3, 1), None, nombre='Larga', apellido='Estadía',
+                            numero_documento='arc-l', correo_electronico='arcl@example.com')
+        self.producto = Producto.objects.create(nombre='Agua', precio=Decimal('3.00'))
+        self.antiguo = self.cargar(self.a, self.viejas[0].huesped, datetime(2025, 1, 2, 12))
+        self.de_la_larga = self.cargar(self.b, None, datetime(2025, 3, 4, 9))
+        self.nuevo = self.cargar(self.a, None, datetime(2026, 9, 2, 20))
+        self.antes_de = date(2026, 1, 1)
+
+    def estadia(self, habitacion, entrada, salida, sufijo):
+        estadia = alojar(habitacion, entrada, salida, nombre='Arc', apellido=sufijo,
+                         numero_documento=f'arc-{sufijo}', correo_electronico=f'arc{sufijo}@example.com')
+        Estadia.objects.filter(pk=estadia.pk).update(activa=False)
+        estadia.activa = False
+        return estadia
+
+    def cargar(self, habitacion, huesped, momento):
+        consumo = Consumo.objects.create(habitacion=habitacion, huesped=huesped, producto=self.producto, cantidad=2)
+        Consumo.objects.filter(pk=consumo.pk).update(fecha_consumo=timezone.make_aware(momento))
+        return consumo
+
+    def noches(self):
+        return list(NocheHabitacion.objects.order_by('habitacion_id', 'fecha').values_list('habitacion_id', 'fecha', 'huespedes'))
+
+    def test_limite_en_meses(self):
+        self.assertEqual(limite_archivo(1, date(2026, 3, 31)), date(2026, 2, 28))
+        self.assertEqual(limite_archivo(12, date(2026, 1, 15)), date(2025, 1, 15))
+
+    def test_mueve_por_lotes_sin_tocar_inventario(self):
+        noches = self.noches()
+        self.assertEqual(archivar_estadias(self.antes_de, tamano_lote=1), 2)
+        self.assertEqual(set(EstadiaArchivada.objects.values_list('id', flat=True)), {e.pk for e in self.viejas})
+        self.assertEqual(set(Estadia.objects.values_list('id', flat=True)), {self.reciente.pk, self.larga.pk})
+        self.assertEqual(self.noches(), noches)
+
+        # El consumo de la estadía larga (aún activa) sigue en la tabla de trabajo
+        self.assertEqual(archivar_consumos(self.antes_de, tamano_lote=1), 1)
+        self.assertEqual(list(ConsumoArchivado.objects.values_list('id', flat=True)), [self.antiguo.pk])
+        self.assertEqual(set(Consumo.objects.values_list('id', flat=True)), {self.de_la_larga.pk, self.nuevo.pk})
+        self.assertEqual(archivar_estadias(self.antes_de), 0)
+
+    def test_folio_de_estadia_archivada(self):
+        antes = calcular_folio(self.viejas[0].pk)
+        archivar_estadias(self.antes_de)
+        archivar_consumos(self.antes_de)
+        despues = calcular_folio(self.viejas[0].pk)
+        self.assertEqual((despues.total, despues.lineas, despues.version), (antes.total, antes.lineas, antes.version))
+        self.assertEqual([c.pk for c in despues.detalle()], [self.antiguo.pk])
+        with mock.patch('consumos.views.encolar_factura'):
+            self.assertContains(self.client.get(reverse('consumos:folio_estadia', args=[self.viejas[0].pk])), 'Agua')
+
+    def test_reportes_leen_ambas_tablas(self):
+        registro = ''.join(exportar_registro(date(2025, 1, 1), date(2026, 12, 31)))
+        noches = self.noches()
+        archivar_estadias(self.antes_de)
+        self.assertEqual(''.join(exportar_registro(date(2025, 1, 1), date(2026, 12, 31))), registro)
+
+        call_command('rebuild_inventory', stdout=StringIO())
+        self.assertEqual(self.noches(), noches)
+
+        detalle = self.client.get(reverse('huespedes:huesped_detail', args=[self.viejas[0].huesped_id]))
+        self.assertContains(detalle, reverse('consumos:folio_estadia', args=[self.viejas[0].pk]))
+
+    def test_comando(self):
+        salida = StringIO()
+        with mock.patch('consumos.management.commands.archive_history.limite_archivo', return_value=self.antes_de):
+            call_command('archive_history', meses=6, stdout=salida)
+        self.assertIn('Archivadas 2 estadías y 1 consumos', salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('archive_history', meses=0, stdout=StringIO())
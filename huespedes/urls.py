@@ -1,10 +1,14 @@
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 from .views import (
     HuespedListAllView,
     HuespedDetailView,
     HuespedCreateView,
     HuespedUpdateView,
     HuespedDeleteView,
+    HuespedViewSet,
+    buscar_huesped,
+    exportar_registro_huespedes,
     obtener_huesped,
     eliminar_huesped,
     agregar_huesped,
@@ -13,6 +17,10 @@ from .views import (
 
 app_name = 'huespedes'
 
+# Router de la API REST
+router = DefaultRouter()
+router.register(r'huespedes', HuespedViewSet)
+
 urlpatterns = [
     # 🔹 Vistas relacionadas con habitaciones
     path('habitacion/<int:habitacion_id>/huespedes/', HuespedListAllView.as_view(), name='huesped_list'),
@@ -25,10 +33,15 @@ urlpatterns = [
 
     # 🔹 Vista de todos los huéspedes (opcional si la necesitas globalmente)
     path('listado-completo/', HuespedListAllView.as_view(), name='huesped_list_all'),
+    path('buscar/', buscar_huesped, name='huesped_buscar'),
+    path('registro/exportar/', exportar_registro_huespedes, name='huesped_exportar'),
 
     # 🔹 Rutas AJAX
     path('ajax/huesped/<int:pk>/', obtener_huesped, name='obtener_huesped'),
     path('ajax/huesped/<int:pk>/eliminar/', eliminar_huesped, name='eliminar_huesped'),
     path('ajax/huesped/<int:habitacion_id>/agregar/', agregar_huesped, name='agregar_huesped'),
     path('ajax/huesped/<int:pk>/editar/', editar_huesped, name='editar_huesped'),
+
+    # 🔹 API REST
+    path('api/', include(router.urls)),
 ]
@@ -2,31 +2,56 @@ import logging
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.http import JsonResponse, HttpResponseRedirect, Http404
+from django.http import JsonResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.db.models import Exists, OuterRef, Subquery
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
+from habitaciones.api import CamposSolicitadosMixin, PaginacionCursorApi, fecha_parametro
 from habitaciones.models import Habitacion
-from .models import Huesped
-from .forms import HuespedForm
+from habitaciones.paginacion import CursorInvalido, PaginacionKeysetMixin, paginar
+from habitaciones.services import (
+    CheckInRechazado,
+    GrupoInvalido,
+    registrar_grupo,
+    registrar_huesped,
+    retirar_huesped,
+    trasladar_huesped,
+)
+from .busqueda import buscar_huespedes
+from .exportacion import FORMATOS, exportar_registro, nombre_archivo
+from .models import Estadia, Huesped, con_estadia_actual, prefetch_estadia_actual
+from .forms import ExportacionRegistroForm, HuespedForm, perfil_por_documento
+from .serializers import EstadiaSerializer, GrupoHuespedesSerializer, HuespedSerializer
 
 logger = logging.getLogger(__name__)
 
 
 # =========================
-# ✅ LISTAR TODOS LOS HUÉSPEDES (sin filtrar por habitación)
+# ✅ LISTAR LOS HUÉSPEDES ALOJADOS (todas las habitaciones o una)
 # =========================
-class HuespedListAllView(ListView):
-    model = Huesped
+class HuespedListAllView(PaginacionKeysetMixin, ListView):
+    model = Estadia
     template_name = 'huespedes/huespedes_list.html'
-    context_object_name = 'huespedes'
+    plantilla_parcial = 'huespedes/huespedes_list_items.html'
+    context_object_name = 'estadias'
+    orden_keyset = ('id',)
 
     def get_queryset(self):
+        # Solo las estadías activas: el historial no se recorre para listar a los alojados
         habitacion_id = self.kwargs.get('habitacion_id')
-        queryset = Huesped.objects.all().select_related('habitacion')
-        return queryset.filter(habitacion_id=habitacion_id) if habitacion_id else queryset
+        queryset = Estadia.objects.activas().select_related('huesped', 'habitacion')
+        if habitacion_id:
+            queryset = queryset.filter(habitacion_id=habitacion_id)
+        texto = self.request.GET.get('q', '').strip()
+        return queryset.filter(huesped__in=buscar_huespedes(texto)) if texto else queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '').strip()
         habitacion_id = self.kwargs.get('habitacion_id')
         if habitacion_id:
             context['habitacion'] = Habitacion.objects.get(pk=habitacion_id)
@@ -46,21 +71,24 @@ class HuespedCreateView(CreateView):
         context['habitacion'] = get_object_or_404(Habitacion, pk=self.kwargs.get('habitacion_id'))
         return context
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        if self.request.method == 'POST':
+            # Un huésped que vuelve reutiliza su perfil en vez de duplicar documento y correo
+            kwargs['instance'] = perfil_por_documento(self.request.POST)
+        return kwargs
+
     def form_valid(self, form):
         habitacion = get_object_or_404(Habitacion, pk=self.kwargs["habitacion_id"])
-        huesped = form.save(commit=False)
-        huesped.habitacion = habitacion
-
-        # ✅ Verificamos si la habitación está llena usando la propiedad capacidad_actual
-        if habitacion.capacidad_actual >= habitacion.capacidad:
+        # ✅ Reservamos cupo y abrimos la estadía en la misma transacción
+        try:
+            self.object = registrar_huesped(habitacion, form.save(commit=False)).huesped
+        except CheckInRechazado as e:
             if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
-                return JsonResponse({"success": False, "error": "La habitación ya ha alcanzado su capacidad máxima."})
-            form.add_error(None, "La habitación ya ha alcanzado su capacidad máxima.")
+                return JsonResponse({"success": False, "error": str(e)})
+            form.add_error(e.campo, str(e))
             return self.form_invalid(form)
 
-        # ✅ Guardamos huésped (no actualizamos capacidad_actual manualmente porque es una propiedad)
-        huesped.save()
-
         # ⚡ Si es petición AJAX, devolvemos JSON con redirect_url
         if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
             url = reverse("habitaciones:huesped_list", kwargs={"habitacion_id": habitacion.id})
@@ -88,6 +116,15 @@ class HuespedDetailView(DetailView):
     model = Huesped
     template_name = 'huespedes/huespedes_detail.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        estadias = list(self.object.estadias.select_related('habitacion').order_by('-fecha_entrada', '-id'))
+        context['estadia_actual'] = next((e for e in estadias if e.activa), None)
+        # El historial antiguo está archivado: se lee aparte y se intercala por llegada
+        estadias += self.object.estadias_archivadas.select_related('habitacion')
+        context['estadias'] = sorted(estadias, key=lambda e: (e.fecha_entrada, e.pk), reverse=True)
+        return context
+
 
 # =========================
 # ✅ EDITAR UN HUÉSPED
@@ -101,6 +138,7 @@ class HuespedUpdateView(UpdateView):
     def form_valid(self, form):
         # Guardar el objeto Huesped pero sin confirmarlo aún
         self.object = form.save(commit=False)
+        nueva_habitacion = self.object.habitacion
 
         # Agregar logs para verificar los valores
         logger.debug(f"Guardando huésped: {self.object}")
@@ -114,15 +152,19 @@ class HuespedUpdateView(UpdateView):
             habitacion = Habitacion.objects.filter(pk=habitacion_id).first()
             if habitacion:
                 # Asignar la habitación al huésped
-                self.object.habitacion = habitacion
+                nueva_habitacion = habitacion
             else:
                 # Si no se encuentra la habitación, se registra un error
                 logger.error(f"Habitación no encontrada con ID: {habitacion_id}")
                 form.add_error(None, 'Habitación no encontrada')
                 return self.form_invalid(form)
 
-        # Guardar el objeto huésped
-        self.object.save()
+        # Guardar el huésped; si cambia de habitación se reserva cupo en la nueva
+        try:
+            trasladar_huesped(self.object, nueva_habitacion)
+        except CheckInRechazado as e:
+            form.add_error(e.campo, str(e))
+            return self.form_invalid(form)
 
         # Si la petición es AJAX, retornar una respuesta JSON
         if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -132,13 +174,13 @@ class HuespedUpdateView(UpdateView):
         return super().form_valid(form)
 
     def get_success_url(self):
-        # Si el huésped tiene habitación, redirigir a la lista de huéspedes de esa habitación
+        # Si el huésped está alojado, redirigir a la lista de huéspedes de esa habitación
         habitacion_id = getattr(self.object.habitacion, 'id', None)
         if habitacion_id:
             return reverse('huespedes:huesped_list', kwargs={'habitacion_id': habitacion_id})
 
-        # Si no tiene habitación asignada, lanzar error 404
-        raise Http404("El huésped no tiene una habitación asignada")
+        # Sin estadía activa, volver a su ficha
+        return reverse('huespedes:huesped_detail', kwargs={'pk': self.object.pk})
 
 
 
@@ -150,26 +192,63 @@ class HuespedDeleteView(DeleteView):
     model = Huesped
     template_name = 'huespedes/huespedes_confirm_delete.html'
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        habitacion = self.object.habitacion
-        habitacion_id = habitacion.id
-
+    def form_valid(self, form):
+        request = self.request
+        # Primero el check-out (libera el cupo), luego el perfil con su historial
+        habitacion = retirar_huesped(self.object)
         self.object.delete()
 
-        if habitacion.huespedes.count() < habitacion.capacidad:
-            habitacion.disponible = True
-            habitacion.save()
-
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({"success": True, "message": "Huésped eliminado correctamente"})
 
-        return HttpResponseRedirect(reverse('huespedes:huesped_list', kwargs={'habitacion_id': habitacion_id}))
+        if habitacion is None:
+            return HttpResponseRedirect(reverse('huespedes:huesped_list_all'))
+        return HttpResponseRedirect(reverse('huespedes:huesped_list', kwargs={'habitacion_id': habitacion.id}))
 
     def get_success_url(self):
         return reverse('huespedes:huesped_list_all')
 
 
+# =========================
+# 🔎 BÚSQUEDA DE HUÉSPEDES (typeahead)
+# =========================
+TAMANO_BUSQUEDA = 10
+TAMANO_BUSQUEDA_MAXIMO = 50
+
+
+def buscar_huesped(request):
+    """
+    ``?q=ana gó`` -> huéspedes cuyo nombre, apellido, documento, correo o placas
+    empiezan por cada palabra, los más recientes primero. Pagina con ``?cursor=``.
+    """
+    texto = request.GET.get('q', '').strip()
+    try:
+        tamano = min(int(request.GET.get('limite', TAMANO_BUSQUEDA)), TAMANO_BUSQUEDA_MAXIMO)
+    except ValueError:
+        tamano = TAMANO_BUSQUEDA
+    habitacion_actual = Estadia.objects.activas().filter(huesped=OuterRef('pk')).values('habitacion__numero')[:1]
+    queryset = buscar_huespedes(texto).annotate(habitacion_numero=Subquery(habitacion_actual))
+    try:
+        pagina = paginar(queryset, ('-id',), request.GET.get('cursor'), max(tamano, 1))
+    except CursorInvalido as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    return JsonResponse({
+        "resultados": [
+            {
+                "id": huesped.pk,
+                "nombre": huesped.nombre,
+                "apellido": huesped.apellido,
+                "numero_documento": huesped.numero_documento,
+                "habitacion_numero": huesped.habitacion_numero,
+                "url": reverse('huespedes:huesped_detail', kwargs={'pk': huesped.pk}),
+            }
+            for huesped in pagina.objetos
+        ],
+        "siguiente": pagina.siguiente,
+    })
+
+
 # =========================
 # 🚀 VISTAS AJAX
 # =========================
@@ -190,8 +269,11 @@ def huesped_edit(request, pk):
     if request.method == 'POST':
         form = HuespedForm(request.POST, instance=huesped)  # Pasamos la instancia al formulario
         if form.is_valid():
-            form.save()
-            return redirect('huespedes:huesped_detail', pk=huesped.pk)  # Redirigir al detalle del huésped
+            try:
+                trasladar_huesped(form.save(commit=False), None)
+                return redirect('huespedes:huesped_detail', pk=huesped.pk)  # Redirigir al detalle del huésped
+            except CheckInRechazado as e:
+                form.add_error(e.campo, str(e))
     else:
         form = HuespedForm(instance=huesped)  # En GET, pasamos la instancia de huesped
 
@@ -205,19 +287,12 @@ def huesped_edit(request, pk):
 def agregar_huesped(request, habitacion_id):
     habitacion = get_object_or_404(Habitacion, pk=habitacion_id)
     if request.method == "POST":
-        form = HuespedForm(request.POST)
+        form = HuespedForm.para_check_in(request.POST)
         if form.is_valid():
-            correo = form.cleaned_data.get('correo_electronico')
-            if Huesped.objects.filter(correo_electronico=correo).exists():
-                return JsonResponse({"error": "Ya existe un huésped con este correo electrónico."}, status=400)
-
-            huesped = form.save(commit=False)
-            huesped.habitacion = habitacion
-            huesped.save()
-
-            if habitacion.huespedes.count() >= habitacion.capacidad:
-                habitacion.disponible = False
-                habitacion.save()
+            try:
+                registrar_huesped(habitacion, form.save(commit=False))
+            except CheckInRechazado as e:
+                return JsonResponse({"error": str(e)}, status=400)
 
             return JsonResponse({"success": True, "message": "Huésped agregado exitosamente"})
 
@@ -229,14 +304,13 @@ def editar_huesped(request, pk):
     huesped = get_object_or_404(Huesped, pk=pk)
     if request.method == "POST":
         form = HuespedForm(request.POST, instance=huesped)
-        if form.is_valid():
-            correo = form.cleaned_data.get('correo_electronico')
-            if correo.lower() != huesped.correo_electronico.lower() and Huesped.objects.filter(correo_electronico__iexact=correo).exists():
-                return JsonResponse({"error": "Datos inválidos", "errors": form.errors}, status=400)
-
-
-            form.save()
-            return JsonResponse({"success": True, "message": "Huésped actualizado correctamente"})
+        if not form.is_valid():
+            return JsonResponse({"error": "Datos inválidos", "errors": form.errors}, status=400)
+        try:
+            trasladar_huesped(form.save(commit=False), None)
+        except CheckInRechazado as e:
+            return JsonResponse({"error": str(e), "errors": {e.campo: [str(e)]}}, status=400)
+        return JsonResponse({"success": True, "message": "Huésped actualizado correctamente"})
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -244,14 +318,146 @@ def editar_huesped(request, pk):
 @csrf_exempt
 def eliminar_huesped(request, pk):
     if request.method == "POST":
-        huesped = get_object_or_404(Huesped, pk=pk)
-        habitacion = huesped.habitacion
-        huesped.delete()
-
-        if habitacion.huespedes.count() < habitacion.capacidad:
-            habitacion.disponible = True
-            habitacion.save()
-
+        retirar_huesped(get_object_or_404(Huesped, pk=pk))
         return JsonResponse({"success": True, "message": "Huésped eliminado correctamente"})
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
+
+
+# =========================
+# 📤 REGISTRO DE HUÉSPEDES PARA LAS AUTORIDADES
+# =========================
+def exportar_registro_huespedes(request):
+    form = ExportacionRegistroForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Parámetros inválidos', 'errors': form.errors}, status=400)
+
+    desde, hasta, formato = (form.cleaned_data[campo] for campo in ('desde', 'hasta', 'formato'))
+    # Se escribe a medida que se lee: la memoria no crece con el número de estadías
+    respuesta = StreamingHttpResponse(exportar_registro(desde, hasta, formato), content_type=FORMATOS[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo(desde, hasta, formato)}"'
+    return respuesta
+
+
+# =========================
+# 🌐 API REST DE HUÉSPEDES
+# =========================
+class HuespedViewSet(CamposSolicitadosMixin, viewsets.ModelViewSet):
+    """
+    Perfiles de huéspedes con su estadía activa. Filtros: ``?habitacion=`` (alojados en
+    ella), ``?fecha=`` (alojados esa noche) y ``?entrada_desde=`` / ``?entrada_hasta=``
+    sobre sus estadías. Altas, traslados y bajas pasan por los servicios de check-in, así
+    la ocupación de las habitaciones sigue siendo exacta.
+    ``POST grupo/`` registra un grupo completo (``{"huespedes": [...]}``) en una petición;
+    ``POST {id}/check-in/`` y ``{id}/check-out/`` abren y cierran estadías de un huésped
+    ya registrado y ``GET {id}/estadias/`` devuelve su historial.
+    """
+    queryset = Huesped.objects.all()
+    serializer_class = HuespedSerializer
+    pagination_class = PaginacionCursorApi
+    orden_cursor = 'id'
+    campos_relacionados = {
+        campo: ('prefetch_related', prefetch_estadia_actual)
+        for campo in ('habitacion', 'habitacion_numero', 'fecha_entrada', 'fecha_salida')
+    }
+
+    def get_queryset(self):
+        queryset = self.optimizar_queryset(super().get_queryset())
+        habitacion = self.request.query_params.get('habitacion')
+        if habitacion:
+            if not habitacion.isdigit():
+                raise ValidationError({'habitacion': ["Debe ser un id numérico."]})
+            queryset = queryset.filter(estadias__habitacion_id=habitacion, estadias__activa=True)
+
+        estadias = Estadia.objects.filter(huesped=OuterRef('pk'))
+        fecha = fecha_parametro(self.request, 'fecha')
+        if fecha:
+            estadias = estadias.en_fecha(fecha)
+        entrada_desde = fecha_parametro(self.request, 'entrada_desde')
+        if entrada_desde:
+            estadias = estadias.filter(fecha_entrada__gte=entrada_desde)
+        entrada_hasta = fecha_parametro(self.request, 'entrada_hasta')
+        if entrada_hasta:
+            estadias = estadias.filter(fecha_entrada__lte=entrada_hasta)
+        if fecha or entrada_desde or entrada_hasta:
+            queryset = queryset.filter(Exists(estadias))
+        return queryset
+
+    def perform_create(self, serializer):
+        datos = dict(serializer.validated_data)
+        estadia = datos.pop('estadia_actual', {})
+        huesped = Huesped(**datos)
+        try:
+            if estadia.get('habitacion'):
+                registrar_huesped(
+                    estadia['habitacion'], huesped, estadia.get('fecha_entrada'), estadia.get('fecha_salida')
+                )
+            else:
+                trasladar_huesped(huesped, None)
+        except CheckInRechazado as error:
+            raise ValidationError({error.campo or 'habitacion': [str(error)]})
+        serializer.instance = huesped
+
+    def perform_update(self, serializer):
+        huesped = serializer.instance
+        datos = dict(serializer.validated_data)
+        nueva_habitacion = datos.pop('estadia_actual', {}).get('habitacion')
+        for campo, valor in datos.items():
+            setattr(huesped, campo, valor)
+        try:
+            trasladar_huesped(huesped, nueva_habitacion)
+        except CheckInRechazado as error:
+            raise ValidationError({error.campo or 'habitacion': [str(error)]})
+
+    def perform_destroy(self, instance):
+        # Primero el check-out (libera el cupo), luego el perfil con su historial
+        retirar_huesped(instance)
+        instance.delete()
+
+    @action(detail=True, methods=['post'], url_path='check-in', serializer_class=EstadiaSerializer)
+    def check_in(self, request, pk=None):
+        huesped = self.get_object()
+        serializer = EstadiaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        try:
+            estadia = registrar_huesped(
+                datos['habitacion'], huesped, datos.get('fecha_entrada'), datos.get('fecha_salida')
+            )
+        except CheckInRechazado as error:
+            raise ValidationError({'habitacion': [str(error)]})
+        return Response(EstadiaSerializer(estadia).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='check-out')
+    def check_out(self, request, pk=None):
+        huesped = self.get_object()
+        if retirar_huesped(huesped) is None:
+            raise ValidationError({'huesped': ["El huésped no está alojado."]})
+        # La estadía precargada por get_object() ya no es la actual
+        return Response(HuespedSerializer(self.get_object(), context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'], serializer_class=EstadiaSerializer)
+    def estadias(self, request, pk=None):
+        estadias = self.get_object().estadias.select_related('habitacion').order_by('-fecha_entrada', '-id')
+        return Response(EstadiaSerializer(estadias, many=True).data)
+
+    @action(detail=False, methods=['post'], serializer_class=GrupoHuespedesSerializer)
+    def grupo(self, request):
+        serializer = GrupoHuespedesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        llegadas = []
+        for datos in serializer.validated_data['huespedes']:
+            datos = dict(datos)
+            estadia = {'habitacion_id': datos.pop('habitacion'), 'fecha_salida': datos.pop('fecha_salida', None)}
+            fecha_entrada = datos.pop('fecha_entrada', None)
+            if fecha_entrada:
+                estadia['fecha_entrada'] = fecha_entrada
+            llegadas.append(Estadia(huesped=Huesped(**datos), **estadia))
+        try:
+            creadas = registrar_grupo(llegadas)
+        except GrupoInvalido as error:
+            raise ValidationError({'huespedes': error.errores})
+
+        huespedes = con_estadia_actual(Huesped.objects.filter(pk__in=[e.huesped_id for e in creadas])).order_by('id')
+        datos = HuespedSerializer(huespedes, many=True, context={'request': request}).data
+        return Response(datos, status=status.HTTP_201_CREATED)
@@ -16,10 +16,17 @@ class ProductoForm(forms.ModelForm):
         widget=forms.Select(attrs={'class': 'form-select'}),
         help_text="Selecciona una categoría existente o crea una nueva."
     )
+    # Stock que se mostró al abrir el formulario: el recuento se compara contra este valor
+    stock_mostrado = forms.IntegerField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Producto
-        fields = ['nombre', 'descripcion', 'precio', 'disponible', 'categoria', 'imagen']
+        fields = ['nombre', 'descripcion', 'precio', 'stock', 'disponible', 'categoria', 'imagen']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['stock_mostrado'].initial = self.instance.stock
 
     def clean(self):
         cleaned_data = super().clean()
@@ -34,3 +41,11 @@ class ProductoForm(forms.ModelForm):
             categoria = Categoria.objects.create(nombre=nueva_categoria)
             cleaned_data['categoria'] = categoria  # Asignamos la nueva categoría al producto
         return cleaned_data
+
+
+class ReposicionForm(forms.Form):
+    cantidad = forms.IntegerField(
+        min_value=1,
+        label="Unidades recibidas",
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
+    )
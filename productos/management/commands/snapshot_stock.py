@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from productos.stock import tomar_cierre
+
+
+class Command(BaseCommand):
+    help = "Toma un cierre del stock de cada producto (programarlo a diario, p. ej. con cron)."
+
+    def handle(self, *args, **options):
+        cierres = tomar_cierre()
+        self.stdout.write(self.style.SUCCESS(f"Cierre de stock tomado: {cierres} productos."))
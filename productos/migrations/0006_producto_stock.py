@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_consumo_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='stock',
+            field=models.PositiveIntegerField(default=0, help_text='Unidades disponibles para registrar consumos.', verbose_name='Stock'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def saldo_inicial(apps, schema_editor):
+    # El stock que ya había entra al libro como un ajuste de apertura
+    Producto = apps.get_model('productos', 'Producto')
+    MovimientoStock = apps.get_model('productos', 'MovimientoStock')
+    MovimientoStock.objects.bulk_create(
+        [
+            MovimientoStock(producto_id=pk, tipo='ajuste', cantidad=stock)
+            for pk, stock in Producto.objects.filter(stock__gt=0).values_list('pk', 'stock').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_producto_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('ultimo_movimiento', models.BigIntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cierres_stock', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Cierre de stock',
+                'verbose_name_plural': 'Cierres de stock',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='cierre_stock_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('venta', 'Venta'), ('reposicion', 'Reposición'), ('ajuste', 'Ajuste de inventario'), ('reversion', 'Reversión de venta')], max_length=12)),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad (+ entra, − sale)')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('consumo_id', models.BigIntegerField(blank=True, null=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de stock',
+                'verbose_name_plural': 'Movimientos de stock',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['producto', 'id'], name='productos_m_product_6c3241_idx')],
+            },
+        ),
+        migrations.RunPython(saldo_inicial, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from huespedes.models import Huesped  # importa si aún no está
+from habitaciones.imagenes import DerivadosImagen
 
 
 class Consumo(models.Model):
@@ -70,6 +72,12 @@ class Producto(models.Model):
         verbose_name="Disponible",
         help_text="Indica si el producto está disponible para la venta."
     )
+    # Caché del libro MovimientoStock: solo la cambian mover_stock y fijar_stock (productos/stock.py)
+    stock = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Stock",
+        help_text="Unidades disponibles para registrar consumos."
+    )
     fecha_creacion = models.DateTimeField(
         auto_now_add=True, 
         verbose_name="Fecha de creación", 
@@ -100,6 +108,22 @@ class Producto(models.Model):
     def __str__(self):
         return f"{self.nombre} - ${self.precio:.2f}"
 
+    def save(self, *args, **kwargs):
+        """
+        Al editar un producto existente nunca se escribe ``stock``: la columna es la caché
+        del libro de movimientos y solo la cambia productos.stock (``mover_stock`` y
+        ``fijar_stock``). Así un objeto leído antes de una venta no pisa el descuento.
+        """
+        if not self._state.adding and self.pk and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields if not campo.primary_key and campo.name != 'stock'
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def imagen_derivados(self):
+        return DerivadosImagen(self.imagen)
+
     def clean(self):
         """
         Validaciones personalizadas para el modelo Producto.
@@ -122,3 +146,66 @@ class Producto(models.Model):
         ]
 
 
+
+
+class MovimientoStock(models.Model):
+    """
+    Libro de stock, solo se agregan filas: cada cambio de ``Producto.stock`` queda aquí
+    con su signo (+ entra, − sale) en la misma transacción que el UPDATE de la columna.
+    """
+    VENTA = 'venta'
+    REPOSICION = 'reposicion'
+    AJUSTE = 'ajuste'
+    REVERSION = 'reversion'
+    TIPOS = [
+        (VENTA, 'Venta'),
+        (REPOSICION, 'Reposición'),
+        (AJUSTE, 'Ajuste de inventario'),
+        (REVERSION, 'Reversión de venta'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
+    tipo = models.CharField(max_length=12, choices=TIPOS)
+    cantidad = models.IntegerField(verbose_name="Cantidad (+ entra, − sale)")
+    fecha = models.DateTimeField(default=timezone.now)
+    # Sin FK: el consumo puede archivarse o eliminarse y el movimiento debe quedar
+    consumo_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Movimiento de stock"
+        verbose_name_plural = "Movimientos de stock"
+        ordering = ['-id']
+        indexes = [
+            # Cola de movimientos de un producto desde su último cierre
+            models.Index(fields=['producto', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad:+d} de {self.producto_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Los movimientos de stock no se modifican; registre un ajuste o una reversión.")
+        super().save(*args, **kwargs)
+
+
+class CierreStock(models.Model):
+    """
+    Foto periódica del stock de un producto: el saldo tras todos los movimientos hasta
+    ``ultimo_movimiento``. El stock en una fecha pasada es el último cierre anterior más la
+    cola de movimientos posteriores, sin recorrer el libro entero.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='cierres_stock')
+    fecha = models.DateTimeField()
+    stock = models.IntegerField()
+    ultimo_movimiento = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Cierre de stock"
+        verbose_name_plural = "Cierres de stock"
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='cierre_stock_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.stock} al {self.fecha:%d/%m/%Y %H:%M}"
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from habitaciones.imagenes import derivados_pendientes, encolar_derivados
+from .models import MovimientoStock, Producto
+
+
+@receiver(post_save, sender=Producto)
+def abrir_libro_stock(sender, instance, created, raw=False, **kwargs):
+    # El stock con que se crea el producto es su primera reposición
+    if created and not raw and instance.stock:
+        MovimientoStock.objects.create(producto=instance, tipo=MovimientoStock.REPOSICION, cantidad=instance.stock)
+
+
+@receiver(post_save, sender=Producto)
+def programar_derivados(sender, instance, raw=False, **kwargs):
+    if not raw and derivados_pendientes(instance.imagen):
+        transaction.on_commit(lambda: encolar_derivados(instance))
@@ -0,0 +1,146 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Max, Sum, Value, When
+from django.utils import timezone
+
+from .models import CierreStock, MovimientoStock, Producto
+
+
+class StockInsuficiente(Exception):
+    """
+    No quedan unidades suficientes del producto; ``str(error)`` lo explica.
+    """
+
+    def __init__(self, producto_id=None, cantidad=None):
+        super().__init__("No hay suficiente stock del producto.")
+        self.producto_id = producto_id
+        self.cantidad = cantidad
+
+
+class StockDesactualizado(Exception):
+    """
+    El stock cambió desde que se mostró al que hizo el recuento; ``str(error)`` lo explica.
+    """
+
+    def __init__(self, producto_id=None, esperado=None):
+        super().__init__("El stock cambió mientras editabas el producto; revisa el recuento.")
+        self.producto_id = producto_id
+        self.esperado = esperado
+
+
+# --------------------------------
+# 📌 Movimientos
+# --------------------------------
+def mover_stock(producto_id, cantidad, tipo, consumo_id=None):
+    """
+    Único camino para cambiar el stock: suma ``cantidad`` (negativa si sale) a la columna
+    y anota el movimiento en el libro, en la misma transacción. La salida es un UPDATE
+    condicional con ``F()`` (``WHERE stock >= unidades``), así dos ventas simultáneas no
+    parten del mismo valor leído ni dejan el stock en negativo. Si no alcanza se lanza
+    ``StockInsuficiente`` sin tocar nada.
+    """
+    if not cantidad:
+        return None
+    productos = Producto.objects.filter(pk=producto_id)
+    if cantidad < 0:
+        productos = productos.filter(stock__gte=-cantidad)
+    with transaction.atomic():
+        if not productos.update(stock=F('stock') + cantidad):
+            raise StockInsuficiente(producto_id, -cantidad)
+        return MovimientoStock.objects.create(
+            producto_id=producto_id, tipo=tipo, cantidad=cantidad, consumo_id=consumo_id
+        )
+
+
+def mover_stock_lote(movimientos, tipo):
+    """
+    Varios movimientos ``(producto_id, cantidad, consumo_id)`` a la vez: las cantidades
+    se suman por producto y se aplican con un único UPDATE condicional agrupado, y el
+    libro recibe un solo ``bulk_create``. Si a algún producto no le alcanza se lanza
+    ``StockInsuficiente`` y no se toca nada.
+    """
+    totales = Counter()
+    for producto_id, cantidad, _ in movimientos:
+        totales[producto_id] += cantidad
+    totales = {producto_id: total for producto_id, total in totales.items() if total}
+    if not totales:
+        return []
+    delta = Case(*(When(pk=pk, then=Value(total)) for pk, total in totales.items()), default=Value(0))
+    requerido = Case(*(When(pk=pk, then=Value(-total)) for pk, total in totales.items()), default=Value(0))
+    with transaction.atomic():
+        if Producto.objects.filter(pk__in=totales, stock__gte=requerido).update(stock=F('stock') + delta) != len(totales):
+            raise StockInsuficiente()
+        return MovimientoStock.objects.bulk_create([
+            MovimientoStock(producto_id=producto_id, tipo=tipo, cantidad=cantidad, consumo_id=consumo_id)
+            for producto_id, cantidad, consumo_id in movimientos if cantidad
+        ])
+
+
+def fijar_stock(producto_id, contado, tipo=MovimientoStock.AJUSTE, esperado=None):
+    """
+    Deja el stock en ``contado`` (un recuento físico) y anota la diferencia. El UPDATE
+    solo aplica si el stock sigue siendo el leído; si una venta se cruza, se vuelve a leer.
+    Con ``esperado``, el stock que vio quien contó, se compara contra ese valor: si
+    ``contado`` es igual no hay recuento nuevo y no se toca nada; si el stock ya no es
+    ``esperado`` se lanza ``StockDesactualizado`` sin tocar nada.
+    """
+    if esperado is not None:
+        if contado == esperado:
+            return None
+        with transaction.atomic():
+            if not Producto.objects.filter(pk=producto_id, stock=esperado).update(stock=contado):
+                raise StockDesactualizado(producto_id, esperado)
+            return MovimientoStock.objects.create(producto_id=producto_id, tipo=tipo, cantidad=contado - esperado)
+    while True:
+        with transaction.atomic():
+            actual = Producto.objects.filter(pk=producto_id).values_list('stock', flat=True).get()
+            if actual == contado:
+                return None
+            if Producto.objects.filter(pk=producto_id, stock=actual).update(stock=contado):
+                return MovimientoStock.objects.create(producto_id=producto_id, tipo=tipo, cantidad=contado - actual)
+
+
+# --------------------------------
+# 📌 Cierres y stock a una fecha
+# --------------------------------
+def tomar_cierre(momento=None):
+    """
+    Cierre de todos los productos con movimientos. Parte del cierre anterior y suma solo
+    los movimientos posteriores: el costo depende de lo ocurrido desde entonces, no del
+    tamaño del libro. Devuelve cuántos cierres creó.
+    """
+    momento = momento or timezone.now()
+    with transaction.atomic():
+        marca = MovimientoStock.objects.aggregate(ultimo=Max('id'))['ultimo']
+        previo = CierreStock.objects.aggregate(ultimo=Max('ultimo_movimiento'))['ultimo'] or 0
+        if marca is None or marca == previo:
+            return 0
+        saldos = dict(CierreStock.objects.filter(ultimo_movimiento=previo).values_list('producto_id', 'stock'))
+        cola = (
+            MovimientoStock.objects.filter(id__gt=previo, id__lte=marca)
+            .order_by().values_list('producto_id').annotate(total=Sum('cantidad'))
+        )
+        for producto_id, total in cola:
+            saldos[producto_id] = saldos.get(producto_id, 0) + total
+        CierreStock.objects.bulk_create([
+            CierreStock(producto_id=producto_id, fecha=momento, stock=stock, ultimo_movimiento=marca)
+            for producto_id, stock in saldos.items()
+        ], batch_size=1000)
+    return len(saldos)
+
+
+def stock_a_fecha(producto_id, momento):
+    """
+    Stock del producto en ``momento``: el último cierre hasta esa fecha más los
+    movimientos posteriores a él (la cola). Dos consultas por índice.
+    """
+    cierre = (
+        CierreStock.objects.filter(producto_id=producto_id, fecha__lte=momento)
+        .order_by('-fecha').values_list('stock', 'ultimo_movimiento').first()
+    )
+    stock, marca = cierre or (0, 0)
+    cola = MovimientoStock.objects.filter(
+        producto_id=producto_id, id__gt=marca, fecha__lte=momento
+    ).aggregate(total=Sum('cantidad'))['total']
+    return stock + (cola or 0)
@@ -1,3 +1,101 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from consumos.models import Consumo
+from consumos.services import eliminar_consumo, modificar_consumo, registrar_consumo
+from habitaciones.models import Habitacion
+from .models import CierreStock, MovimientoStock, Producto
+from .stock import fijar_stock, mover_stock, stock_a_fecha, tomar_cierre
+
+
+class LibroStockTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(numero='171', tipo='pareja', precio=100, capacidad=2)
+        self.producto = Producto.objects.create(nombre='Jugo', precio=Decimal('5.00'), stock=10)
+
+    def libro(self):
+        return list(MovimientoStock.objects.filter(producto=self.producto).order_by('id').values_list('tipo', 'cantidad'))
+
+    def stock(self):
+        return Producto.objects.values_list('stock', flat=True).get(pk=self.producto.pk)
+
+    def test_cada_cambio_queda_en_el_libro(self):
+        consumo = registrar_consumo(Consumo(habitacion=self.habitacion, producto=self.producto, cantidad=3))
+        consumo.cantidad = 5
+        modificar_consumo(consumo)
+        consumo.cantidad = 1
+        modificar_consumo(consumo)
+        eliminar_consumo(consumo)
+        mover_stock(self.producto.pk, 4, MovimientoStock.REPOSICION)
+        fijar_stock(self.producto.pk, 12)
+        self.assertEqual(self.libro(), [
+            ('reposicion', 10), ('venta', -3), ('venta', -2), ('reversion', 4), ('reversion', 1),
+            ('reposicion', 4), ('ajuste', -2),
+        ])
+        self.assertEqual(sum(cantidad for _, cantidad in self.libro()), self.stock())
+        self.assertEqual(set(MovimientoStock.objects.exclude(consumo_id=None).values_list('consumo_id', flat=True)), {consumo.pk})
+        with self.assertRaises(ValueError):
+            MovimientoStock.objects.first().save()
+
+    def test_guardar_el_producto_no_pisa_el_stock(self):
+        producto = Producto.objects.get(pk=self.producto.pk)
+        mover_stock(self.producto.pk, -2, MovimientoStock.VENTA)
+        producto.nombre = 'Jugo natural'
+        producto.save()
+        self.assertEqual(self.stock(), 8)
+
+    def test_formularios_de_producto(self):
+        datos = {'nombre': 'Jugo', 'precio': '5.00', 'stock': 7, 'stock_mostrado': 10, 'disponible': 'on'}
+        self.client.post(reverse('productos:producto_form', args=[self.producto.pk]), datos)
+        self.client.post(reverse('productos:producto_reponer', args=[self.producto.pk]), {'cantidad': 6})
+        self.assertEqual(self.libro()[1:], [('ajuste', -3), ('reposicion', 6)])
+        self.assertEqual(self.stock(), 13)
+
+    def test_editar_tras_una_venta_no_repone_el_stock(self):
+        url = reverse('productos:producto_form', args=[self.producto.pk])
+        self.assertContains(self.client.get(url), 'name="stock_mostrado" value="10"')
+        mover_stock(self.producto.pk, -3, MovimientoStock.VENTA)
+        datos = {'nombre': 'Jugo', 'precio': '6.00', 'stock': 10, 'stock_mostrado': 10, 'disponible': 'on'}
+        self.assertEqual(self.client.post(url, datos).status_code, 302)
+        self.assertEqual((self.stock(), self.libro()[-1]), (7, ('venta', -3)))
+
+        datos.update(precio='7.00', stock=9)
+        respuesta = self.client.post(url, datos)
+        self.assertContains(respuesta, 'El stock cambió mientras editabas')
+        self.assertContains(respuesta, 'name="stock_mostrado" value="7"')
+        self.assertEqual(self.stock(), 7)
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).precio, Decimal('6.00'))
+
+    def test_stock_a_fecha_desde_el_ultimo_cierre(self):
+        inicio = timezone.make_aware(datetime(2026, 5, 1, 8))
+        horas = lambda n: inicio + timedelta(hours=n)
+
+        def mover(cantidad, hora):
+            movimiento = mover_stock(self.producto.pk, cantidad, MovimientoStock.VENTA if cantidad < 0 else MovimientoStock.REPOSICION)
+            MovimientoStock.objects.filter(pk=movimiento.pk).update(fecha=horas(hora))
+
+        MovimientoStock.objects.update(fecha=inicio)
+        mover(-3, 1)
+        self.assertEqual(tomar_cierre(horas(2)), 1)
+        mover(-2, 3)
+        mover(5, 5)
+        self.assertEqual(tomar_cierre(horas(6)), 1)
+        mover(-4, 7)
 
-# Create your tests here.
+        self.assertEqual(
+            list(CierreStock.objects.order_by('fecha').values_list('stock', flat=True)), [7, 10]
+        )
+        esperado = {-1: 0, 0: 10, 2: 7, 4: 5, 5: 10, 6: 10, 8: 6}
+        for hora, stock in esperado.items():
+            with self.assertNumQueries(2):
+                self.assertEqual(stock_a_fecha(self.producto.pk, horas(hora)), stock, hora)
+        # Sin movimientos nuevos no hay cierre que tomar
+        tomar_cierre(horas(9))
+        self.assertEqual(tomar_cierre(horas(10)), 0)
+        call_command('snapshot_stock', stdout=StringIO())
@@ -10,6 +10,7 @@ urlpatterns = [
     path('nuevo/', views.producto_form, name='producto_form'),  # Crear nuevo producto
     path('<int:pk>/', views.producto_detail, name='producto_detail'),  # Ver detalle de un producto
     path('<int:pk>/editar/', views.producto_form, name='producto_form'),  # Editar producto
+    path('<int:pk>/reponer/', views.producto_reponer, name='producto_reponer'),  # Reponer stock
     path('<int:pk>/confirmar_eliminacion/', views.producto_confirm, name='producto_confirm'),  # Confirmar eliminación
 ]
 
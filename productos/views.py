@@ -1,17 +1,42 @@
+from django.contrib import messages
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
-from .models import Producto
-from .forms import ProductoForm
+from django.views.decorators.http import require_POST
+from habitaciones.paginacion import contexto_pagina, es_parcial
+from .models import MovimientoStock, Producto
+from .forms import ProductoForm, ReposicionForm
+from .stock import StockDesactualizado, fijar_stock, mover_stock
 
 # Vista para la lista de productos
 def producto_list(request):
-    productos = Producto.objects.all()
-    return render(request, 'productos/productos_list.html', {'productos': productos})
+    # Paginación por nombre (único e indexado); el scroll infinito pide el fragmento por AJAX
+    context = contexto_pagina(request, Producto.objects.all(), ('nombre', 'id'))
+    context['productos'] = context['pagina'].objetos
+    plantilla = 'productos/productos_list_items.html' if es_parcial(request) else 'productos/productos_list.html'
+    return render(request, plantilla, context)
 
 # Vista para el detalle de un producto
 def producto_detail(request, pk):
     producto = get_object_or_404(Producto, pk=pk)
-    return render(request, 'productos/productos_detail.html', {'producto': producto})
+    return render(request, 'productos/productos_detail.html', {
+        'producto': producto,
+        'movimientos': producto.movimientos.all()[:10],
+        'reposicion_form': ReposicionForm(),
+    })
+
+
+# Reposición de stock: entra al libro como movimiento, nunca pisa la columna
+@require_POST
+def producto_reponer(request, pk):
+    producto = get_object_or_404(Producto, pk=pk)
+    form = ReposicionForm(request.POST)
+    if form.is_valid():
+        mover_stock(producto.pk, form.cleaned_data['cantidad'], MovimientoStock.REPOSICION)
+        messages.success(request, f"Stock de '{producto.nombre}' repuesto.")
+    else:
+        messages.error(request, "Indique una cantidad mayor que cero.")
+    return redirect('productos:producto_detail', pk=producto.pk)
 
 # Vista para el formulario de crear/editar un producto
 def producto_form(request, pk=None):
@@ -32,12 +57,27 @@ def producto_form(request, pk=None):
             form.data['disponible'] = False
 
         if form.is_valid():
-            producto = form.save()
-            # Respuesta AJAX
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return JsonResponse({'success': True, 'redirect_url': producto.get_absolute_url()})
-            # Redirigir a la vista de detalle del producto
-            return redirect('productos:producto_detail', pk=producto.pk)
+            # Un producto nuevo abre el libro con su stock (señal); al editar, el stock
+            # indicado es un recuento contra el que se mostró y la diferencia queda como ajuste
+            try:
+                with transaction.atomic():
+                    producto = form.save()
+                    if pk:
+                        fijar_stock(
+                            producto.pk, form.cleaned_data['stock'], esperado=form.cleaned_data['stock_mostrado']
+                        )
+            except StockDesactualizado as error:
+                # Se vuelve a mostrar con el stock actual para que el recuento parta de él
+                actual = Producto.objects.values_list('stock', flat=True).get(pk=pk)
+                form.data = form.data.copy()
+                form.data['stock'] = form.data['stock_mostrado'] = actual
+                form.add_error('stock', str(error))
+            else:
+                # Respuesta AJAX
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': True, 'redirect_url': producto.get_absolute_url()})
+                # Redirigir a la vista de detalle del producto
+                return redirect('productos:producto_detail', pk=producto.pk)
     else:
         form = ProductoForm(instance=producto)
     